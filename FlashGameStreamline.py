@@ -6,22 +6,27 @@ Flash 网页游戏加速工具。通过运行代理，阻止指定资源下载
 :copyright: Copyright 2024, hxz393. 保留所有权利。
 """
 
+import time
+
+# 记录进程启动时间，用于统计主窗口显示的耗时
+START_TIME = time.perf_counter()
+
 import logging
 import os
 import sys
 
-from PyQt5.QtCore import QEvent
+from PyQt5.QtCore import QEvent, QTimer
 from PyQt5.QtGui import QIcon, QCloseEvent
-from PyQt5.QtWidgets import QMainWindow, QApplication, QVBoxLayout, QWidget, QToolBar
+from PyQt5.QtWidgets import QMainWindow, QApplication, QVBoxLayout, QWidget, QToolBar, QLineEdit, QSizePolicy
 
 from config.settings import LOG_PATH, PROGRAM_NAME, CONFIG_MAIN_PATH, DEFAULT_CONFIG_MAIN, DEFAULT_CONFIG_USER
 from lib.get_resource_path import get_resource_path
 from lib.hide_console import hide_console
 from lib.logging_config import logging_config
 from lib.write_json import write_json
-from ui import (Global_Signals, LangManager, ConfigManager, StatusBar, MainTable, TrayIcon,
+from ui import (Global_Signals, LangManager, ConfigManager, StatsManager, StatusBar, MainTable, TrayIcon,
                 ActionStart, ActionExit, ActionSettingMain, ActionLogs, ActionUpdate, ActionAbout,
-                ActionEnable, ActionDisable, ActionAdd, ActionEdit, ActionDelete)
+                ActionEnable, ActionDisable, ActionAdd, ActionEdit, ActionDelete, ActionImport)
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +43,7 @@ class FlashGameStreamLine(QMainWindow):
         self.lang_manager = LangManager()
         self.lang_manager.lang_updated.connect(self.update_lang)
         self.config_manager = ConfigManager()
+        self.stats_manager = StatsManager()
         self.init_ui()
 
     @staticmethod
@@ -65,7 +71,7 @@ class FlashGameStreamLine(QMainWindow):
         # 创建托盘
         self.tray_icon = TrayIcon(self.lang_manager, self)
         # 创建表单
-        self.table = MainTable(self.lang_manager, self.config_manager)
+        self.table = MainTable(self.lang_manager, self.config_manager, self.stats_manager)
         # 创建动作和连接信号
         self._create_action()
         # 创建菜单栏
@@ -87,6 +93,7 @@ class FlashGameStreamLine(QMainWindow):
         self.menu_run.setTitle(self.lang['main_2'])
         self.menu_edit.setTitle(self.lang['main_3'])
         self.menu_help.setTitle(self.lang['main_5'])
+        self.filter_edit.setPlaceholderText(self.lang['main_6'])
 
     def _create_action(self) -> None:
         """
@@ -98,6 +105,7 @@ class FlashGameStreamLine(QMainWindow):
         self.tray_icon.status_updated.connect(self.status_bar.show_message)
         self.actionStart = ActionStart(self.lang_manager, self.config_manager)
         self.actionStart.status_updated.connect(self.status_bar.show_message)
+        self.actionStart.rule_stats_updated.connect(self.stats_manager.merge)
         self.actionSettingMain = ActionSettingMain(self.lang_manager, self.config_manager)
         self.actionSettingMain.status_updated.connect(self.status_bar.show_message)
         self.actionExit = ActionExit(self.lang_manager)
@@ -118,6 +126,8 @@ class FlashGameStreamLine(QMainWindow):
         self.actionEdit.status_updated.connect(self.status_bar.show_message)
         self.actionDelete = ActionDelete(self.lang_manager, self.config_manager, self.table)
         self.actionDelete.status_updated.connect(self.status_bar.show_message)
+        self.actionImport = ActionImport(self.lang_manager, self.config_manager, self.table)
+        self.actionImport.status_updated.connect(self.status_bar.show_message)
 
     def _create_menubar(self) -> None:
         """
@@ -139,6 +149,8 @@ class FlashGameStreamLine(QMainWindow):
         self.menu_edit.addAction(self.actionAdd.action_add)
         self.menu_edit.addAction(self.actionEdit.action_edit)
         self.menu_edit.addAction(self.actionDelete.action_delete)
+        self.menu_edit.addSeparator()
+        self.menu_edit.addAction(self.actionImport.action_import)
         self.menu_help = menubar.addMenu("")
         self.menu_help.addAction(self.actionLogs.action_logs)
         self.menu_help.addSeparator()
@@ -159,6 +171,15 @@ class FlashGameStreamLine(QMainWindow):
         self.toolbar.addSeparator()
         self.toolbar.addAction(self.actionLogs.action_logs)
         self.toolbar.addAction(self.actionExit.action_exit)
+        # 右侧的规则过滤框
+        spacer = QWidget()
+        spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        self.toolbar.addWidget(spacer)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.setMaximumWidth(200)
+        self.filter_edit.textChanged.connect(self.table.set_filter)
+        self.toolbar.addWidget(self.filter_edit)
 
     def _configure_main_window(self) -> None:
         """
@@ -167,7 +188,7 @@ class FlashGameStreamLine(QMainWindow):
         :return: 无返回值。
         """
         # 设置窗口大小、图标和名称
-        self.setGeometry(10, 10, 400, 400)
+        self.setGeometry(10, 10, 640, 400)
         self.setWindowTitle(PROGRAM_NAME)
         self.setWindowIcon(QIcon(get_resource_path('media/main.ico')))
         # 创建垂直布局，加入表格
@@ -235,7 +256,13 @@ def main() -> None:
         app = QApplication(sys.argv)
         # 设置不在最后一个窗口关闭时退出应用程序。否则最小化情况下，关闭子窗口会导致意外退出
         app.setQuitOnLastWindowClosed(False)
-        _ = FlashGameStreamLine()
+        window = FlashGameStreamLine()
+        # 退出前写入后台尚未写入的配置和统计
+        app.aboutToQuit.connect(window.config_manager.flush)
+        app.aboutToQuit.connect(window.stats_manager.flush)
+        logger.info(f"Main window shown in {time.perf_counter() - START_TIME:.2f}s")
+        # 进入事件循环后再在后台预热代理，不推迟窗口显示
+        QTimer.singleShot(0, window.actionStart.prewarm)
         sys.exit(app.exec_())
     except Exception:
         logger.exception("Application failed to start")
@@ -7,6 +7,7 @@ LANG_DICTS = {
         'main_2': '  &Start ',
         'main_3': '  &Edit  ',
         'main_5': '  &Help  ',
+        'main_6': 'Filter rules',
         'label_status_error': 'Error occurred',
         'ui.action_exit_1': 'Quit',
         'ui.action_exit_2': 'Quit the application',
@@ -20,6 +21,7 @@ LANG_DICTS = {
         'ui.dialog_logs_5': 'Clear',
         'ui.dialog_logs_6': 'Close',
         'ui.dialog_logs_7': 'Refresh',
+        'ui.dialog_logs_8': 'Filter host or URL',
         'ui.action_update_1': 'Check Updates',
         'ui.action_update_2': 'Check for Updates Online',
         'ui.action_update_3': 'Failed to Check for Updates!',
@@ -37,12 +39,17 @@ LANG_DICTS = {
         'ui.dialog_settings_main_4': 'User Config Path:',
         'ui.dialog_settings_main_5': 'Main Settings',
         'ui.dialog_settings_main_6': 'Select',
+        'ui.dialog_settings_main_7': 'Cache Size (MB, 0 to disable):',
+        'ui.dialog_settings_main_8': 'Stream Responses Larger Than (KB, 0 to disable):',
         'ui.dialog_settings_main_11': 'Confirm',
         'ui.dialog_settings_main_12': 'Cancel',
         'ui.dialog_settings_main_13': 'Configuration Saved Successfully!',
         'ui.table_main_1': 'Active',
         'ui.table_main_2': 'Description',
         'ui.table_main_3': 'URL',
+        'ui.table_main_4': 'Hits',
+        'ui.table_main_5': 'Last Hit',
+        'ui.table_main_6': 'Saved',
         'ui.action_enable_1': 'Enable',
         'ui.action_enable_2': 'Mark selected configuration items as enabled',
         'ui.action_enable_3': 'Items Enabled',
@@ -50,6 +57,19 @@ LANG_DICTS = {
         'ui.action_disable_2': 'Mark selected configuration items as disabled',
         'ui.action_disable_3': 'Items Disabled',
         'ui.dialog_table_1': 'Edit',
+        'ui.dialog_table_2': 'Rule Type',
+        'ui.dialog_table_3': 'URL (prefix or substring)',
+        'ui.dialog_table_4': 'Whole host (refused at CONNECT)',
+        'ui.dialog_table_5': 'Blocked Response',
+        'ui.dialog_table_6': '403 Forbidden',
+        'ui.dialog_table_7': 'Empty 200',
+        'ui.dialog_table_8': 'Blank SWF',
+        'ui.dialog_table_9': 'Transparent 1x1 PNG',
+        'ui.dialog_table_10': 'Transparent 1x1 GIF',
+        'ui.dialog_table_11': 'Silent MP3',
+        'ui.dialog_table_12': 'Wildcard (* matches anything)',
+        'ui.dialog_table_13': 'Regular expression',
+        'ui.dialog_table_14': 'Invalid regular expression: ',
         'ui.action_add_1': 'Add',
         'ui.action_add_2': 'Add new item',
         'ui.action_add_3': 'Item Added',
@@ -59,11 +79,16 @@ LANG_DICTS = {
         'ui.action_delete_1': 'Delete',
         'ui.action_delete_2': 'Delete selected configuration items',
         'ui.action_delete_3': 'Items Deleted',
+        'ui.action_import_1': 'Import',
+        'ui.action_import_2': 'Import rules from a user config file, existing rules are kept',
+        'ui.action_import_3': 'Items Imported',
+        'ui.action_import_4': 'Select Rules File',
         'ui.action_start_1': 'Run Program',
         'ui.action_start_2': 'Start proxy server',
         'ui.action_start_3': 'Start failed, please check the rules',
         'ui.action_start_4': 'Proxy Server is Running...',
         'ui.action_start_5': 'Start failed, please change the server port',
+        'ui.action_start_6': 'Rules reloaded, active rules: ',
         'ui.action_about_1': 'About Program',
         'ui.action_about_2': 'Information about the Program',
         'ui.dialog_about_1': 'About',
@@ -98,6 +123,7 @@ LANG_DICTS = {
         'main_2': '开始(&S)',
         'main_3': '编辑(&E)',
         'main_5': '帮助(&H)',
+        'main_6': '过滤规则',
         'label_status_error': '发生错误！',
         'ui.action_exit_1': '退出程序',
         'ui.action_exit_2': '立即退出程序',
@@ -111,6 +137,7 @@ LANG_DICTS = {
         'ui.dialog_logs_5': '清空',
         'ui.dialog_logs_6': '关闭',
         'ui.dialog_logs_7': '刷新',
+        'ui.dialog_logs_8': '过滤主机或地址',
         'ui.action_update_1': '检查更新',
         'ui.action_update_2': '在线检查更新',
         'ui.action_update_3': '检查更新失败！',
@@ -128,12 +155,17 @@ LANG_DICTS = {
         'ui.dialog_settings_main_4': '用户配置文件：',
         'ui.dialog_settings_main_5': '主设置',
         'ui.dialog_settings_main_6': '选择',
+        'ui.dialog_settings_main_7': '资源缓存大小（MB，0 为关闭）：',
+        'ui.dialog_settings_main_8': '流式传输阈值（KB，0 为关闭）：',
         'ui.dialog_settings_main_11': '确认',
         'ui.dialog_settings_main_12': '取消',
         'ui.dialog_settings_main_13': '配置保存成功',
         'ui.table_main_1': '激活',
         'ui.table_main_2': '描述',
         'ui.table_main_3': '地址',
+        'ui.table_main_4': '命中',
+        'ui.table_main_5': '最后命中',
+        'ui.table_main_6': '节省流量',
         'ui.action_enable_1': '启用',
         'ui.action_enable_2': '启用选择项目',
         'ui.action_enable_3': '条规则已启用',
@@ -141,6 +173,19 @@ LANG_DICTS = {
         'ui.action_disable_2': '停用选择项目',
         'ui.action_disable_3': '条规则已停用',
         'ui.dialog_table_1': '编辑',
+        'ui.dialog_table_2': '规则类型',
+        'ui.dialog_table_3': '地址（前缀或子串）',
+        'ui.dialog_table_4': '整个主机（在 CONNECT 阶段拒绝）',
+        'ui.dialog_table_5': '拦截后返回',
+        'ui.dialog_table_6': '403 禁止访问',
+        'ui.dialog_table_7': '空白内容（200）',
+        'ui.dialog_table_8': '空白 SWF',
+        'ui.dialog_table_9': '1×1 透明 PNG',
+        'ui.dialog_table_10': '1×1 透明 GIF',
+        'ui.dialog_table_11': '静音 MP3',
+        'ui.dialog_table_12': '通配符（* 匹配任意字符）',
+        'ui.dialog_table_13': '正则表达式',
+        'ui.dialog_table_14': '正则表达式有误：',
         'ui.action_add_1': '新增',
         'ui.action_add_2': '新增规则',
         'ui.action_add_3': '规则已新增',
@@ -150,11 +195,16 @@ LANG_DICTS = {
         'ui.action_delete_1': '删除',
         'ui.action_delete_2': '删除选择项目',
         'ui.action_delete_3': '条规则已删除',
+        'ui.action_import_1': '导入',
+        'ui.action_import_2': '从用户配置文件导入规则，已有的规则保持不变',
+        'ui.action_import_3': '条规则已导入',
+        'ui.action_import_4': '选择规则文件',
         'ui.action_start_1': '启动程序',
         'ui.action_start_2': '启动代理服务器',
         'ui.action_start_3': '启动失败，无可用规则',
         'ui.action_start_4': '代理服务器运行中...',
         'ui.action_start_5': '启动失败，端口冲突，请修改代理端口设置',
+        'ui.action_start_6': '规则已重新加载，启用规则数：',
         'ui.action_about_1': '关于程序',
         'ui.action_about_2': '程序相关信息',
         'ui.dialog_about_1': '关于',
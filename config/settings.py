@@ -17,14 +17,53 @@ GITHUB_URL = 'https://github.com/hxz393/FlashGameStreamline'
 DEFAULT_CONFIG_MAIN = {
     'lang': 'English',  # zh-cht en zh-chs
     'server_port': '12345',
+    'stream_size': '1024',  # KB，0 为关闭。开启后没有 Content-Length 的响应不论大小都流式传输
+    'cache_size': '512',
     'config_user_path': 'config/config_user.json',
 }
 DEFAULT_CONFIG_USER = {
     "url": {
         "active": False,
         "description": "",
+        "kind": "url",
+        "response": "403",
     }
 }
+# 规则类型：地址规则按前缀或子串匹配，整主机规则在 CONNECT 阶段拒绝，通配符规则中 * 匹配任意字符，正则表达式规则在地址中查找
+RULE_KIND_URL = 'url'
+RULE_KIND_HOST = 'host'
+RULE_KIND_GLOB = 'glob'
+RULE_KIND_REGEX = 'regex'
+RULE_KINDS = [RULE_KIND_URL, RULE_KIND_HOST, RULE_KIND_GLOB, RULE_KIND_REGEX]
+# 拦截后的响应：403、空白 200、空白 SWF、1×1 透明 PNG/GIF、静音 MP3
+RESPONSE_MODE_403 = '403'
+RESPONSE_MODE_EMPTY = 'empty'
+RESPONSE_MODE_SWF = 'swf'
+RESPONSE_MODE_PNG = 'png'
+RESPONSE_MODE_GIF = 'gif'
+RESPONSE_MODE_MP3 = 'mp3'
+RESPONSE_MODES = [RESPONSE_MODE_403, RESPONSE_MODE_EMPTY, RESPONSE_MODE_SWF, RESPONSE_MODE_PNG, RESPONSE_MODE_GIF, RESPONSE_MODE_MP3]
+# 资源缓存目录、内存热层大小（MB）和统计信息输出间隔（秒）
+CACHE_PATH = 'cache'
+CACHE_HOT_SIZE = 32
+CACHE_REPORT_INTERVAL = 60
+# 规则命中统计文件、推送到界面的间隔（秒）和用于估算节省流量的资源大小记录条数上限
+RULE_STATS_PATH = 'config/rule_stats.json'
+RULE_STATS_INTERVAL = 5
+RULE_SIZE_LIMIT = 50000
+# 配置和统计文件合并写入的等待时间（秒），以及改用紧凑格式写入的条目数
+JSON_WRITE_DELAY = 0.5
+JSON_COMPACT_SIZE = 20000
+# 结构化请求日志的路径、轮转大小（MB）、备份数量，以及每批最多记录数和提交间隔（秒）
+FLOW_LOG_PATH = 'logs/flows.bin'
+FLOW_LOG_SIZE = 64
+FLOW_LOG_BACKUPS = 5
+FLOW_LOG_BATCH = 1000
+FLOW_LOG_INTERVAL = 2
+# 代理自身提供的 Prometheus 指标地址，以及延迟直方图的分桶上限（秒）
+METRICS_HOST = 'metrics.fgs'
+METRICS_PATH = '/metrics'
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
 # 用户输入检查正则
 REGEX_PORT = r'^\d{1,5}$'
 REGEX_ASCII = r'^[ -~]+$'
@@ -38,7 +77,7 @@ LOG_COLORS = {
     "CRITICAL": "darkred"
 }
 LOG_LEVELS = [i for i in LOG_COLORS.keys()]
-# 日志展示最多行数
-LOG_LINES = 1000
 # 日志定时刷新毫秒数
 LOG_UPDATE_RATE = 200
+# 日志过滤文字停止输入后开始查找的毫秒数
+LOG_FILTER_DELAY = 300
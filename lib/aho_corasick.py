@@ -0,0 +1,108 @@
+"""
+这个模块提供 Aho-Corasick 多模式字符串匹配自动机，用于在一次扫描中判断文本是否包含任意一个模式。
+
+使用示例：
+
+```python
+matcher = AhoCorasick(['/resource/bg/', '/resource/npc/'])
+matcher.search('http://mole.61.com/resource/bg/1001.swf')  # '/resource/bg/'
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from collections import deque
+from typing import Iterable, List, Dict, Optional
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 自动机。构建后每次查找的耗时只和文本长度有关，与模式数量无关。
+
+    查找结果与依次执行 `pattern in text` 完全一致：若有多个模式命中，返回在输入顺序中最靠前的那个。
+
+    :param patterns: 模式字符串列表。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        # 每个节点的转移表、失配指针和命中的最小模式序号（-1 表示无）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[int] = [-1]
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _build(self) -> None:
+        """
+        构建字典树和失配指针。
+
+        :return: 无返回值。
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        # 插入所有模式，同一节点只保留序号最小的模式
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                nxt = goto[node].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][char] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append(-1)
+                node = nxt
+            if out[node] == -1:
+                out[node] = index
+
+        # 广度优先计算失配指针，并沿失配链合并输出
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                inherited = out[fail[child]]
+                if inherited != -1 and (out[child] == -1 or inherited < out[child]):
+                    out[child] = inherited
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        扫描一次文本，返回命中的模式。
+
+        :param text: 要检查的文本。
+        :return: 命中的模式中输入顺序最靠前的一个，没有命中返回 None。
+        """
+        index = self.search_index(text)
+        return None if index == -1 else self.patterns[index]
+
+    def search_index(self, text: str) -> int:
+        """
+        扫描一次文本，返回命中模式的序号。
+
+        :param text: 要检查的文本。
+        :return: 命中的模式中最小的序号，没有命中返回 -1。
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        best = out[0]
+        node = 0
+        for char in text:
+            nxt = goto[node].get(char)
+            while nxt is None and node:
+                node = fail[node]
+                nxt = goto[node].get(char)
+            node = nxt or 0
+            found = out[node]
+            if found != -1 and (best == -1 or found < best):
+                best = found
+                # 第一个模式已命中，不可能有更靠前的结果
+                if best == 0:
+                    break
+        return best
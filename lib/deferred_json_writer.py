@@ -0,0 +1,97 @@
+"""
+这个模块提供延迟合并的 JSON 写入器，把短时间内对同一文件的多次写入合并为一次，并在后台线程中完成。
+
+界面连续修改配置时（例如批量启用后马上删除），每次修改只需登记最新数据，等待片刻后由后台线程写入一次，
+界面线程不会因为序列化和写盘而卡顿。登记的数据在写入前不能再被修改，调用方应当传入副本。
+
+使用示例：
+
+```python
+writer = DeferredJsonWriter(delay=0.5)
+writer.schedule('config/config_user.json', dict(rules))
+writer.flush()  # 程序退出前写入所有未完成的数据
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import threading
+from pathlib import Path
+from typing import Dict, Union, List, Optional, Tuple
+
+from lib.write_json import write_json
+
+
+class DeferredJsonWriter:
+    """
+    延迟合并的 JSON 写入器。第一次登记后启动计时器，到期时写入每个文件最后一次登记的数据，期间的登记只替换待写数据。
+
+    立即写入和到期写入共用一把写入锁，按调用顺序完成，立即写入同时丢弃该文件待写的旧数据，旧数据不会覆盖新数据。
+    写入失败的数据放回待写队列，在下一次写入时重试，除非期间又登记了该文件的新数据。
+
+    :param delay: 合并写入的等待时间，单位为秒。
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self._pending: Dict[str, Tuple[Union[Dict, List], bool]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def schedule(self,
+                 target_path: Union[str, Path],
+                 data: Union[Dict, List],
+                 compact: bool = False) -> None:
+        """
+        登记一次写入，在等待时间后由后台线程写入。
+
+        :param target_path: Json 文件的路径。
+        :param data: 要写入的数据，登记后不要再修改。
+        :param compact: 是否使用紧凑格式。
+        :return: 无返回值。
+        """
+        with self._lock:
+            self._pending[str(target_path)] = (data, compact)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def write(self,
+              target_path: Union[str, Path],
+              data: Union[Dict, List],
+              compact: bool = False) -> bool:
+        """
+        立即写入，并丢弃该文件待写的数据。
+
+        :param target_path: Json 文件的路径。
+        :param data: 要写入的数据。
+        :param compact: 是否使用紧凑格式。
+        :return: 成功时返回 True，失败时返回 False。
+        """
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(str(target_path), None)
+            return write_json(target_path, data, compact)
+
+    def flush(self) -> bool:
+        """
+        立即写入所有待写的数据，写入失败的数据留待下次重试。
+
+        :return: 全部成功时返回 True，有失败时返回 False。
+        """
+        with self._write_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            failed = {path: item for path, item in pending.items() if not write_json(path, *item)}
+            if failed:
+                with self._lock:
+                    for path, item in failed.items():
+                        self._pending.setdefault(path, item)
+            return not failed
@@ -0,0 +1,308 @@
+"""
+这个模块提供一个带内存热层的磁盘 LRU 缓存，用于保存代理下载过的资源。
+
+每个条目由元数据（字典）和内容（字节串）组成。内容保存为独立文件，每次写入使用新的文件名，元数据和访问顺序保存在索引文件中。
+磁盘总大小超过上限时，按最近最少使用的顺序淘汰；最近访问的小条目同时保存在内存中，命中时不读磁盘。
+所有方法都是线程安全的，可以在线程池中调用。
+
+使用示例：
+
+```python
+cache = DiskCache('cache', max_bytes=512 * 1024 * 1024, hot_bytes=32 * 1024 * 1024)
+cache.put('http://mole.61.com/1.swf', {'status_code': 200}, b'...')
+meta, body = cache.get('http://mole.61.com/1.swf')
+cache.close()
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+from lib.read_json import read_json
+from lib.write_json import write_json
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+
+class DiskCache:
+    """
+    磁盘 LRU 缓存。
+
+    :param directory: 缓存目录。
+    :param max_bytes: 磁盘缓存内容总大小上限（字节）。
+    :param hot_bytes: 内存热层大小上限（字节），为 0 时不使用内存热层。
+    """
+
+    def __init__(self,
+                 directory: Union[str, os.PathLike],
+                 max_bytes: int,
+                 hot_bytes: int = 0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hot_bytes = hot_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        # 键 -> 元数据，顺序即访问顺序，最近访问的在末尾。元数据中 _size 为内容大小
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hot: "OrderedDict[str, bytes]" = OrderedDict()
+        self._hot_size = 0
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load_index(self) -> None:
+        """
+        读取索引文件，丢弃内容文件已经不存在的条目，删除不在索引中的残留文件和临时文件。
+
+        :return: 无返回值。
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index_path = self.directory / INDEX_FILE
+        entries = read_json(index_path) if index_path.is_file() else None
+        for key, meta in (entries or []):
+            if self._path(key, meta).is_file():
+                self._index[key] = meta
+                self.size += meta.get('_size', 0)
+        known = {self._path(key, meta).name for key, meta in self._index.items()}
+        for path in self.directory.glob('*.bin'):
+            if path.name not in known:
+                path.unlink(missing_ok=True)
+        # 旧版本没有写完的临时文件
+        for path in self.directory.glob('*.tmp'):
+            path.unlink(missing_ok=True)
+        self._unlink(self._evict())
+
+    def _path(self,
+              key: str,
+              meta: Dict[str, Any]) -> Path:
+        """
+        计算条目的内容文件路径。文件名保存在元数据的 _file 中，旧版本的索引没有 _file，使用键的摘要作为文件名。
+
+        :param key: 缓存键。
+        :param meta: 条目的元数据。
+        :return: 内容文件路径。
+        """
+        return self.directory / meta.get('_file', f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.bin")
+
+    def get_hot(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        只在内存热层中查找，不读磁盘，可以直接在事件循环中调用。
+
+        :param key: 缓存键。
+        :return: (元数据, 内容) 元组，没有找到返回 None。
+        """
+        with self._lock:
+            body = self._hot.get(key)
+            if body is None:
+                return None
+            self._hot.move_to_end(key)
+            self._index.move_to_end(key)
+            return dict(self._index[key]), body
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        查找缓存条目，先查内存热层，再读磁盘。
+
+        :param key: 缓存键。
+        :return: (元数据, 内容) 元组，没有找到返回 None。
+        """
+        entry = self.get_hot(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            self._index.move_to_end(key)
+            meta = dict(meta)
+        path = self._path(key, meta)
+        try:
+            body = path.read_bytes()
+        except OSError:
+            with self._lock:
+                # 读取期间条目可能已被重新写入或淘汰，只删除仍指向这个文件的条目
+                current = self._index.get(key)
+                stale = self._remove(key) if current is not None and self._path(key, current) == path else None
+            if stale is not None:
+                logger.warning(f"Cache file missing: {key}")
+            return None
+        with self._lock:
+            self._add_hot(key, body)
+        return meta, body
+
+    def put(self,
+            key: str,
+            meta: Dict[str, Any],
+            body: bytes) -> None:
+        """
+        写入缓存条目，超过单条上限（总大小的八分之一）的内容不缓存。
+        内容在锁外写入新建的唯一文件，锁内只更新索引，被替换和被淘汰的旧文件在释放锁后删除。
+        同一个键的并发写入和淘汰不会互相干扰，读写磁盘也不会阻塞其他线程。写入失败时抛出 OSError，不留下文件。
+
+        :param key: 缓存键。
+        :param meta: 元数据，必须可以序列化为 JSON。
+        :param body: 内容。
+        :return: 无返回值。
+        """
+        if len(body) > self.max_bytes // 8:
+            return
+        # 程序中途退出时没有写完的文件不在索引中，下次启动时删除
+        fd, path = tempfile.mkstemp(suffix='.bin', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(body)
+        except BaseException:
+            Path(path).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            stale = self._add(key, {**meta, '_file': os.path.basename(path)}, body)
+        self._unlink(stale)
+
+    def _add(self,
+             key: str,
+             meta: Dict[str, Any],
+             body: bytes) -> List[Path]:
+        """
+        把已写入磁盘的条目加入索引和内存热层，超过上限时淘汰旧条目。调用方需持有锁，并在释放锁后删除返回的文件。
+
+        :param key: 缓存键。
+        :param meta: 元数据。
+        :param body: 内容。
+        :return: 被替换和被淘汰的内容文件列表。
+        """
+        stale = [self._remove(key)]
+        self._index[key] = {**meta, '_size': len(body)}
+        self.size += len(body)
+        self._dirty = True
+        self._add_hot(key, body)
+        return stale + self._evict()
+
+    def update_meta(self,
+                    key: str,
+                    meta: Dict[str, Any]) -> None:
+        """
+        只更新条目的元数据，例如重新验证后更新过期时间。
+
+        :param key: 缓存键。
+        :param meta: 要合并的元数据。
+        :return: 无返回值。
+        """
+        with self._lock:
+            if key in self._index:
+                self._index[key].update(meta)
+                self._dirty = True
+
+    def delete(self, key: str) -> None:
+        """
+        删除缓存条目。
+
+        :param key: 缓存键。
+        :return: 无返回值。
+        """
+        with self._lock:
+            stale = self._remove(key)
+        self._unlink([stale])
+
+    def save(self) -> None:
+        """
+        有改动时把索引写入磁盘。
+
+        :return: 无返回值。
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._index.items())
+            self._dirty = False
+        write_json(self.directory / INDEX_FILE, entries)
+
+    def close(self) -> None:
+        """
+        保存索引，清空内存热层。
+
+        :return: 无返回值。
+        """
+        self.save()
+        with self._lock:
+            self._hot.clear()
+            self._hot_size = 0
+
+    def _add_hot(self,
+                 key: str,
+                 body: bytes) -> None:
+        """
+        把内容放入内存热层，超过热层上限时淘汰最久未访问的内容。调用方需持有锁。
+
+        :param key: 缓存键。
+        :param body: 内容。
+        :return: 无返回值。
+        """
+        if len(body) > self.hot_bytes // 4 or key in self._hot:
+            return
+        self._hot[key] = body
+        self._hot_size += len(body)
+        while self._hot_size > self.hot_bytes:
+            _, old = self._hot.popitem(last=False)
+            self._hot_size -= len(old)
+
+    def _drop_hot(self, key: str) -> None:
+        """
+        从内存热层移除内容。调用方需持有锁。
+
+        :param key: 缓存键。
+        :return: 无返回值。
+        """
+        body = self._hot.pop(key, None)
+        if body is not None:
+            self._hot_size -= len(body)
+
+    def _remove(self, key: str) -> Optional[Path]:
+        """
+        从索引和内存热层删除条目。调用方需持有锁，并在释放锁后删除返回的文件。
+
+        :param key: 缓存键。
+        :return: 条目的内容文件，条目不存在时返回 None。
+        """
+        meta = self._index.pop(key, None)
+        if meta is None:
+            return None
+        self.size -= meta.get('_size', 0)
+        self._dirty = True
+        self._drop_hot(key)
+        return self._path(key, meta)
+
+    def _evict(self) -> List[Path]:
+        """
+        磁盘缓存超过上限时，淘汰最久未访问的条目。调用方需持有锁，并在释放锁后删除返回的文件。
+
+        :return: 被淘汰的内容文件列表。
+        """
+        stale = []
+        while self.size > self.max_bytes and self._index:
+            stale.append(self._remove(next(iter(self._index))))
+        return stale
+
+    @staticmethod
+    def _unlink(paths: Iterable[Optional[Path]]) -> None:
+        """
+        删除内容文件，忽略 None 和已经不存在的文件。在锁外调用。
+
+        :param paths: 内容文件列表。
+        :return: 无返回值。
+        """
+        for path in paths:
+            if path is not None:
+                path.unlink(missing_ok=True)
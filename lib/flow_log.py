@@ -0,0 +1,228 @@
+"""
+这个模块提供结构化的请求日志，以紧凑的二进制格式按批追加写入，读取时不需要解析文本。
+
+每条记录包含时间戳、请求方法、主机、路径、状态码、传输字节数、首字节时间、总耗时、拦截规则和协议。文件由若干批组成，
+每批按列保存：先是批头 `FLOW` 和记录数，然后是各数值列的 `array` 原始字节，最后是各文本列用换行符连接后的 UTF-8 字节。
+读取一批只需要几次 `frombytes` 和 `split`，全部在 C 层面完成，扫描几百万条记录只需要几秒。
+状态码为 0 表示请求出错没有响应，首字节时间为 -1 表示没有连接上游（被拦截或缓存命中），拦截规则为空表示放行。
+新增的文本列追加在最后，读取旧文件时缺少的列为空字符串。
+
+文件超过大小上限时轮转为 `.1`、`.2` 等备份，与 `RotatingFileHandler` 相同。
+
+使用示例：
+
+```python
+batch = FlowBatch()
+batch.append(time.time(), 'GET', 'mole.61.com', '/resource/bg.swf', 200, 1024, 0.05, 0.2, '', 'http')
+writer = FlowLogWriter('logs/flows.bin')
+writer.write(batch)
+for batch in read_flow_log('logs/flows.bin'):
+    print(len(batch), sum(batch.size))
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import os
+import struct
+from array import array
+from typing import Iterator, Tuple, Union
+
+# 批头：标识、记录数、批内容字节数
+HEADER = struct.Struct('<4sII')
+MAGIC = b'FLOW'
+# 数值列及其数组类型，文本列按顺序排在数值列之后
+NUMBER_FIELDS = (('timestamp', 'd'), ('status', 'H'), ('size', 'q'), ('ttfb', 'f'), ('duration', 'f'))
+TEXT_FIELDS = ('method', 'host', 'path', 'rule', 'scheme')
+FIELDS = ('timestamp', 'method', 'host', 'path', 'status', 'size', 'ttfb', 'duration', 'rule', 'scheme')
+
+
+class FlowBatch:
+    """
+    一批请求记录，按列保存。数值列是 `array` 数组，文本列是字符串列表。
+    """
+    __slots__ = FIELDS
+
+    def __init__(self):
+        for name, typecode in NUMBER_FIELDS:
+            setattr(self, name, array(typecode))
+        for name in TEXT_FIELDS:
+            setattr(self, name, [])
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def append(self,
+               timestamp: float,
+               method: str,
+               host: str,
+               path: str,
+               status: int,
+               size: int,
+               ttfb: float,
+               duration: float,
+               rule: str,
+               scheme: str = '') -> None:
+        """
+        追加一条记录。
+
+        :param timestamp: 请求开始的时间戳。
+        :param method: 请求方法。
+        :param host: 主机名。
+        :param path: 路径和查询参数。
+        :param status: 状态码，出错时为 0。
+        :param size: 响应体传输的字节数。
+        :param ttfb: 首字节时间（秒），没有连接上游时为 -1。
+        :param duration: 总耗时（秒）。
+        :param rule: 命中的拦截规则，放行时为空字符串。
+        :param scheme: 协议，http 或 https。
+        :return: 无返回值。
+        """
+        self.timestamp.append(timestamp)
+        self.method.append(method)
+        self.host.append(host)
+        # 文本列用换行符分隔，去掉字段中的换行符
+        self.path.append(path.replace('\n', ''))
+        self.status.append(status)
+        self.size.append(size)
+        self.ttfb.append(ttfb)
+        self.duration.append(duration)
+        self.rule.append(rule.replace('\n', ''))
+        self.scheme.append(scheme)
+
+    def rows(self) -> Iterator[Tuple]:
+        """
+        逐条获取记录，字段顺序与 FIELDS 相同。
+
+        :return: 记录元组的迭代器。
+        """
+        return zip(*(getattr(self, name) for name in FIELDS))
+
+    def to_bytes(self) -> bytes:
+        """
+        编码为一批的二进制内容，包括批头。
+
+        :return: 编码后的字节。
+        """
+        parts = [getattr(self, name).tobytes() for name, _ in NUMBER_FIELDS]
+        for name in TEXT_FIELDS:
+            text = '\n'.join(getattr(self, name)).encode('utf-8')
+            parts.append(struct.pack('<I', len(text)))
+            parts.append(text)
+        payload = b''.join(parts)
+        return HEADER.pack(MAGIC, len(self), len(payload)) + payload
+
+    @classmethod
+    def from_bytes(cls,
+                   count: int,
+                   payload: bytes) -> 'FlowBatch':
+        """
+        从一批的内容解码，不包括批头。
+
+        :param count: 记录数。
+        :param payload: 批内容。
+        :return: 解码后的一批记录。
+        """
+        batch = cls()
+        position = 0
+        for name, typecode in NUMBER_FIELDS:
+            column = getattr(batch, name)
+            length = count * column.itemsize
+            column.frombytes(payload[position:position + length])
+            position += length
+        for name in TEXT_FIELDS:
+            # 旧文件没有后来追加的文本列
+            if position >= len(payload):
+                setattr(batch, name, [''] * count)
+                continue
+            length, = struct.unpack_from('<I', payload, position)
+            position += 4
+            text = payload[position:position + length].decode('utf-8', errors='replace')
+            position += length
+            setattr(batch, name, text.split('\n') if count else [])
+        return batch
+
+
+class FlowLogWriter:
+    """
+    结构化请求日志的写入器，只在一个线程中使用。
+
+    :param path: 日志文件路径。
+    :param max_size: 文件大小上限（字节），超过后轮转，为 0 时不轮转。
+    :param backup_count: 保留的备份文件数量。
+    """
+
+    def __init__(self,
+                 path: Union[str, os.PathLike],
+                 max_size: int = 0,
+                 backup_count: int = 5):
+        self.path = str(path)
+        self.max_size = max_size
+        self.backup_count = backup_count
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, batch: FlowBatch) -> None:
+        """
+        追加写入一批记录，写入前检查是否需要轮转。
+
+        :param batch: 一批记录。
+        :return: 无返回值。
+        """
+        if not len(batch):
+            return
+        data = batch.to_bytes()
+        if self.max_size and os.path.isfile(self.path) and os.path.getsize(self.path) + len(data) > self.max_size:
+            self.rotate()
+        with open(self.path, 'ab') as file:
+            file.write(data)
+
+    def rotate(self) -> None:
+        """
+        轮转日志文件，最旧的备份被删除。
+
+        :return: 无返回值。
+        """
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.isfile(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+
+def read_flow_log(path: Union[str, os.PathLike],
+                  include_backups: bool = False) -> Iterator[FlowBatch]:
+    """
+    按批读取结构化请求日志。文件末尾不完整的一批（例如正在写入）会被忽略。
+
+    :param path: 日志文件路径。
+    :param include_backups: 是否先按从旧到新的顺序读取轮转的备份文件。
+    :return: 每批记录的迭代器。
+    """
+    path = str(path)
+    paths = [path]
+    if include_backups:
+        index = 1
+        while os.path.isfile(f'{path}.{index}'):
+            paths.insert(0, f'{path}.{index}')
+            index += 1
+    for current in paths:
+        if not os.path.isfile(current):
+            continue
+        with open(current, 'rb') as file:
+            while True:
+                header = file.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                magic, count, length = HEADER.unpack(header)
+                if magic != MAGIC:
+                    raise ValueError(f"Invalid flow log block in {current} at {file.tell() - HEADER.size}")
+                payload = file.read(length)
+                if len(payload) < length:
+                    break
+                yield FlowBatch.from_bytes(count, payload)
@@ -0,0 +1,21 @@
+"""
+这个模块主要用于将字节数格式化为便于阅读的字符串。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+
+
+def format_size(size: float) -> str:
+    """
+    将字节数格式化为带单位的字符串，例如 `1.5 MB`。
+
+    :param size: 字节数。
+    :return: 格式化后的字符串。
+    """
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
@@ -0,0 +1,101 @@
+"""
+这个模块提供通配符规则集合，把所有通配符规则合并为一个正则表达式，一次扫描即可判断文本是否命中其中任意一条。
+
+通配符规则中 `*` 匹配任意数量的任意字符，其余字符（包括 URL 中常见的 `?`）按原样匹配，与地址规则一样可以命中 URL 的任意部分。
+合并前先把规则按字符建成前缀树，共同前缀只出现一次，例如 `/npc/1/*.swf` 和 `/npc/2/*.swf` 合并为 `/npc/(?:1/.*?\\.swf|2/.*?\\.swf)`，
+正则引擎在每个位置只需要比较一次共同前缀，规则数量增加时查找耗时基本不变。每条规则末尾放一个空的命名分组，命中后通过 `lastgroup` 得到规则序号。
+
+使用示例：
+
+```python
+glob_set = GlobSet(['/resource/npc/*/body.swf', '*.mp3?v=*'])
+glob_set.search_index('http://mole.61.com/resource/npc/1001/body.swf')  # 0
+glob_set.search_index('http://mole.61.com/sound/1.mp3?v=2')  # 1
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import re
+from typing import Iterable, List, Dict, Optional, Pattern
+
+from lib.regex_set import RegexSet
+
+# 通配符规则的词元：连续的星号或单个普通字符
+TOKEN_PATTERN = re.compile(r'\*+|[^*]')
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    把一条通配符规则转换为正则表达式。
+
+    :param pattern: 通配符规则，例如 `/resource/npc/*/body.swf`。
+    :return: 正则表达式字符串。
+    """
+    return '.*?'.join(re.escape(part) for part in pattern.split('*'))
+
+
+class GlobSet:
+    """
+    通配符规则集合。多条规则同时命中时返回在文本中最先命中的一条。
+
+    规则过多导致合并后的表达式无法编译时，退回到逐条转换后分块合并的 `RegexSet`。
+
+    :param patterns: 通配符规则列表。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        self._regex: Optional[Pattern] = None
+        self._fallback: Optional[RegexSet] = None
+        if not self.patterns:
+            return
+        try:
+            self._regex = re.compile(self.build_regex(self.patterns))
+        except (re.error, RecursionError, OverflowError):
+            self._fallback = RegexSet(glob_to_regex(pattern) for pattern in self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    @staticmethod
+    def build_regex(patterns: List[str]) -> str:
+        """
+        把通配符规则按前缀树合并为一个正则表达式。
+
+        :param patterns: 通配符规则列表。
+        :return: 正则表达式字符串。
+        """
+        # 每个节点是词元到子节点的字典，键 None 保存在此结束的最小规则序号
+        root: Dict[Optional[str], dict] = {}
+        for index, pattern in enumerate(patterns):
+            node = root
+            for token in TOKEN_PATTERN.findall(pattern):
+                node = node.setdefault('*' if token[0] == '*' else token, {})
+            node.setdefault(None, index)
+
+        def emit(node: dict) -> str:
+            parts = []
+            if None in node:
+                parts.append(f'(?P<g{node[None]}>)')
+            for token, child in node.items():
+                if token is not None:
+                    parts.append(('.*?' if token == '*' else re.escape(token)) + emit(child))
+            return parts[0] if len(parts) == 1 else f"(?:{'|'.join(parts)})"
+
+        return emit(root)
+
+    def search_index(self, text: str) -> int:
+        """
+        查找文本命中的规则序号。
+
+        :param text: 要查找的文本。
+        :return: 命中的规则序号，没有命中返回 -1。
+        """
+        if self._fallback is not None:
+            return self._fallback.search_index(text)
+        if self._regex is None:
+            return -1
+        match = self._regex.search(text)
+        return -1 if match is None else int(match.lastgroup[1:])
@@ -0,0 +1,23 @@
+"""
+这个模块主要用于检查本机端口是否可以监听。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import socket
+
+
+def is_port_available(port: int) -> bool:
+    """
+    检查指定端口是否可用。
+
+    :param port: 要检查的端口号。
+    :return: 端口可用返回 True，否则返回 False。
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("", port))
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,444 @@
+"""
+这个模块提供日志文件的行索引，通过内存映射按需读取任意一行，供虚拟化的日志列表使用。
+
+文件映射到内存后，只在 `array` 数组中保存每一行的起始字节位置，每行占 8 个字节，读取某一行时才从映射中取出并解码，
+几百 MB 的日志也不需要整体读入内存。行索引分批建立，每批在 C 层面拆分一段字节并累加行长度，调用方可以在空闲时逐批建立，
+不阻塞界面。未写完的最后一行不编入索引，文件变长后继续建立。
+
+打开时从文件末尾往前一批的第一个完整行开始建立索引，打开的耗时与文件大小无关。更早的行由 `index_older` 逐批向前补上，
+插入到最前面，已有的行号随之后移。
+
+建立索引的同时记录每一行所属日志的级别，并为每个级别保存级别不低于它的行号数组，按级别筛选时直接使用对应的数组，
+不需要重新读取文件或逐行判断。按文字筛选时直接在映射上查找字节串，只对命中的行做处理。
+
+映射只在读取时建立，调用方在每次轮询或绘制之后调用 `release` 释放。Windows 上打开的文件不能改名，
+一直占用日志文件会让 `RotatingFileHandler` 轮转失败并丢弃日志。
+
+文件被轮转（设备号和节点号变化，原文件改名为 `.1` 备份）时，先读完原文件剩余的行，把它保留为上一个文件，再从头为新文件建立索引，
+已显示的行不会消失；再次轮转时才移除更早的行。文件被清空（比已索引的位置还短）或被替换时，需要从头重新建立索引。
+
+使用示例：
+
+```python
+index = LogIndex('logs/run.log')
+while index.index_more() or index.index_older():
+    pass
+print(len(index), index.line(0), index.level(0))
+errors = index.level_rows[LEVELS.index('ERROR')]
+index.release()
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, repeat, compress
+from operator import add, sub
+from typing import Dict, Optional, Tuple, List
+
+# 日志级别，按严重程度从低到高排列，级别代码为下标
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+# logging_config 的日志格式中，级别从第 23 个字节的分隔符之后开始，用分隔符和级别的前 4 个字母识别日志行
+LEVEL_SLICE = slice(23, 30)
+LEVEL_CODES = {f' - {level[:4]}'.encode(): code for code, level in enumerate(LEVELS)}
+# 续行（例如异常堆栈）的级别代码，建立索引时替换为所属日志行的级别
+CONTINUATION = 255
+CONTINUATION_PATTERN = re.compile(b'\\xff+')
+# 每个级别的筛选表，把级别代码转换为是否不低于该级别
+LEVEL_TABLES = [bytes(1 if code >= level else 0 for code in range(256)) for level in range(len(LEVELS))]
+
+
+class LogIndex:
+    """
+    日志文件的行索引。读取时建立的映射会占用文件，每次轮询或绘制之后调用 release 释放。
+
+    行号从上一个文件（轮转后的 `.1` 备份）开始，接着是当前文件。两个文件中行的字节位置各自从 0 开始。
+    最早的文件可能只从中间开始编入索引，start 之前的行由 index_older 补上。
+
+    :param path: 日志文件路径。
+    :param chunk_size: 每批建立索引的字节数。
+    """
+
+    def __init__(self,
+                 path: str,
+                 chunk_size: int = 2 * 1024 * 1024):
+        self.path = path
+        self.archived_path = f'{path}.1'
+        self.chunk_size = chunk_size
+        self.offsets = array('q')
+        # 每行的级别代码，以及每个级别不低于它的行号。DEBUG 以上就是全部行，不单独保存
+        self.levels = bytearray()
+        self.level_rows: List[Optional[array]] = [None] + [array('i') for _ in LEVELS[1:]]
+        # 当前文件已编入索引的字节位置，即最后一个完整行之后
+        self.end = 0
+        # 最早的文件中第一个已编入索引的行的字节位置，以及开头几行续行的行数。续行在补上之前的行后重新确定级别
+        self.start = 0
+        self.head_continuations = 0
+        # 上一个文件的行数和字节数
+        self.archived_rows = 0
+        self.archived_end = 0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._archived_identity: Optional[Tuple[int, int]] = None
+        # 路径 -> 映射，在 release 之前复用
+        self._maps: Dict[str, mmap.mmap] = {}
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def release(self) -> None:
+        """
+        释放全部映射，下次读取时重新映射。
+
+        :return: 无返回值。
+        """
+        for data in self._maps.values():
+            data.close()
+        self._maps.clear()
+
+    def close(self) -> None:
+        """
+        释放映射，与 release 相同。
+
+        :return: 无返回值。
+        """
+        self.release()
+
+    def reset(self) -> None:
+        """
+        清空索引，下次刷新时从头建立。
+
+        :return: 无返回值。
+        """
+        self.release()
+        self.offsets = array('q')
+        self.levels = bytearray()
+        self.level_rows = [None] + [array('i') for _ in LEVELS[1:]]
+        self.end = 0
+        self.start = 0
+        self.head_continuations = 0
+        self.archived_rows = 0
+        self.archived_end = 0
+        self._identity = None
+        self._archived_identity = None
+
+    def refresh(self) -> bool:
+        """
+        释放映射并检查文件变化。文件被轮转时保留原文件的行，文件被清空或替换时清空索引。
+
+        :return: 有行从索引中移除时返回 True，否则返回 False。
+        """
+        self.release()
+        stat = self._stat(self.path)
+        identity = stat[:2] if stat is not None else None
+        if self._identity is None:
+            # 当前文件还没有建立索引，从末尾开始
+            self._identity = identity
+            if stat is not None:
+                self._seed(stat[2])
+            return False
+        if stat is not None and (identity == self._identity or not stat[1]):
+            # 部分文件系统没有节点号，只能通过大小判断清空
+            if stat[2] >= self.end:
+                return False
+        elif self._stat(self.archived_path, self._identity) is not None:
+            removed = self._archive()
+            self._identity = identity
+            return removed
+        removed = len(self.offsets) > 0
+        self.reset()
+        self._identity = identity
+        return removed
+
+    def _archive(self) -> bool:
+        """
+        当前文件已被轮转为备份：读完其中剩余的行，把它作为上一个文件，移除更早的上一个文件的行。
+
+        :return: 有行被移除时返回 True，否则返回 False。
+        """
+        while self._index_batch(self.archived_path):
+            pass
+        dropped = self.archived_rows
+        if dropped:
+            del self.offsets[:dropped]
+            del self.levels[:dropped]
+            for level in range(1, len(LEVELS)):
+                rows = self.level_rows[level]
+                self.level_rows[level] = array('i', map(sub, rows[bisect_right(rows, dropped - 1):], repeat(dropped)))
+        self.release()
+        self.archived_rows = len(self.offsets)
+        self.archived_end = self.end
+        self._archived_identity = self._identity
+        self.end = 0
+        # 更早的文件已被移除，新的上一个文件是从头建立索引的
+        if dropped or not self.archived_rows:
+            self.start = 0
+            self.head_continuations = 0
+        return dropped > 0
+
+    def _seed(self, size: int) -> None:
+        """
+        把建立索引的起点移到文件末尾往前一批之后的第一个完整行。文件不超过一批时从头开始。
+
+        :param size: 文件大小。
+        :return: 无返回值。
+        """
+        position = size - self.chunk_size
+        if position <= 0:
+            return
+        data = self._mapping(self.path, self._identity)
+        if data is None:
+            return
+        newline = data.find(b'\n', position - 1, size - 1)
+        if newline == -1:
+            # 最后一行超过一批的长度，从它的开头开始
+            newline = data.rfind(b'\n', 0, position)
+        self.start = self.end = newline + 1
+
+    @staticmethod
+    def _stat(path: str,
+              identity: Optional[Tuple[int, int]] = None) -> Optional[Tuple[int, int, int]]:
+        """
+        获取文件的设备号、节点号和大小。
+
+        :param path: 文件路径。
+        :param identity: 期望的 (设备号, 节点号)，文件不是同一个时视为不存在。
+        :return: (设备号, 节点号, 大小) 元组，文件不存在时返回 None。
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if identity is not None and (stat.st_dev, stat.st_ino) != identity:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_size
+
+    def _mapping(self,
+                 path: str,
+                 identity: Optional[Tuple[int, int]]) -> Optional[mmap.mmap]:
+        """
+        映射文件，已映射时直接返回。文件已被替换（节点号不同）时不映射，避免按旧的位置读到别的内容。
+
+        :param path: 文件路径。
+        :param identity: 期望的 (设备号, 节点号)。
+        :return: 映射，文件不存在、为空或已被替换时返回 None。
+        """
+        data = self._maps.get(path)
+        if data is not None:
+            return data
+        try:
+            with open(path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if identity is not None and stat.st_ino and (stat.st_dev, stat.st_ino) != identity:
+                    return None
+                # 映射持有自己的文件句柄，关闭文件对象不影响映射
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        self._maps[path] = data
+        return data
+
+    def _segment(self, row: int) -> Tuple[int, Optional[mmap.mmap], int]:
+        """
+        找到行所在的文件。
+
+        :param row: 行号。
+        :return: (文件的结束行号, 映射, 已编入索引的字节数) 元组，映射失败时映射为 None。
+        """
+        if row < self.archived_rows:
+            return self.archived_rows, self._mapping(self.archived_path, self._archived_identity), self.archived_end
+        return len(self.offsets), self._mapping(self.path, self._identity), self.end
+
+    def index_more(self) -> int:
+        """
+        为当前文件下一批字节中的完整行建立索引。
+
+        :return: 新增的行数，没有可以建立索引的内容时返回 0。
+        """
+        return self._index_batch(self.path)
+
+    def _index_batch(self, path: str) -> int:
+        """
+        为下一批字节中的完整行建立索引。轮转后原文件已改名，需要从备份中读完剩余的行。
+
+        :param path: 当前文件的路径。
+        :return: 新增的行数，没有可以建立索引的内容时返回 0。
+        """
+        data = self._mapping(path, self._identity)
+        if data is None or self.end >= len(data):
+            return 0
+        chunk = data[self.end:self.end + self.chunk_size]
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            # 一行超过一批的长度，扩大到下一个换行符
+            cut = data.find(b'\n', self.end + len(chunk)) + 1 - self.end
+            if cut <= 0:
+                return 0
+            chunk = data[self.end:self.end + cut]
+        lines = chunk[:cut].split(b'\n')
+        lines.pop()
+        # 每行的起始位置等于此前各行长度加换行符之和，全部在 C 层面完成
+        starts = array('q', accumulate(map(add, map(len, lines), repeat(1)), initial=self.end))
+        starts.pop()
+        first = len(self.offsets)
+        self.offsets.extend(starts)
+        self._index_levels(lines, first)
+        self.end += cut
+        return len(lines)
+
+    def index_older(self) -> int:
+        """
+        为最早的文件中 start 之前一批字节里的完整行建立索引，插入到最前面，已有的行号全部后移。
+
+        :return: 插入的行数，已经到达文件开头时返回 0。
+        """
+        if not self.start:
+            return 0
+        if self.archived_rows:
+            data = self._mapping(self.archived_path, self._archived_identity)
+        else:
+            data = self._mapping(self.path, self._identity)
+        if data is None or self.start > len(data):
+            return 0
+        # 从一批字节之前的第一个完整行开始，一行超过一批的长度时扩大到上一个换行符
+        begin = max(self.start - self.chunk_size, 0)
+        boundary = data.find(b'\n', begin - 1, self.start - 1) + 1 if begin else 0
+        if begin and not boundary:
+            boundary = data.rfind(b'\n', 0, begin) + 1
+        lines = data[boundary:self.start].split(b'\n')
+        lines.pop()
+        starts = array('q', accumulate(map(add, map(len, lines), repeat(1)), initial=boundary))
+        starts.pop()
+        count = len(lines)
+        codes, lead = self._level_codes(lines, 0)
+        # 原来开头的续行属于这一批的最后一条日志，改用它的级别
+        head = self.head_continuations
+        last = codes[-1]
+        self.levels[:head] = bytes([last]) * head
+        self.offsets[0:0] = starts
+        self.levels[0:0] = codes
+        rows = range(count)
+        # 原地修改各级别的行号数组，共用数组的调用方不需要重新获取
+        for level in range(1, len(LEVELS)):
+            level_rows = self.level_rows[level]
+            prefix = array('i', compress(rows, codes.translate(LEVEL_TABLES[level])))
+            if last >= level:
+                prefix.extend(range(count, count + head))
+            level_rows[:] = prefix + array('i', map(add, level_rows, repeat(count)))
+        if self.archived_rows:
+            self.archived_rows += count
+        self.start = boundary
+        # 这一批全是续行时，原来开头的续行仍然没有确定级别
+        self.head_continuations = lead + head if lead == count else lead
+        return count
+
+    @staticmethod
+    def _level_codes(lines: List[bytes],
+                     previous: int) -> Tuple[bytearray, int]:
+        """
+        识别一批行的级别代码，续行沿用前一行的级别。
+
+        :param lines: 行字节列表。
+        :param previous: 这批行之前一行的级别代码，开头的续行使用这个级别。
+        :return: (级别代码, 开头续行的行数) 元组。
+        """
+        codes = bytearray(LEVEL_CODES.get(line[LEVEL_SLICE], CONTINUATION) for line in lines)
+        lead = len(codes) - len(codes.lstrip(bytes([CONTINUATION])))
+        for match in CONTINUATION_PATTERN.finditer(codes):
+            start, stop = match.span()
+            codes[start:stop] = bytes([codes[start - 1] if start else previous]) * (stop - start)
+        return codes, lead
+
+    def _index_levels(self,
+                      lines: List[bytes],
+                      first: int) -> None:
+        """
+        记录一批行的级别，并追加到各级别的行号数组。
+
+        :param lines: 行字节列表。
+        :param first: 第一行的行号。
+        :return: 无返回值。
+        """
+        # 续行沿用前一行的级别，文件开头的续行暂时视为 DEBUG
+        codes, lead = self._level_codes(lines, self.levels[-1] if self.levels else 0)
+        if len(self.levels) == self.head_continuations:
+            self.head_continuations += lead
+        self.levels.extend(codes)
+        rows = range(first, first + len(codes))
+        for level in range(1, len(LEVELS)):
+            self.level_rows[level].extend(compress(rows, codes.translate(LEVEL_TABLES[level])))
+
+    def line(self, row: int) -> str:
+        """
+        读取一行文本，不含换行符。
+
+        :param row: 行号。
+        :return: 行文本。
+        """
+        return self.raw_line(row).decode('utf-8', errors='replace').rstrip('\r')
+
+    def raw_line(self, row: int) -> bytes:
+        """
+        读取一行的原始字节，不含换行符。
+
+        :param row: 行号。
+        :return: 行字节。
+        """
+        last, data, end = self._segment(row)
+        if data is None:
+            return b''
+        start = self.offsets[row]
+        stop = self.offsets[row + 1] if row + 1 < last else end
+        return data[start:stop - 1]
+
+    def level(self, row: int) -> str:
+        """
+        获取一行所属日志的级别。
+
+        :param row: 行号。
+        :return: 日志级别。
+        """
+        return LEVELS[self.levels[row]]
+
+    def search(self,
+               text: str,
+               first: int = 0,
+               last: Optional[int] = None,
+               min_level: int = 0) -> array:
+        """
+        查找包含指定文字的行，区分大小写。不区分大小写的正则查找比直接查找字节串慢几十倍。
+
+        :param text: 要查找的文字。
+        :param first: 起始行号。
+        :param last: 结束行号，不含，默认到最后一行。
+        :param min_level: 最低级别代码。
+        :return: 命中的行号数组。
+        """
+        last = len(self.offsets) if last is None else last
+        rows = array('i')
+        needle = text.encode('utf-8')
+        # 上一个文件和当前文件分别查找，行的字节位置各自从 0 开始
+        for segment_first in ((0, self.archived_rows) if self.archived_rows else (0,)):
+            segment_last, data, end = self._segment(segment_first)
+            begin, stop_row = max(first, segment_first), min(last, segment_last)
+            if data is None or begin >= stop_row:
+                continue
+            stop = self.offsets[stop_row] if stop_row < segment_last else end
+            position = self.offsets[begin]
+            while True:
+                found = data.find(needle, position, stop)
+                if found == -1:
+                    break
+                row = bisect_right(self.offsets, found, begin, stop_row) - 1
+                if self.levels[row] >= min_level:
+                    rows.append(row)
+                # 每行只记录一次，从下一行开头继续查找
+                if row + 1 >= stop_row:
+                    break
+                position = self.offsets[row + 1]
+        return rows
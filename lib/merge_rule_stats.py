@@ -0,0 +1,24 @@
+"""
+这个模块主要用于把代理推送的一批规则命中数据合并到累计统计中。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from typing import Dict, Any, List
+
+
+def merge_rule_stats(stats: Dict[str, Dict[str, Any]],
+                     batch: Dict[str, List]) -> None:
+    """
+    把一批命中数据合并到累计统计中，直接修改传入的统计字典。
+
+    :param stats: 累计统计，键为规则，值为 {"hits": 次数, "last_hit": 时间戳, "bytes": 字节数}。
+    :param batch: 命中数据，键为规则，值为 [次数, 最后命中时间戳, 字节数]。
+    :return: 无返回值。
+    """
+    for pattern, (hits, last_hit, size) in batch.items():
+        entry = stats.setdefault(pattern, {"hits": 0, "last_hit": 0, "bytes": 0})
+        entry["hits"] += hits
+        entry["last_hit"] = max(entry["last_hit"], last_hit)
+        entry["bytes"] += size
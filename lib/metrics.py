@@ -0,0 +1,105 @@
+"""
+这个模块提供固定分桶的直方图，以及 Prometheus 文本格式的输出函数。
+
+直方图记录一个值只需要一次二分查找和两次加法，适合在代理处理每个请求时调用；累计计数在输出时才计算。
+
+使用示例：
+
+```python
+histogram = Histogram((0.01, 0.1, 1))
+histogram.observe(0.05)
+lines = []
+write_histogram(lines, 'fgs_ttfb_seconds', 'Time to first byte.', {'mole.61.com': histogram})
+text = '\n'.join(lines) + '\n'
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+
+class Histogram:
+    """
+    固定分桶直方图。
+
+    :param buckets: 从小到大排列的桶上限，最后自动追加 +Inf。
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        记录一个值。
+
+        :param value: 要记录的值。
+        :return: 无返回值。
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def escape_label(value: str) -> str:
+    """
+    转义标签值中的反斜杠、双引号和换行。
+
+    :param value: 标签值。
+    :return: 转义后的标签值。
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_counter(lines: List[str],
+                  name: str,
+                  help_text: str,
+                  values: Dict[str, float],
+                  label: str = 'host') -> None:
+    """
+    以 Prometheus 文本格式输出一组计数器。
+
+    :param lines: 输出行列表，结果追加到末尾。
+    :param name: 指标名。
+    :param help_text: 指标说明。
+    :param values: 标签值到计数的映射。
+    :param label: 标签名。
+    :return: 无返回值。
+    """
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in values.items():
+        lines.append(f'{name}{{{label}="{escape_label(key)}"}} {value}')
+
+
+def write_histogram(lines: List[str],
+                    name: str,
+                    help_text: str,
+                    histograms: Dict[str, Histogram],
+                    label: str = 'host') -> None:
+    """
+    以 Prometheus 文本格式输出一组直方图，桶计数为累计值。
+
+    :param lines: 输出行列表，结果追加到末尾。
+    :param name: 指标名。
+    :param help_text: 指标说明。
+    :param histograms: 标签值到直方图的映射。
+    :param label: 标签名。
+    :return: 无返回值。
+    """
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in histograms.items():
+        key = escape_label(key)
+        total = 0
+        for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.sum}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
@@ -0,0 +1,51 @@
+"""
+这个模块提供拦截资源时使用的最小占位内容，包括空白 SWF、1×1 透明 PNG/GIF 和静音 MP3。
+
+占位内容都是合法文件，游戏加载后会当作资源已经就绪，不会重试或卡住加载队列。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import struct
+import zlib
+
+
+def make_swf() -> bytes:
+    """
+    生成只有一帧的空白 SWF 文件（未压缩，版本 10，AS3）。
+
+    :return: SWF 文件内容。
+    """
+    # 舞台尺寸为全 0 的 RECT（5 位 Nbits=0），帧率 24，1 帧
+    body = b'\x00' + struct.pack('<HH', 24 << 8, 1)
+    # FileAttributes(69) 标记 AS3，ShowFrame(1)，End(0)
+    tags = struct.pack('<HI', 69 << 6 | 4, 0x08) + struct.pack('<H', 1 << 6) + struct.pack('<H', 0)
+    length = 8 + len(body) + len(tags)
+    return b'FWS' + bytes([10]) + struct.pack('<I', length) + body + tags
+
+
+def make_png() -> bytes:
+    """
+    生成 1×1 全透明 PNG 图片。
+
+    :return: PNG 文件内容。
+    """
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    # 8 位 RGBA，每行前有一个过滤字节
+    header = struct.pack('>IIBBBBB', 1, 1, 8, 6, 0, 0, 0)
+    pixels = zlib.compress(b'\x00\x00\x00\x00\x00')
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', pixels) + chunk(b'IEND', b'')
+
+
+# 1×1 透明 GIF
+GIF_CONTENT = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+               b'!\xf9\x04\x01\x00\x00\x00\x00'
+               b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+# 一帧静音 MP3：MPEG-1 Layer III，32kbps，44100Hz，单声道，帧长 104 字节，边信息全 0
+MP3_CONTENT = b'\xff\xfb\x10\xc0' + b'\x00' * 100
+SWF_CONTENT = make_swf()
+PNG_CONTENT = make_png()
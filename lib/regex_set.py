@@ -0,0 +1,117 @@
+"""
+这个模块提供正则表达式集合，把多条正则表达式合并为少数几个组合表达式，一次扫描即可判断文本是否命中其中任意一条。
+
+每条表达式包在一个命名分组中，用 `|` 连接，命中后通过 `lastgroup` 得到命中的是哪一条。表达式按固定数量分块合并，
+避免单个组合表达式过大导致编译缓慢。含有反向引用的表达式合并后组号会变化，单独编译；
+开头的全局标志（例如 `(?i)`）改写为只作用于该表达式的局部标志。
+合并后无法编译的分块退回逐条编译，仍然无法编译的表达式记入 `invalid`。
+
+使用示例：
+
+```python
+regex_set = RegexSet([r'/resource/npc/\\d+/body\\.swf', r'\\.mp3$'])
+regex_set.search_index('http://mole.61.com/resource/npc/1001/body.swf')  # 0
+regex_set.search_index('http://mole.61.com/sound/1.mp3')  # 1
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import re
+from typing import Iterable, List, Tuple, Pattern
+
+# 反向引用，合并后组号会变化
+BACKREFERENCE_PATTERN = re.compile(r'\\[1-9]|\(\?P=')
+# 表达式开头的全局标志
+GLOBAL_FLAGS_PATTERN = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+
+class RegexSet:
+    """
+    正则表达式集合。与依次对每条表达式执行 `re.search` 相比，每个分块只需要扫描一次文本。
+
+    多条表达式同时命中时，同一分块内返回在文本中最先命中的一条，不同分块之间返回序号最小的一条。
+
+    :param expressions: 正则表达式字符串列表。
+    :param chunk_size: 每个组合表达式最多包含的表达式数量。
+    """
+
+    def __init__(self,
+                 expressions: Iterable[str],
+                 chunk_size: int = 200):
+        self.expressions: List[str] = list(expressions)
+        # 无法编译的表达式序号
+        self.invalid: List[int] = []
+        # (编译好的表达式, 分组对应的表达式序号)，单独编译的表达式没有外层分组
+        self._chunks: List[Tuple[Pattern, List[int]]] = []
+        self._build(chunk_size)
+
+    def __len__(self) -> int:
+        return len(self.expressions)
+
+    def _build(self, chunk_size: int) -> None:
+        """
+        分块编译组合表达式。
+
+        :param chunk_size: 每个组合表达式最多包含的表达式数量。
+        :return: 无返回值。
+        """
+        combined: List[int] = []
+        for index, expression in enumerate(self.expressions):
+            if BACKREFERENCE_PATTERN.search(expression):
+                self._compile_single(index)
+            else:
+                combined.append(index)
+
+        for start in range(0, len(combined), chunk_size):
+            indexes = combined[start:start + chunk_size]
+            source = '|'.join(f'(?P<g{i}>{self.scope_flags(self.expressions[index])})' for i, index in enumerate(indexes))
+            try:
+                self._chunks.append((re.compile(source), indexes))
+            except (re.error, RecursionError, OverflowError):
+                for index in indexes:
+                    self._compile_single(index)
+
+    @staticmethod
+    def scope_flags(expression: str) -> str:
+        """
+        把表达式开头的全局标志改写为局部标志，例如 `(?i)abc` 改写为 `(?i:abc)`，合并后不影响其他表达式。
+
+        :param expression: 正则表达式字符串。
+        :return: 改写后的表达式。
+        """
+        match = GLOBAL_FLAGS_PATTERN.match(expression)
+        if match is None:
+            return expression
+        return f'(?{match.group(1)}:{expression[match.end():]})'
+
+    def _compile_single(self, index: int) -> None:
+        """
+        单独编译一条表达式，无法编译时记入 `invalid`。
+
+        :param index: 表达式序号。
+        :return: 无返回值。
+        """
+        try:
+            self._chunks.append((re.compile(self.expressions[index]), [index]))
+        except (re.error, RecursionError, OverflowError):
+            self.invalid.append(index)
+
+    def search_index(self, text: str) -> int:
+        """
+        查找文本命中的表达式序号。
+
+        :param text: 要查找的文本。
+        :return: 命中的表达式序号，没有命中返回 -1。
+        """
+        best = -1
+        for regex, indexes in self._chunks:
+            match = regex.search(text)
+            if match is None:
+                continue
+            # 外层分组最后闭合，lastgroup 总是命中表达式的外层分组
+            found = indexes[0] if len(indexes) == 1 else indexes[int(match.lastgroup[1:])]
+            if best == -1 or found < best:
+                best = found
+        return best
@@ -0,0 +1,322 @@
+"""
+这个模块提供基于 SQLite 的规则存储，可以代替 JSON 格式的用户配置文件保存大量规则。
+
+每条规则占一行，按加入顺序编号，另外保存规则的主机名，并对启用状态和规则类型建立索引。数据库使用 WAL 日志，
+读取不会阻塞写入；批量修改在一个事务中完成，中途出错时整体回滚。启动代理时只查询已启用的规则，界面分页读取，
+不需要把全部规则一次载入为字典。可以从现有的 JSON 配置导入，也可以导出为相同格式。
+
+使用示例：
+
+```python
+database = RuleDatabase('config/config_user.db')
+database.import_json('config/config_user.json')
+database.set_active(['/resource/bg/'], True)
+rules = database.get_active_rules()
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import logging
+import os
+import sqlite3
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple, Union
+
+from config.settings import RULE_KIND_HOST, RULE_KIND_URL, RESPONSE_MODE_403
+from lib.read_json import read_json
+from lib.rule_index import RuleIndex, split_url
+from lib.write_json import write_json
+
+logger = logging.getLogger(__name__)
+
+# 没有按主机名的查询，旧版本创建的主机名索引只会拖慢写入，打开时删除
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    pattern TEXT NOT NULL UNIQUE,
+    active INTEGER NOT NULL DEFAULT 0,
+    description TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL DEFAULT '{RULE_KIND_URL}',
+    response TEXT NOT NULL DEFAULT '{RESPONSE_MODE_403}',
+    host TEXT NOT NULL DEFAULT ''
+);
+DROP INDEX IF EXISTS rules_host;
+CREATE INDEX IF NOT EXISTS rules_active ON rules (active);
+CREATE INDEX IF NOT EXISTS rules_kind ON rules (kind);
+"""
+# 新增或替换规则。替换时保留原编号，规则在列表中的位置不变
+UPSERT = """
+INSERT INTO rules (pattern, active, description, kind, response, host) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (pattern) DO UPDATE SET
+    active = excluded.active, description = excluded.description, kind = excluded.kind,
+    response = excluded.response, host = excluded.host
+"""
+COLUMNS = "pattern, active, description, kind, response"
+
+
+def is_rule_database(path: Union[str, os.PathLike]) -> bool:
+    """
+    按扩展名判断用户配置文件是否为规则数据库。
+
+    :param path: 用户配置文件路径。
+    :return: 扩展名为 .db、.sqlite 或 .sqlite3 时返回 True。
+    """
+    return os.path.splitext(str(path))[1].lower() in ('.db', '.sqlite', '.sqlite3')
+
+
+def read_rules(path: Union[str, os.PathLike],
+               active_only: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    读取用户配置中的规则，JSON 文件和规则数据库都可以，供命令行工具使用。
+
+    :param path: 用户配置文件路径。
+    :param active_only: 是否只读取已启用的规则。
+    :return: 规则字典，文件不存在或读取失败时返回空字典。
+    """
+    if not os.path.isfile(path):
+        return {}
+    if is_rule_database(path):
+        database = RuleDatabase(path)
+        try:
+            return database.get_active_rules() if active_only else database.get_rules()
+        finally:
+            database.close()
+    rules = read_json(path)
+    if not isinstance(rules, dict):
+        return {}
+    rules = valid_rules(rules, path)
+    return {key: info for key, info in rules.items() if info.get('active', False)} if active_only else rules
+
+
+def valid_rules(rules: Dict[str, Any],
+                path: Union[str, os.PathLike]) -> Dict[str, Dict[str, Any]]:
+    """
+    去掉规则信息不是字典的条目，例如手工编辑出错的配置文件，并输出警告。
+
+    :param rules: 从 JSON 文件读取的规则字典。
+    :param path: JSON 文件路径，用于警告信息。
+    :return: 规则信息都是字典的规则字典。
+    """
+    valid = {key: info for key, info in rules.items() if isinstance(info, dict)}
+    if len(valid) < len(rules):
+        logger.warning(f"Skipped {len(rules) - len(valid)} invalid rules in {path}")
+    return valid
+
+
+class RuleDatabase:
+    """
+    规则数据库。连接只能在创建它的线程中使用，其他线程需要各自创建实例。
+
+    :param path: 数据库文件路径，不存在时自动创建。
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 自动提交模式，事务由 transaction 显式控制
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """
+        关闭数据库连接。
+
+        :return: 无返回值。
+        """
+        self.connection.close()
+
+    @staticmethod
+    def rule_host(pattern: str, kind: str) -> str:
+        """
+        取出规则作用的主机名，用于按主机查询。只有整主机规则和以协议开头的地址规则有主机名。
+
+        :param pattern: 规则。
+        :param kind: 规则类型。
+        :return: 小写主机名，没有时返回空字符串。
+        """
+        if kind == RULE_KIND_HOST:
+            return RuleIndex.normalize_host(pattern)
+        if kind == RULE_KIND_URL:
+            parts = split_url(pattern)
+            return parts[1] if parts is not None else ''
+        return ''
+
+    @classmethod
+    def to_row(cls,
+               pattern: str,
+               info: Dict[str, Any]) -> Tuple[str, int, str, str, str, str]:
+        """
+        把规则信息转换为数据库中的一行。
+
+        :param pattern: 规则。
+        :param info: 规则信息。
+        :return: (规则, 启用状态, 描述, 类型, 响应, 主机名) 元组。
+        """
+        kind = info.get('kind', RULE_KIND_URL)
+        return (pattern, 1 if info.get('active', False) else 0, info.get('description', ''), kind,
+                info.get('response', RESPONSE_MODE_403), cls.rule_host(pattern, kind))
+
+    @staticmethod
+    def to_info(row: Tuple) -> Dict[str, Any]:
+        """
+        把数据库中的一行转换为规则信息字典，格式与 JSON 配置相同。
+
+        :param row: (规则, 启用状态, 描述, 类型, 响应) 元组。
+        :return: 规则信息字典。
+        """
+        return {"active": bool(row[1]), "description": row[2], "kind": row[3], "response": row[4]}
+
+    def transaction(self) -> 'RuleDatabase':
+        """
+        开始一个事务，配合 with 语句使用，正常退出时提交，出现异常时回滚。
+
+        :return: 数据库自身。
+        """
+        return self
+
+    def __enter__(self) -> 'RuleDatabase':
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+    def count(self) -> int:
+        """
+        获取规则数量。
+
+        :return: 规则数量。
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+
+    def iter_rows(self, page_size: int = 5000) -> Iterator[Tuple[str, str, bool]]:
+        """
+        按加入顺序分页读取所有规则的地址、描述和启用状态，每次只从数据库取一页。
+
+        :param page_size: 每页行数。
+        :return: (规则, 描述, 启用状态) 元组的迭代器。
+        """
+        cursor = self.connection.execute("SELECT pattern, description, active FROM rules ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                return
+            for pattern, description, active in rows:
+                yield pattern, description, bool(active)
+
+    def get_rules(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按加入顺序读取全部规则。
+
+        :return: 规则字典。
+        """
+        return {row[0]: self.to_info(row) for row in self.connection.execute(f"SELECT {COLUMNS} FROM rules ORDER BY id")}
+
+    def get_active_rules(self) -> Dict[str, Dict[str, Any]]:
+        """
+        只读取已启用的规则，查询使用启用状态的索引。
+
+        :return: 已启用的规则字典。
+        """
+        return {row[0]: self.to_info(row) for row in self.connection.execute(f"SELECT {COLUMNS} FROM rules WHERE active = 1 ORDER BY id")}
+
+    def get_rule(self, pattern: str) -> Optional[Dict[str, Any]]:
+        """
+        读取一条规则。
+
+        :param pattern: 规则。
+        :return: 规则信息字典，规则不存在时返回 None。
+        """
+        row = self.connection.execute(f"SELECT {COLUMNS} FROM rules WHERE pattern = ?", (pattern,)).fetchone()
+        return None if row is None else self.to_info(row)
+
+    def update_rules(self,
+                     rules: Dict[str, Dict[str, Any]],
+                     removed: Iterable[str] = ()) -> List[str]:
+        """
+        在一个事务中删除和新增或替换规则。同时出现在两个参数中的规则按替换处理。
+
+        :param rules: 新增或替换的规则字典。
+        :param removed: 要删除的规则列表。
+        :return: 实际删除的规则列表。
+        """
+        removed = [pattern for pattern in removed if pattern not in rules]
+        with self.transaction():
+            existing = self._existing(removed)
+            self.connection.executemany("DELETE FROM rules WHERE pattern = ?", ((pattern,) for pattern in existing))
+            self.connection.executemany(UPSERT, (self.to_row(pattern, info) for pattern, info in rules.items()))
+        return existing
+
+    def set_active(self,
+                   patterns: Iterable[str],
+                   active: bool) -> Dict[str, Dict[str, Any]]:
+        """
+        在一个事务中设置多条规则的启用状态。
+
+        :param patterns: 规则列表。
+        :param active: 是否启用。
+        :return: 状态有变化的规则字典，值为更新后的规则信息。
+        """
+        changed = {}
+        with self.transaction():
+            for pattern in patterns:
+                row = self.connection.execute(f"SELECT {COLUMNS} FROM rules WHERE pattern = ? AND active = ?", (pattern, 0 if active else 1)).fetchone()
+                if row is not None:
+                    changed[pattern] = {**self.to_info(row), "active": active}
+            self.connection.executemany("UPDATE rules SET active = ? WHERE pattern = ?", ((1 if active else 0, pattern) for pattern in changed))
+        return changed
+
+    def replace_all(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        在一个事务中用给定的规则替换全部规则。
+
+        :param rules: 规则字典。
+        :return: 无返回值。
+        """
+        with self.transaction():
+            self.connection.execute("DELETE FROM rules")
+            self.connection.executemany(UPSERT, (self.to_row(pattern, info) for pattern, info in rules.items()))
+
+    def import_json(self, path: Union[str, os.PathLike]) -> int:
+        """
+        从 JSON 格式的用户配置导入规则，已存在的规则被替换，规则信息不是字典的条目跳过。
+
+        :param path: JSON 文件路径。
+        :return: 导入的规则数量，读取失败时返回 -1。
+        """
+        rules = read_json(path)
+        if not isinstance(rules, dict):
+            return -1
+        rules = valid_rules(rules, path)
+        self.update_rules(rules)
+        logger.info(f"Imported {len(rules)} rules from {path}")
+        return len(rules)
+
+    def export_json(self, path: Union[str, os.PathLike]) -> bool:
+        """
+        把全部规则导出为 JSON 格式的用户配置。
+
+        :param path: JSON 文件路径。
+        :return: 成功时返回 True，失败时返回 False。
+        """
+        return write_json(path, self.get_rules())
+
+    def _existing(self, patterns: List[str]) -> List[str]:
+        """
+        筛选出数据库中存在的规则。
+
+        :param patterns: 规则列表。
+        :return: 存在的规则列表，顺序不变。
+        """
+        found = set()
+        # SQLite 单条语句的参数数量有上限，分批查询
+        for start in range(0, len(patterns), 500):
+            batch = patterns[start:start + 500]
+            query = f"SELECT pattern FROM rules WHERE pattern IN ({','.join('?' * len(batch))})"
+            found.update(row[0] for row in self.connection.execute(query, batch))
+        return [pattern for pattern in patterns if pattern in found]
@@ -0,0 +1,272 @@
+"""
+这个模块提供按主机分区的规则索引，用于快速判断一个 URL 是否命中拦截规则。
+
+形如 `http://mole.61.com/resource/bg/` 的规则会被拆分为协议、主机和路径三部分，按 (协议, 主机) 分桶，每个桶内维护一棵路径前缀树。
+请求只需要查找自己主机所在的桶；无法解析为 URL 的规则，例如 `/resource/bg/`，退回到通用的子串匹配。
+整主机规则单独保存，可以在 CONNECT 阶段只凭主机名判断。通配符规则合并为一个按前缀树组织的正则表达式，正则表达式规则分块合并为少数几个组合表达式，两者与通用规则一样匹配任何主机。
+
+使用示例：
+
+```python
+index = RuleIndex(['http://mole.61.com/resource/bg/', '.mp3'], host_patterns=['ads.61.com'], glob_patterns=['/npc/*/body.swf'])
+index.match('http://mole.61.com/resource/bg/1001.swf')  # 'http://mole.61.com/resource/bg/'
+index.match('http://mole.61.com/resource/npc/1001/body.swf')  # '/npc/*/body.swf'
+index.match('http://hua.61.com/sound/1.mp3')  # '.mp3'
+index.match_host('ads.61.com')  # 'ads.61.com'
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import re
+from typing import Iterable, List, Dict, Optional, Tuple, Set
+
+from lib.aho_corasick import AhoCorasick
+from lib.glob_set import GlobSet
+from lib.regex_set import RegexSet
+
+# 协议、主机（含 IPv6 方括号形式）和剩余部分
+URL_PATTERN = re.compile(r'^(https?)://(\[[^\]]*\]|[^:/?#]+)(.*)$', re.IGNORECASE | re.DOTALL)
+
+
+def split_url(url: str) -> Optional[Tuple[str, str, str]]:
+    """
+    将 URL 拆分为协议、主机和剩余部分，协议和主机统一转为小写。
+
+    :param url: 要拆分的 URL。
+    :return: (协议, 主机, 剩余部分) 元组，不是 http 或 https 地址时返回 None。
+    """
+    match = URL_PATTERN.match(url)
+    if match is None:
+        return None
+    scheme, host, rest = match.groups()
+    return scheme.lower(), host.lower(), rest
+
+
+class PrefixTrie:
+    """
+    压缩前缀树，保存若干键及其序号，查找给定文本的所有前缀中序号最小的键。
+
+    每个节点为 [子边字典, 序号]，子边字典以边标签首字符为键，值为 (边标签, 子节点)。
+    """
+
+    def __init__(self):
+        self._root: list = [{}, -1]
+
+    def insert(self, key: str, value: int) -> None:
+        """
+        插入一个键，同一个键重复插入时保留较小的序号。
+
+        :param key: 要插入的键。
+        :param value: 键对应的序号。
+        :return: 无返回值。
+        """
+        node = self._root
+        pos = 0
+        while pos < len(key):
+            edge = node[0].get(key[pos])
+            if edge is None:
+                node[0][key[pos]] = (key[pos:], [{}, value])
+                return
+            label, child = edge
+            # 计算边标签和剩余键的公共前缀长度
+            common = 0
+            limit = min(len(label), len(key) - pos)
+            while common < limit and label[common] == key[pos + common]:
+                common += 1
+            if common < len(label):
+                # 公共前缀不足整条边，从中间拆分
+                middle = [{label[common]: (label[common:], child)}, -1]
+                node[0][key[pos]] = (label[:common], middle)
+                child = middle
+            node = child
+            pos += common
+        if node[1] == -1 or value < node[1]:
+            node[1] = value
+
+    def search(self, text: str) -> int:
+        """
+        沿文本向下查找，返回作为文本前缀的键中最小的序号。
+
+        :param text: 要查找的文本。
+        :return: 最小序号，没有任何键是文本的前缀时返回 -1。
+        """
+        node = self._root
+        best = node[1]
+        pos = 0
+        while pos < len(text):
+            edge = node[0].get(text[pos])
+            if edge is None:
+                break
+            label, node = edge
+            if not text.startswith(label, pos):
+                break
+            pos += len(label)
+            if node[1] != -1 and (best == -1 or node[1] < best):
+                best = node[1]
+        return best
+
+
+class RuleIndex:
+    """
+    按主机分区的规则索引。整主机规则匹配该主机的所有请求，可解析为 URL 的规则按前缀匹配，其余规则按子串匹配，
+    通配符和正则表达式规则在 URL 中查找。
+
+    :param patterns: 地址规则列表，多条规则同时命中时返回列表中最靠前的一条。
+    :param host_patterns: 整主机规则列表，可以是主机名或 URL，优先于地址规则。
+    :param glob_patterns: 通配符规则列表，排在地址规则之后。
+    :param regex_patterns: 正则表达式规则列表，排在通配符规则之后。无法编译的规则被忽略，记入 `invalid`。
+    """
+
+    def __init__(self,
+                 patterns: Iterable[str],
+                 host_patterns: Iterable[str] = (),
+                 glob_patterns: Iterable[str] = (),
+                 regex_patterns: Iterable[str] = ()):
+        host_patterns = list(host_patterns)
+        # 整主机规则排在前面，序号更小，通配符和正则表达式规则排在最后
+        self.patterns: List[str] = host_patterns + list(patterns)
+        self._glob_offset = len(self.patterns)
+        self._globs = GlobSet(glob_patterns)
+        self.patterns += self._globs.patterns
+        self._regex_offset = len(self.patterns)
+        self._regexes = RegexSet(regex_patterns)
+        self.patterns += self._regexes.expressions
+        self._blocked_hosts: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[str, str], PrefixTrie] = {}
+        self._generic_index: List[int] = []
+
+        for index, pattern in enumerate(host_patterns):
+            self._blocked_hosts.setdefault(self.normalize_host(pattern), index)
+
+        for index, pattern in enumerate(self.patterns[len(host_patterns):self._glob_offset], len(host_patterns)):
+            parts = split_url(pattern)
+            if parts is None:
+                self._generic_index.append(index)
+                continue
+            scheme, host, rest = parts
+            self._buckets.setdefault((scheme, host), PrefixTrie()).insert(rest, index)
+
+        self._generic = AhoCorasick(self.patterns[i] for i in self._generic_index)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    @staticmethod
+    def normalize_host(pattern: str) -> str:
+        """
+        把整主机规则统一为小写主机名，规则写成 URL 时取其中的主机部分。
+
+        :param pattern: 整主机规则。
+        :return: 主机名。
+        """
+        parts = split_url(pattern)
+        return parts[1] if parts is not None else pattern.strip().lower()
+
+    @property
+    def hosts(self) -> Set[str]:
+        """
+        有主机规则或整主机规则的主机名集合。
+
+        :return: 主机名集合。
+        """
+        return {host for _, host in self._buckets} | set(self._blocked_hosts)
+
+    @property
+    def blocked_hosts(self) -> Set[str]:
+        """
+        整主机规则的主机名集合。
+
+        :return: 主机名集合。
+        """
+        return set(self._blocked_hosts)
+
+    @property
+    def generic_count(self) -> int:
+        """
+        按子串匹配的通用规则数量。
+
+        :return: 规则数量。
+        """
+        return len(self._generic_index)
+
+    @property
+    def expression_count(self) -> int:
+        """
+        通配符和正则表达式规则数量。
+
+        :return: 规则数量。
+        """
+        return len(self._globs) + len(self._regexes)
+
+    @property
+    def invalid(self) -> List[str]:
+        """
+        无法编译的正则表达式规则。
+
+        :return: 规则列表。
+        """
+        return [self._regexes.expressions[i] for i in self._regexes.invalid]
+
+    def host_regex(self) -> Optional[str]:
+        """
+        生成只匹配有规则主机的正则表达式，可以带端口，例如 `^(?:a\\.com|b\\.com)(?::\\d+)?$`。
+
+        通用规则、通配符和正则表达式规则可能命中任何主机，存在这些规则时返回 None；没有任何规则时返回不匹配任何内容的表达式。
+
+        :return: 正则表达式字符串或 None。
+        """
+        if self._generic_index or self._globs or self._regexes:
+            return None
+        hosts = sorted(host.strip('[]') for host in self.hosts)
+        if not hosts:
+            return r'(?!)'
+        return rf"^(?:{'|'.join(re.escape(host) for host in hosts)})(?::\d+)?$"
+
+    def match_host(self, host: str) -> Optional[str]:
+        """
+        查找主机命中的整主机规则。
+
+        :param host: 请求的主机名。
+        :return: 命中的规则，没有命中返回 None。
+        """
+        if not self._blocked_hosts:
+            return None
+        index = self._blocked_hosts.get(host.lower())
+        return None if index is None else self.patterns[index]
+
+    def match(self, url: str) -> Optional[str]:
+        """
+        查找 URL 命中的规则。
+
+        :param url: 请求的完整 URL。
+        :return: 命中的规则，没有命中返回 None。
+        """
+        best = -1
+        if self._buckets or self._blocked_hosts:
+            parts = split_url(url)
+            if parts is not None:
+                # 整主机规则序号小于所有地址规则，命中即可返回
+                host_index = self._blocked_hosts.get(parts[1])
+                if host_index is not None:
+                    return self.patterns[host_index]
+                trie = self._buckets.get(parts[:2])
+                if trie is not None:
+                    best = trie.search(parts[2])
+        if self._generic_index and best != 0:
+            found = self._generic.search_index(url)
+            if found != -1:
+                found = self._generic_index[found]
+                if best == -1 or found < best:
+                    best = found
+        # 通配符和正则表达式规则排在最后，前面的规则没有命中才需要查找
+        if self._globs and best == -1:
+            found = self._globs.search_index(url)
+            if found != -1:
+                best = self._glob_offset + found
+        if self._regexes and best == -1:
+            found = self._regexes.search_index(url)
+            if found != -1:
+                best = self._regex_offset + found
+        return None if best == -1 else self.patterns[best]
@@ -0,0 +1,164 @@
+"""
+这个模块提供按列保存规则的紧凑存储，供规则表格模型使用。
+
+每一列是一个列表或数组：规则和描述保存为字符串列表，启用状态保存为 bytearray，命中次数、最后命中时间和节省流量保存为
+`array` 数组，每条规则只占几十个字节，不为每行创建对象。行号就是列表下标，另有一个规则到行号的字典用于按规则查找。
+
+使用示例：
+
+```python
+store = RuleStore()
+store.load([("/resource/bg/", "背景", True)], {})
+store.row("/resource/bg/")  # 0
+store.sort('hits', reverse=True)
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from array import array
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+
+class RuleStore:
+    """
+    规则的列式存储。除规则外，每行还记录加入时的序号，用于恢复配置文件中的原始顺序。
+    """
+    # 可以排序的列
+    FIELDS = ('active', 'descriptions', 'keys', 'hits', 'last_hits', 'sizes', 'sequence')
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.descriptions: List[str] = []
+        self.active = bytearray()
+        self.hits = array('q')
+        self.last_hits = array('d')
+        self.sizes = array('q')
+        self.sequence = array('q')
+        self._rows: Dict[str, int] = {}
+        self._next_sequence = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def row(self, key: str) -> int:
+        """
+        查找规则所在的行。
+
+        :param key: 规则。
+        :return: 行号，规则不存在时返回 -1。
+        """
+        return self._rows.get(key, -1)
+
+    def load(self,
+             rows: Iterable[Tuple[str, str, bool]],
+             stats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        清空存储并按顺序载入全部规则和统计数据。规则逐条读取，可以直接传入数据库查询的迭代器。
+
+        :param rows: (规则, 描述, 启用状态) 元组的可迭代对象。
+        :param stats: 统计字典，键为规则，值为 {"hits": 次数, "last_hit": 时间戳, "bytes": 字节数}。
+        :return: 无返回值。
+        """
+        self._reorder([])
+        self._next_sequence = 0
+        for key, description, active in rows:
+            self.append(key, {'description': description, 'active': active}, stats.get(key))
+
+    def append(self,
+               key: str,
+               info: Dict[str, Any],
+               stats: Optional[Dict[str, Any]] = None) -> int:
+        """
+        在末尾追加一条规则。
+
+        :param key: 规则。
+        :param info: 规则信息。
+        :param stats: 规则的统计字典。
+        :return: 新行的行号。
+        """
+        stats = stats or {}
+        row = len(self.keys)
+        self.keys.append(key)
+        self.descriptions.append(info.get('description', ''))
+        self.active.append(1 if info.get('active', False) else 0)
+        self.hits.append(stats.get('hits', 0))
+        self.last_hits.append(stats.get('last_hit', 0))
+        self.sizes.append(stats.get('bytes', 0))
+        self.sequence.append(self._next_sequence)
+        self._next_sequence += 1
+        self._rows[key] = row
+        return row
+
+    def update(self,
+               row: int,
+               info: Dict[str, Any]) -> None:
+        """
+        更新一行的启用状态和描述。
+
+        :param row: 行号。
+        :param info: 规则信息。
+        :return: 无返回值。
+        """
+        self.descriptions[row] = info.get('description', '')
+        self.active[row] = 1 if info.get('active', False) else 0
+
+    def remove_rows(self, rows: Iterable[int]) -> None:
+        """
+        删除多行，其余行保持原有顺序。
+
+        :param rows: 要删除的行号。
+        :return: 无返回值。
+        """
+        removed = set(rows)
+        if not removed:
+            return
+        keep = [row for row in range(len(self.keys)) if row not in removed]
+        self._reorder(keep)
+
+    def set_stats(self, stats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        用最新的统计数据覆盖所有行的统计列。
+
+        :param stats: 统计字典。
+        :return: 无返回值。
+        """
+        for row, key in enumerate(self.keys):
+            entry = stats.get(key)
+            if entry is None:
+                continue
+            self.hits[row] = entry.get('hits', 0)
+            self.last_hits[row] = entry.get('last_hit', 0)
+            self.sizes[row] = entry.get('bytes', 0)
+
+    def sort(self,
+             field: str,
+             reverse: bool = False) -> List[int]:
+        """
+        按指定列排序，排序是稳定的。
+
+        :param field: 列名，见 FIELDS。
+        :param reverse: 是否降序。
+        :return: 排序后每一行原来的行号。
+        """
+        column = getattr(self, field)
+        order = sorted(range(len(self.keys)), key=column.__getitem__, reverse=reverse)
+        self._reorder(order)
+        return order
+
+    def _reorder(self, order: List[int]) -> None:
+        """
+        按给定的原行号列表重新排列所有列，不在列表中的行被删除。
+
+        :param order: 原行号列表。
+        :return: 无返回值。
+        """
+        self.keys = [self.keys[i] for i in order]
+        self.descriptions = [self.descriptions[i] for i in order]
+        self.active = bytearray(self.active[i] for i in order)
+        self.hits = array('q', (self.hits[i] for i in order))
+        self.last_hits = array('d', (self.last_hits[i] for i in order))
+        self.sizes = array('q', (self.sizes[i] for i in order))
+        self.sequence = array('q', (self.sequence[i] for i in order))
+        self._rows = {key: row for row, key in enumerate(self.keys)}
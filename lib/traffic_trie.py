@@ -0,0 +1,192 @@
+"""
+这个模块提供按主机和路径前缀汇总请求流量的前缀树，用于找出加载耗时最多的资源目录，并据此生成前缀规则建议。
+
+先用 `aggregate_flows` 把结构化请求日志按 (协议, 主机, 路径) 合并，路径去掉查询参数，几天的日志通常只剩几万个不同的地址；
+再把合并后的地址插入前缀树。树的第一层是主机，往下每个节点是一段路径（目录以 / 结尾），保存整棵子树的请求数、流量和耗时。
+节点的前缀就是 `协议://主机/` 加上从根到该节点的各段路径，可以直接作为地址规则，命中该节点下的所有请求。
+
+使用示例：
+
+```python
+trie = TrafficTrie()
+for (scheme, host, path), (requests, size, duration) in aggregate_flows(read_flow_log('logs/flows.bin')).items():
+    trie.add(scheme, host, path, requests, size, duration)
+for node in trie.suggest(limit=10):
+    print(node.prefix, node.requests, node.size, node.duration)
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from operator import attrgetter, not_
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from lib.flow_log import FlowBatch
+
+# 可用于排序的权重：请求数、流量和耗时
+WEIGHTS = ('requests', 'size', 'duration')
+
+
+def aggregate_flows(batches: Iterable[FlowBatch]) -> Dict[Tuple[str, str, str], List]:
+    """
+    按 (协议, 主机, 路径) 合并放行的请求，路径去掉查询参数。已被规则拦截的请求不计入。
+
+    :param batches: 结构化请求日志的批迭代器。
+    :return: 字典，值为 [请求数, 流量（字节）, 耗时（秒）]。
+    """
+    totals: Dict[Tuple[str, str, str], List] = {}
+    for batch in batches:
+        # 只保留拦截规则为空的记录
+        passed = list(map(not_, batch.rule))
+        paths = (path.partition('?')[0] for path in compress(batch.path, passed))
+        keys = zip(compress(batch.scheme, passed), compress(batch.host, passed), paths)
+        for key, size, duration in zip(keys, compress(batch.size, passed), compress(batch.duration, passed)):
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [1, size, duration]
+            else:
+                entry[0] += 1
+                entry[1] += size
+                entry[2] += duration
+    return totals
+
+
+class TrafficNode:
+    """
+    前缀树的节点，统计数据包括整棵子树。
+
+    :param prefix: 节点对应的地址前缀。
+    :param depth: 路径段数，主机节点为 0。
+    """
+    __slots__ = ('prefix', 'depth', 'children', 'requests', 'size', 'duration')
+
+    def __init__(self,
+                 prefix: str,
+                 depth: int):
+        self.prefix = prefix
+        self.depth = depth
+        self.children: Dict[str, 'TrafficNode'] = {}
+        self.requests = 0
+        self.size = 0
+        self.duration = 0.0
+
+    def iter_leaves(self) -> Iterator['TrafficNode']:
+        """
+        遍历子树中没有子节点的节点，即具体的资源地址。
+
+        :return: 节点迭代器。
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.children:
+                stack.extend(node.children.values())
+            else:
+                yield node
+
+
+class TrafficTrie:
+    """
+    按主机和路径前缀汇总流量的前缀树。
+
+    :param max_depth: 最大路径段数，更深的路径合并到该层的节点。
+    """
+
+    def __init__(self, max_depth: int = 8):
+        self.max_depth = max_depth
+        self.hosts: Dict[str, TrafficNode] = {}
+        self.requests = 0
+        self.size = 0
+        self.duration = 0.0
+
+    def add(self,
+            scheme: str,
+            host: str,
+            path: str,
+            requests: int,
+            size: int,
+            duration: float) -> None:
+        """
+        插入一个地址的流量，累加到路径上的每个节点。
+
+        :param scheme: 协议，为空时按 http 处理。
+        :param host: 主机名。
+        :param path: 路径，查询参数会被去掉。
+        :param requests: 请求数。
+        :param size: 流量（字节）。
+        :param duration: 耗时（秒）。
+        :return: 无返回值。
+        """
+        origin = f'{scheme or "http"}://{host.lower()}/'
+        node = self.hosts.get(origin)
+        if node is None:
+            node = self.hosts[origin] = TrafficNode(origin, 0)
+        parts = path.partition('?')[0].lstrip('/').split('/')
+        # 目录段带上结尾的 /，避免 /bg 同时匹配 /bg/ 和 /bg2/
+        segments = [part + '/' for part in parts[:-1]]
+        if parts[-1]:
+            segments.append(parts[-1])
+        del segments[self.max_depth:]
+        self.requests += requests
+        self.size += size
+        self.duration += duration
+        nodes = [node]
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = TrafficNode(node.prefix + segment, node.depth + 1)
+            node = child
+            nodes.append(node)
+        for node in nodes:
+            node.requests += requests
+            node.size += size
+            node.duration += duration
+
+    def nodes(self, depth: int) -> Iterator[TrafficNode]:
+        """
+        遍历指定路径段数的节点。
+
+        :param depth: 路径段数，0 为主机节点。
+        :return: 节点迭代器。
+        """
+        stack = list(self.hosts.values())
+        while stack:
+            node = stack.pop()
+            if node.depth == depth:
+                yield node
+            else:
+                stack.extend(node.children.values())
+
+    def suggest(self,
+                limit: int = 20,
+                weight: str = 'duration',
+                min_depth: int = 2,
+                share: float = 0.8) -> List[TrafficNode]:
+        """
+        按权重找出开销最大的子树，生成互不重叠的前缀规则建议。
+
+        从每个 min_depth 层的节点出发，只要某个子节点占了当前节点至少 share 的权重，就收窄到该子节点，
+        规则更精确而节省几乎不变。不同起点的子树互不重叠，按权重从大到小取前 limit 个。路径段数不足 min_depth 的地址，
+        例如游戏主程序，不会出现在建议中。
+
+        :param limit: 建议的数量。
+        :param weight: 排序的权重，为 WEIGHTS 之一。
+        :param min_depth: 建议规则的最少路径段数，越小规则越宽泛。
+        :param share: 收窄前缀时子节点权重的最低占比。
+        :return: 节点列表，节点的前缀即建议的规则。
+        """
+        if weight not in WEIGHTS:
+            raise ValueError(f"Unknown weight: {weight}")
+        key = attrgetter(weight)
+        candidates = []
+        for node in self.nodes(min_depth):
+            while node.children:
+                child = max(node.children.values(), key=key)
+                if key(child) < key(node) * share:
+                    break
+                node = child
+            candidates.append(node)
+        candidates.sort(key=key, reverse=True)
+        return candidates[:limit]
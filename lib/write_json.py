@@ -1,12 +1,17 @@
 """
 这个模块主要用于将数据以 JSON 格式写入到文件。
 
+数据先写入同一目录下的临时文件，刷新到磁盘后再原子地替换目标文件，写入中途程序崩溃或断电时，目标文件保持写入前的完整内容。
+
 :author: assassing
 :contact: https://github.com/hxz393
 :copyright: Copyright 2024, hxz393. 保留所有权利。
 """
 import json
 import logging
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Dict, Union, List
 
@@ -14,21 +19,37 @@ logger = logging.getLogger(__name__)
 
 
 def write_json(target_path: Union[str, Path],
-               data: Union[Dict, List]) -> bool:
+               data: Union[Dict, List],
+               compact: bool = False) -> bool:
     """
     将数据写入到 JSON 格式文件。
 
     :param target_path: Json 文件的路径，可以是字符串或 pathlib.Path 对象。
     :param data: 要写入的数据。
+    :param compact: 是否使用紧凑格式，不缩进不换行。紧凑格式由 C 编码器生成，大文件的写入速度快数倍，文件也更小。
     :return: 成功时返回 True，失败时返回 False。
     """
+    temp_path = None
     try:
         target_path = Path(target_path)
         target_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with target_path.open('w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=2)
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{target_path.name}.', suffix='.tmp', dir=target_path.parent)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            if compact:
+                # json.dump 逐段输出时总是使用 Python 编码器，一次性编码才会用到 C 编码器
+                file.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+            else:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        # 临时文件的权限只对当前用户开放，沿用原文件的权限
+        if target_path.exists():
+            shutil.copymode(target_path, temp_path)
+        os.replace(temp_path, target_path)
         return True
     except Exception:
         logger.exception(f"An error occurred while writing to the JSON file at '{target_path}'")
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
         return False
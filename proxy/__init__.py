@@ -0,0 +1,6 @@
+"""
+代理相关模块，包括 mitmproxy 插件、代理创建和运行器。
+
+导入 mitmproxy 需要将近一秒，为了让主窗口尽快显示，这里不导入任何子模块。除 `proxy.runner` 外，
+其他子模块都会导入 mitmproxy，只应在后台线程中或确实需要代理时导入。
+"""
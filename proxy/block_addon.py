@@ -0,0 +1,263 @@
+"""
+这个模块提供按规则拦截请求的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+from mitmproxy import ctx
+from mitmproxy import http
+from mitmproxy.http import HTTPFlow
+
+from config.settings import (RULE_KIND_URL, RULE_KIND_HOST, RULE_KIND_GLOB, RULE_KIND_REGEX, RULE_STATS_INTERVAL, RULE_SIZE_LIMIT,
+                             RESPONSE_MODE_403, RESPONSE_MODE_EMPTY, RESPONSE_MODE_SWF, RESPONSE_MODE_PNG, RESPONSE_MODE_GIF, RESPONSE_MODE_MP3)
+from lib.placeholder_content import SWF_CONTENT, PNG_CONTENT, GIF_CONTENT, MP3_CONTENT
+from lib.rule_index import RuleIndex
+
+logger = logging.getLogger(__name__)
+
+
+class BlockAddon:
+    """
+    用于阻断指定 URL 请求的插件。启动时将所有规则编译为按主机分区的规则索引，没有规则的主机直接跳过匹配。
+    通配符规则合并为一个正则表达式，正则表达式规则分块合并为少数几个组合表达式，只在规则变化时重新编译。
+
+    整主机规则在 CONNECT 阶段拒绝，不进行 TLS 握手，也不生成证书；地址规则在收到请求头时判断，不读取请求体，也不连接上游。
+    只有规则涉及的主机才解密 TLS，其他主机的 HTTPS 流量作为原始 TCP 隧道转发，规则更新时同步更新 `allow_hosts` 选项。
+    规则索引只读，更新规则时整体替换 `matcher` 属性，正在处理的请求继续使用旧索引。
+
+    命中规则后按规则的 response 字段返回 403 或占位内容。各种响应在启动时构造并编码一次，每个请求流使用 `issue` 复制的副本，
+    mitmproxy 和其他插件修改时间戳和头部时不会影响其他请求流。
+
+    每条规则的命中次数、最后命中时间和节省的流量先累加在本地，每隔几秒整批交给回调函数。节省的流量按放行时见过的
+    Content-Length 估算，没见过的资源不计入。
+
+    :param rules: 已启用的规则字典，键为规则，值为规则信息。例如：{"ads.61.com": {"active": true, "kind": "host"}}
+    :param on_stats: 接收命中数据的回调函数，参数为 {规则: [次数, 最后命中时间戳, 字节数]}，在代理的事件循环中调用。
+    """
+    # 占位响应的状态码、内容类型和内容
+    RESPONSE_CONTENT = {
+        RESPONSE_MODE_403: (403, "text/plain", b"This URL is blocked."),
+        RESPONSE_MODE_EMPTY: (200, "text/plain", b""),
+        RESPONSE_MODE_SWF: (200, "application/x-shockwave-flash", SWF_CONTENT),
+        RESPONSE_MODE_PNG: (200, "image/png", PNG_CONTENT),
+        RESPONSE_MODE_GIF: (200, "image/gif", GIF_CONTENT),
+        RESPONSE_MODE_MP3: (200, "audio/mpeg", MP3_CONTENT),
+    }
+
+    def __init__(self,
+                 rules: Dict[str, Dict[str, Any]],
+                 on_stats: Optional[Callable[[Dict[str, List]], None]] = None):
+        self.rules = rules
+        self.matcher = self.compile(rules)
+        self.version = 0
+        self.responses = {mode: self.make_response(mode) for mode in self.RESPONSE_CONTENT}
+        self.host_response = http.Response.make(403, b"This host is blocked.", {"Content-Type": "text/plain"})
+        self.on_stats = on_stats
+        # 规则 -> [次数, 最后命中时间戳, 字节数]，推送后清空
+        self.stats: Dict[str, List] = {}
+        # URL -> 放行时响应的 Content-Length，按插入顺序淘汰
+        self.sizes: Dict[str, int] = {}
+        self._stats_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def make_response(cls, mode: str) -> http.Response:
+        """
+        构造拦截时返回的响应。占位内容禁止浏览器缓存，停用规则后可以立即加载真实资源。
+
+        :param mode: 响应模式。
+        :return: 构造好的响应。
+        """
+        status_code, content_type, content = cls.RESPONSE_CONTENT[mode]
+        return http.Response.make(status_code, content, {"Content-Type": content_type, "Cache-Control": "no-cache"})
+
+    @staticmethod
+    def issue(prebuilt: http.Response) -> http.Response:
+        """
+        复制预先构造的响应交给单个请求流。mitmproxy 和其他插件会修改响应的时间戳和头部，共用同一个对象时并发的请求流会互相覆盖。
+
+        :param prebuilt: 预先构造的响应，内容和头部已经编码好。
+        :return: 时间戳为当前时间的响应副本。
+        """
+        response = prebuilt.copy()
+        response.timestamp_start = response.timestamp_end = time.time()
+        return response
+
+    @staticmethod
+    def compile(rules: Dict[str, Dict[str, Any]]) -> RuleIndex:
+        """
+        将规则字典编译为规则索引。耗时与规则数量成正比，规则较多时应在事件循环之外调用。无法编译的正则表达式规则会被忽略。
+
+        :param rules: 已启用的规则字典。
+        :return: 编译好的规则索引。
+        """
+        start = time.perf_counter()
+        host_patterns = []
+        patterns = []
+        glob_patterns = []
+        regex_patterns = []
+        for pattern, info in rules.items():
+            kind = info.get('kind', RULE_KIND_URL)
+            if kind == RULE_KIND_HOST:
+                host_patterns.append(pattern)
+            elif kind == RULE_KIND_GLOB:
+                glob_patterns.append(pattern)
+            elif kind == RULE_KIND_REGEX:
+                regex_patterns.append(pattern)
+            else:
+                patterns.append(pattern)
+        matcher = RuleIndex(patterns, host_patterns, glob_patterns, regex_patterns)
+        for pattern in matcher.invalid:
+            logger.warning(f"Ignored invalid regex rule: {pattern}")
+        logger.info(f"Compiled {len(rules)} rules ({len(host_patterns)} blocked hosts, {len(matcher.hosts)} hosts, "
+                    f"{matcher.generic_count} generic, {matcher.expression_count} expressions) in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return matcher
+
+    @staticmethod
+    def allow_hosts(matcher: RuleIndex) -> List[str]:
+        """
+        根据规则索引生成 mitmproxy 的 allow_hosts 选项。存在通用规则或表达式规则时任何主机都可能命中，返回空列表，即解密所有主机。
+
+        :param matcher: 规则索引。
+        :return: allow_hosts 选项值。
+        """
+        host_regex = matcher.host_regex()
+        if host_regex is None:
+            logger.info("TLS interception enabled for all hosts")
+            return []
+        logger.info(f"TLS interception limited to {len(matcher.hosts)} hosts")
+        return [host_regex]
+
+    def update_matcher(self,
+                       rules: Dict[str, Dict[str, Any]],
+                       matcher: RuleIndex,
+                       version: int,
+                       allow_hosts: List[str]) -> None:
+        """
+        替换规则、规则索引和需要解密的主机，必须在代理的事件循环中调用。版本号不大于当前版本的索引会被丢弃，避免乱序到达的旧规则覆盖新规则。
+
+        :param rules: 新的已启用规则字典。
+        :param matcher: 新规则编译成的规则索引。
+        :param version: 规则版本号。
+        :param allow_hosts: 新规则对应的 allow_hosts 选项值。
+        :return: 无返回值。
+        """
+        if version <= self.version:
+            return
+        self.rules = rules
+        self.matcher = matcher
+        self.version = version
+        ctx.options.update(allow_hosts=allow_hosts)
+        logger.info(f"Rules reloaded: {len(matcher)} active rules")
+
+    def running(self) -> None:
+        """
+        代理启动后开始定期推送命中数据。
+
+        :return: 无返回值。
+        """
+        if self.on_stats is not None:
+            self._stats_task = asyncio.get_running_loop().create_task(self._push_stats())
+
+    def done(self) -> None:
+        """
+        代理关闭时推送剩余的命中数据。
+
+        :return: 无返回值。
+        """
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+        self.flush_stats()
+
+    async def _push_stats(self) -> None:
+        """
+        每隔一段时间推送一次命中数据。
+
+        :return: 无返回值。
+        """
+        while True:
+            await asyncio.sleep(RULE_STATS_INTERVAL)
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """
+        把累计的命中数据交给回调函数并清空，没有新数据时不调用。
+
+        :return: 无返回值。
+        """
+        if not self.stats or self.on_stats is None:
+            return
+        batch, self.stats = self.stats, {}
+        try:
+            self.on_stats(batch)
+        except Exception:
+            logger.exception("Failed to push rule stats")
+
+    def count_hit(self,
+                  pattern: str,
+                  size: int = 0) -> None:
+        """
+        记录一次规则命中。
+
+        :param pattern: 命中的规则。
+        :param size: 估算节省的字节数。
+        :return: 无返回值。
+        """
+        stats = self.stats.get(pattern)
+        if stats is None:
+            self.stats[pattern] = [1, time.time(), size]
+        else:
+            stats[0] += 1
+            stats[1] = time.time()
+            stats[2] += size
+
+    def http_connect(self, flow: HTTPFlow) -> None:
+        """
+        检查 CONNECT 请求的目标主机，命中整主机规则则直接拒绝隧道。
+
+        :param flow: 当前的 CONNECT 请求流。
+        :return: 无返回值。
+        """
+        pattern = self.matcher.match_host(flow.request.host)
+        if pattern is not None:
+            flow.response = self.issue(self.host_response)
+            flow.metadata['blocked'] = pattern
+            self.count_hit(pattern)
+
+    def requestheaders(self, flow: HTTPFlow) -> None:
+        """
+        收到请求头后检查请求的 URL 地址，如果匹配到指定的规则之一，则阻断该请求。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        # 只查找请求主机对应的规则和通用规则，命中任一规则则阻断连接，按规则返回 403 或占位内容
+        pattern = self.matcher.match(flow.request.url)
+        if pattern is not None:
+            flow.metadata['blocked'] = pattern
+            self.count_hit(pattern, self.sizes.get(flow.request.url, 0))
+            # 请求体超过流式传输阈值时，mitmproxy 不允许在读完请求体之前返回响应，只能断开连接
+            if flow.request.stream:
+                flow.kill()
+                return
+            mode = self.rules[pattern].get('response', RESPONSE_MODE_403)
+            flow.response = self.issue(self.responses.get(mode) or self.responses[RESPONSE_MODE_403])
+
+    def responseheaders(self, flow: HTTPFlow) -> None:
+        """
+        记录放行资源的 Content-Length，之后拦截同一地址时用于估算节省的流量。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        length = flow.response.headers.get('content-length')
+        if 'blocked' in flow.metadata or flow.response.status_code != 200 or not length or not length.isdigit():
+            return
+        if len(self.sizes) >= RULE_SIZE_LIMIT:
+            del self.sizes[next(iter(self.sizes))]
+        self.sizes[flow.request.url] = int(length)
@@ -0,0 +1,293 @@
+"""
+这个模块提供把游戏资源缓存到磁盘的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, List, Union, Iterable
+from urllib.parse import urlsplit, urlunsplit
+
+from mitmproxy import http
+from mitmproxy.http import HTTPFlow
+
+from config.settings import CACHE_REPORT_INTERVAL
+from lib.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheAddon:
+    """
+    缓存游戏资源的插件。放行的 GET 响应按规范化后的 URL 保存到磁盘缓存，再次请求时直接在 request 阶段返回，不连接上游。
+    带 Cookie 或 Authorization 的请求不使用缓存；响应头 Vary 列出的请求头的值随条目保存，和当前请求不同时视为未命中。
+
+    缓存过期后，带上 ETag/Last-Modified 向上游重新验证，收到 304 时返回缓存内容并刷新过期时间。命中统计定期写入日志。
+    流式传输的响应边转发边复制一份内容，传输完成后写入缓存；超过单条缓存上限的内容不复制。
+
+    :param cache: 磁盘缓存。
+    """
+    # 不保存到缓存中的逐跳头部和会话头部
+    SKIP_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'te', 'trailer', 'upgrade',
+                    'content-length', 'set-cookie'}
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.failed = 0
+        self._reported = None
+        self._report_task: Optional[asyncio.Task] = None
+
+    def running(self) -> None:
+        """
+        代理启动后开始定期输出统计信息。
+
+        :return: 无返回值。
+        """
+        self._report_task = asyncio.get_running_loop().create_task(self._report())
+
+    async def done(self) -> None:
+        """
+        代理关闭时保存缓存索引，并输出最终统计信息。
+
+        :return: 无返回值。
+        """
+        if self._report_task is not None:
+            self._report_task.cancel()
+        await asyncio.to_thread(self.cache.close)
+        self.log_stats()
+
+    async def _report(self) -> None:
+        """
+        每隔一段时间输出统计信息并保存缓存索引，统计信息没有变化时不输出。
+
+        :return: 无返回值。
+        """
+        while True:
+            await asyncio.sleep(CACHE_REPORT_INTERVAL)
+            stats = (self.hits, self.misses, self.revalidated, self.stored, self.failed)
+            if stats != self._reported:
+                self._reported = stats
+                self.log_stats()
+                await asyncio.to_thread(self.cache.save)
+
+    def log_stats(self) -> None:
+        """
+        输出缓存命中统计信息。
+
+        :return: 无返回值。
+        """
+        logger.info(f"Cache stats: {self.hits} hits, {self.revalidated} revalidated, {self.misses} misses, {self.stored} stored, "
+                    f"{self.failed} failed, {len(self.cache)} entries, {self.cache.size / 1024 / 1024:.1f}MB")
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """
+        规范化 URL 作为缓存键：协议和主机转小写，去掉默认端口和片段，查询参数排序。
+
+        :param url: 请求的 URL。
+        :return: 缓存键。
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        if (scheme, parts.port) in (('http', 80), ('https', 443)):
+            netloc = netloc.rsplit(':', 1)[0]
+        query = '&'.join(sorted(parts.query.split('&'))) if parts.query else ''
+        return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+    @staticmethod
+    def expires_at(headers: http.Headers) -> float:
+        """
+        根据响应头计算缓存过期时间。没有明确过期时间时，按 Last-Modified 估算，最长一天。
+
+        :param headers: 响应头。
+        :return: 过期时间戳，需要每次重新验证时返回 0。
+        """
+        now = time.time()
+        directives = {}
+        for directive in headers.get('cache-control', '').lower().split(','):
+            name, _, value = directive.strip().partition('=')
+            if name:
+                directives[name] = value.strip('"')
+        if 'no-cache' in directives or 'no-store' in directives:
+            return 0
+        try:
+            if 'max-age' in directives:
+                return now + int(directives['max-age'])
+            date = parsedate_to_datetime(headers['date']).timestamp() if 'date' in headers else now
+            if 'expires' in headers:
+                return now + parsedate_to_datetime(headers['expires']).timestamp() - date
+            if 'last-modified' in headers:
+                return now + min((date - parsedate_to_datetime(headers['last-modified']).timestamp()) / 10, 86400)
+        except (ValueError, TypeError):
+            pass
+        return 0
+
+    @staticmethod
+    def is_cacheable(flow: HTTPFlow) -> bool:
+        """
+        判断响应是否可以缓存：200 响应，且没有禁止缓存或携带会话信息。只检查响应头，收到响应头时即可调用。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 可以缓存返回 True，否则返回 False。
+        """
+        response = flow.response
+        cache_control = response.headers.get('cache-control', '').lower()
+        return (response.status_code == 200
+                and 'no-store' not in cache_control
+                and 'private' not in cache_control
+                and 'set-cookie' not in response.headers
+                and response.headers.get('vary', '').strip() != '*')
+
+    @staticmethod
+    def vary_values(request: http.Request,
+                    vary: str) -> List[List[str]]:
+        """
+        取出 Vary 列出的请求头在请求中的值，按名称排序，作为缓存键的一部分。
+
+        :param request: 请求。
+        :param vary: 响应头 Vary 的值。
+        :return: [名称, 值] 列表，没有 Vary 时为空列表。
+        """
+        names = sorted({name.strip().lower() for name in vary.split(',') if name.strip()})
+        return [[name, request.headers.get(name, '')] for name in names]
+
+    @classmethod
+    def make_meta(cls, flow: HTTPFlow) -> Dict[str, Any]:
+        """
+        提取需要保存的响应信息。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 元数据字典。
+        """
+        response = flow.response
+        headers = [[k.decode('latin-1'), v.decode('latin-1')] for k, v in response.headers.fields]
+        return {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': [[k, v] for k, v in headers if k.lower() not in cls.SKIP_HEADERS],
+            'etag': response.headers.get('etag', ''),
+            'last_modified': response.headers.get('last-modified', ''),
+            'expires': cls.expires_at(response.headers),
+            'vary': cls.vary_values(flow.request, response.headers.get('vary', '')),
+        }
+
+    @staticmethod
+    def make_response(meta: Dict[str, Any],
+                      body: bytes) -> http.Response:
+        """
+        用缓存内容构造响应，内容保持原始编码。
+
+        :param meta: 元数据字典。
+        :param body: 缓存的原始内容。
+        :return: 构造好的响应。
+        """
+        headers = http.Headers([(k.encode('latin-1'), v.encode('latin-1')) for k, v in meta['headers']])
+        headers['content-length'] = str(len(body))
+        now = time.time()
+        return http.Response(b"HTTP/1.1", meta['status_code'], meta['reason'].encode('latin-1'), headers, body, None, now, now)
+
+    async def request(self, flow: HTTPFlow) -> None:
+        """
+        查找缓存，未过期则直接返回缓存内容；已过期则附加验证头，交给上游重新验证。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        request = flow.request
+        # 带会话信息的请求可能得到因人而异的响应，不使用缓存
+        if flow.response is not None or request.method != 'GET' or 'authorization' in request.headers or 'cookie' in request.headers:
+            return
+        key = self.cache_key(request.url)
+        flow.metadata['cache_key'] = key
+        entry = self.cache.get_hot(key) or await asyncio.to_thread(self.cache.get, key)
+        if entry is None:
+            return
+        meta, body = entry
+        # 缓存的是另一个变体，按未命中处理，响应后覆盖
+        if meta.get('vary') and self.vary_values(request, ','.join(name for name, _ in meta['vary'])) != meta['vary']:
+            return
+        if meta.get('expires', 0) > time.time():
+            flow.response = self.make_response(meta, body)
+            flow.metadata['cache'] = 'hit'
+            self.hits += 1
+            return
+        # 浏览器自己带了验证头时，交给浏览器处理
+        if 'if-none-match' in request.headers or 'if-modified-since' in request.headers:
+            return
+        if meta.get('etag'):
+            request.headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request.headers['If-Modified-Since'] = meta['last_modified']
+        if meta.get('etag') or meta.get('last_modified'):
+            flow.metadata['cache_entry'] = entry
+
+    def responseheaders(self, flow: HTTPFlow) -> None:
+        """
+        收到响应头时，如果响应需要流式传输且可以缓存，在转发的同时复制内容，用于传输完成后写入缓存。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        response = flow.response
+        if not response.stream or 'cache_key' not in flow.metadata or not self.is_cacheable(flow):
+            return
+        limit = self.cache.max_bytes // 8
+        chunks: List[bytes] = []
+        flow.metadata['cache_chunks'] = chunks
+        inner = response.stream
+        size = 0
+
+        def tee(data: bytes) -> Union[bytes, Iterable[bytes]]:
+            nonlocal size
+            if size <= limit:
+                size += len(data)
+                if size > limit:
+                    # 超过单条缓存上限，不再复制，释放已复制的内容
+                    chunks.clear()
+                    flow.metadata.pop('cache_chunks', None)
+                elif data:
+                    chunks.append(data)
+            return inner(data) if callable(inner) else data
+
+        response.stream = tee
+
+    async def response(self, flow: HTTPFlow) -> None:
+        """
+        处理上游响应：重新验证通过时返回缓存内容，否则把可缓存的响应写入缓存。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        key = flow.metadata.get('cache_key')
+        if key is None or flow.metadata.get('cache') == 'hit':
+            return
+        entry = flow.metadata.pop('cache_entry', None)
+        if entry is not None and flow.response.status_code == 304:
+            meta, body = entry
+            meta['expires'] = self.expires_at(flow.response.headers)
+            self.cache.update_meta(key, {'expires': meta['expires']})
+            flow.response = self.make_response(meta, body)
+            flow.metadata['cache'] = 'revalidated'
+            self.revalidated += 1
+            return
+        self.misses += 1
+        # 流式传输的响应没有 raw_content，使用转发时复制的内容
+        chunks = flow.metadata.pop('cache_chunks', None)
+        body = flow.response.raw_content if chunks is None else b''.join(chunks)
+        if body is not None and self.is_cacheable(flow):
+            try:
+                await asyncio.to_thread(self.cache.put, key, self.make_meta(flow), body)
+            except OSError as e:
+                logger.warning(f"Failed to store in cache: {key}: {e}")
+                self.failed += 1
+            else:
+                self.stored += 1
@@ -0,0 +1,156 @@
+"""
+这个模块提供把每个请求写入结构化请求日志的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+from mitmproxy.http import HTTPFlow
+
+from config.settings import FLOW_LOG_BATCH, FLOW_LOG_INTERVAL, METRICS_HOST
+from lib.flow_log import FlowBatch, FlowLogWriter
+from proxy.logger_addon import LoggerAddon
+
+logger = logging.getLogger(__name__)
+
+
+class FlowLogAddon:
+    """
+    把请求记录追加到结构化请求日志。事件循环中只向当前一批追加几个字段，攒满 FLOW_LOG_BATCH 条或每隔 FLOW_LOG_INTERVAL 秒
+    把整批交给后台线程编码和写盘，不占用代理的事件循环。必须加在其他插件之后，才能看到拦截和缓存插件的处理结果。
+
+    :param writer: 结构化请求日志写入器。
+    """
+
+    def __init__(self, writer: FlowLogWriter):
+        self.writer = writer
+        self.batch = FlowBatch()
+        self.queue: "queue.SimpleQueue[Optional[FlowBatch]]" = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def running(self) -> None:
+        """
+        代理启动后，启动后台写入线程和定时提交任务。
+
+        :return: 无返回值。
+        """
+        self.thread = threading.Thread(target=self._write_loop, name='flow-log', daemon=True)
+        self.thread.start()
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def done(self) -> None:
+        """
+        代理关闭时提交剩余的记录，等待后台线程写完后退出。
+
+        :return: 无返回值。
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def flush(self) -> None:
+        """
+        把当前一批记录交给后台线程写入。
+
+        :return: 无返回值。
+        """
+        if len(self.batch):
+            self.queue.put(self.batch)
+            self.batch = FlowBatch()
+
+    async def _flush_loop(self) -> None:
+        """
+        定时提交记录，请求较少时也能及时写入。
+
+        :return: 无返回值。
+        """
+        while True:
+            await asyncio.sleep(FLOW_LOG_INTERVAL)
+            self.flush()
+
+    def _write_loop(self) -> None:
+        """
+        后台线程：逐批写入，收到 None 时退出。
+
+        :return: 无返回值。
+        """
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            try:
+                self.writer.write(batch)
+            except Exception:
+                logger.exception("Failed to write flow log")
+
+    def record(self,
+               flow: HTTPFlow,
+               status: int,
+               size: int) -> None:
+        """
+        追加一条记录，攒满一批后提交。
+
+        :param flow: 请求流。
+        :param status: 状态码，出错时为 0。
+        :param size: 响应体传输的字节数。
+        :return: 无返回值。
+        """
+        request = flow.request
+        metadata = flow.metadata
+        response = flow.response
+        if response is not None and 'blocked' not in metadata and 'cache' not in metadata and response.timestamp_start:
+            ttfb = response.timestamp_start - request.timestamp_start
+        else:
+            ttfb = -1.0
+        self.batch.append(request.timestamp_start, request.method, request.host, request.path, status, size,
+                          ttfb, time.time() - request.timestamp_start, metadata.get('blocked', ''), request.scheme)
+        if len(self.batch) >= FLOW_LOG_BATCH:
+            self.flush()
+
+    def http_connect(self, flow: HTTPFlow) -> None:
+        """
+        记录被整主机规则拒绝的 CONNECT 请求，这类请求不会触发 response 钩子。
+
+        :param flow: 当前的 CONNECT 请求流。
+        :return: 无返回值。
+        """
+        if flow.response is not None:
+            flow.metadata['flow_logged'] = True
+            self.record(flow, flow.response.status_code, LoggerAddon.wire_length(flow.response))
+
+    def response(self, flow: HTTPFlow) -> None:
+        """
+        记录完成的请求，不记录指标页面。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if flow.request.host == METRICS_HOST:
+            return
+        # 响应发往客户端时仍可能出错，标记已记录，避免在 error 中重复记录
+        flow.metadata['flow_logged'] = True
+        self.record(flow, flow.response.status_code, flow.metadata.get('stream_bytes', LoggerAddon.wire_length(flow.response)))
+
+    def error(self, flow: HTTPFlow) -> None:
+        """
+        记录出错的请求，状态码记为 0。已在 response 或 http_connect 中记录的请求跳过。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if 'flow_logged' in flow.metadata:
+            return
+        self.record(flow, 0, 0)
@@ -0,0 +1,177 @@
+"""
+无界面运行代理，适合在没有显示器的 Linux 主机上长期运行，为局域网内的多台电脑提供拦截服务。
+
+只导入代理模块和标准库，不导入 PyQt5 和 ui 包，启动时不创建任何窗口。主配置、用户配置、日志、缓存和规则命中统计的路径
+与图形界面相同，都相对于当前目录，两者可以共用同一份配置。在项目根目录下运行：
+
+```sh
+python -m proxy.headless --log-level INFO
+python -m proxy.headless --record session.flows
+```
+
+加上 `--record` 时把完整的请求流录制到文件，供 `tools.replay` 离线回放。
+
+收到 SIGHUP 时重新读取用户配置并热加载规则，收到 SIGINT 或 SIGTERM 时关闭代理并退出。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import time
+
+# 记录进程启动时间，用于统计开始监听的耗时
+START_TIME = time.perf_counter()
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import CONFIG_MAIN_PATH, DEFAULT_CONFIG_MAIN, DEFAULT_CONFIG_USER, LOG_PATH, RULE_STATS_PATH, JSON_WRITE_DELAY, JSON_COMPACT_SIZE
+from lib.deferred_json_writer import DeferredJsonWriter
+from lib.is_port_available import is_port_available
+from lib.logging_config import logging_config
+from lib.merge_rule_stats import merge_rule_stats
+from lib.read_json import read_json
+from lib.rule_database import RuleDatabase, is_rule_database
+from proxy.block_addon import BlockAddon
+from proxy.master import create_master
+from proxy.record_addon import RecordAddon
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessProxy:
+    """
+    无界面代理。读取配置后在当前线程的事件循环中运行与图形界面相同的代理和插件，自身作为最后一个插件加入代理，
+    用 running 钩子记录启动耗时。
+
+    :param config_path: 主配置文件路径。
+    :param record_path: 录制请求流的文件路径，为 None 时不录制。
+    """
+
+    def __init__(self,
+                 config_path: str = CONFIG_MAIN_PATH,
+                 record_path: Optional[str] = None):
+        self.config_path = config_path
+        self.record_path = record_path
+        self.block_addon: Optional[BlockAddon] = None
+        self.master = None
+        self.rules_version = 0
+        self._stats: Dict[str, Dict[str, Any]] = (read_json(RULE_STATS_PATH) if os.path.isfile(RULE_STATS_PATH) else None) or {}
+        self._writer = DeferredJsonWriter(JSON_WRITE_DELAY)
+
+    def load_config(self) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        读取主配置和用户配置，文件不存在时使用默认配置。用户配置为规则数据库时只查询已启用的规则。
+
+        :return: (主配置, 已启用的规则字典) 元组。
+        """
+        config_main = (read_json(self.config_path) if os.path.isfile(self.config_path) else None) or DEFAULT_CONFIG_MAIN
+        config_user_path = config_main.get('config_user_path', DEFAULT_CONFIG_MAIN['config_user_path'])
+        if is_rule_database(config_user_path) and os.path.isfile(config_user_path):
+            database = RuleDatabase(config_user_path)
+            try:
+                return config_main, database.get_active_rules()
+            finally:
+                database.close()
+        config_user = (read_json(config_user_path) if os.path.isfile(config_user_path) else None) or DEFAULT_CONFIG_USER
+        return config_main, {k: v for k, v in config_user.items() if v.get('active', False)}
+
+    def save_stats(self, batch: Dict[str, List]) -> None:
+        """
+        合并规则拦截插件推送的命中数据，由后台线程保存到统计文件，不阻塞代理的事件循环。
+
+        :param batch: 命中数据，键为规则，值为 [次数, 最后命中时间戳, 字节数]。
+        :return: 无返回值。
+        """
+        merge_rule_stats(self._stats, batch)
+        self._writer.schedule(RULE_STATS_PATH, {key: dict(entry) for key, entry in self._stats.items()}, len(self._stats) > JSON_COMPACT_SIZE)
+
+    async def run(self) -> int:
+        """
+        创建并运行代理，直到收到退出信号。
+
+        :return: 退出码，正常退出返回 0，配置有误返回 1。
+        """
+        config_main, rules = self.load_config()
+        port = int(config_main.get('server_port', DEFAULT_CONFIG_MAIN['server_port']))
+        if not rules:
+            logger.error("No active rules, please check the user config")
+            return 1
+        if not is_port_available(port):
+            logger.error(f"Port {port} is not available, please change the server port")
+            return 1
+
+        self.block_addon = BlockAddon(rules, self.save_stats)
+        self.master = create_master(config_main, self.block_addon)
+        if self.record_path:
+            self.master.addons.add(RecordAddon(self.record_path))
+        self.master.addons.add(self)
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.master.shutdown)
+            loop.add_signal_handler(signal.SIGTERM, self.master.shutdown)
+            loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(self.reload_rules()))
+        except (NotImplementedError, AttributeError):
+            # Windows 的事件循环不支持信号处理，按 Ctrl+C 退出，不支持热加载
+            pass
+        try:
+            await self.master.run()
+        finally:
+            self._writer.flush()
+        logger.info("Proxy stopped")
+        return 0
+
+    async def reload_rules(self) -> None:
+        """
+        重新读取用户配置，在线程池中编译规则后替换到规则拦截插件。
+
+        :return: 无返回值。
+        """
+        try:
+            self.rules_version += 1
+            version = self.rules_version
+            _, rules = self.load_config()
+            matcher = await asyncio.get_running_loop().run_in_executor(None, BlockAddon.compile, rules)
+            self.block_addon.update_matcher(rules, matcher, version, BlockAddon.allow_hosts(matcher))
+        except Exception:
+            logger.exception("Failed to reload rules!")
+
+    def running(self) -> None:
+        """
+        代理开始监听后，记录从进程启动到开始监听的耗时。
+
+        :return: 无返回值。
+        """
+        logger.info(f"Proxy listening {time.perf_counter() - START_TIME:.2f}s after launch (headless)")
+
+
+def main() -> None:
+    """
+    无界面模式的入口函数，解析命令行参数，配置日志后运行代理。
+
+    :return: 无返回值。
+    """
+    parser = argparse.ArgumentParser(prog='python -m proxy.headless', description='Run the proxy without the GUI.')
+    parser.add_argument('-c', '--config', default=CONFIG_MAIN_PATH, help=f'main config file (default: {CONFIG_MAIN_PATH})')
+    parser.add_argument('-l', '--log-level', default='INFO', help='log level (default: INFO)')
+    parser.add_argument('--console', action='store_true', help='also print logs to the console')
+    parser.add_argument('--record', metavar='FILE', help='record every flow to this file for tools.replay')
+    args = parser.parse_args()
+
+    logging_config(log_file=LOG_PATH, console_output=args.console, max_log_size=1, log_level=args.log_level)
+    try:
+        sys.exit(asyncio.run(HeadlessProxy(args.config, args.record).run()))
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        logger.exception("Headless proxy failed to start")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+这个模块提供把请求记录到日志的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Union, Iterable
+
+from mitmproxy import http
+from mitmproxy.http import HTTPFlow
+
+
+class LoggerAddon:
+    """
+    用于记录请求到日志的插件。
+
+    日志大小取自原始传输内容或 Content-Length 头，不解压响应体；流式传输的响应按实际转发的字节数统计。格式化好的日志经队列交给后台线程写入，
+    文件锁和磁盘写入都不占用代理的事件循环。
+    """
+
+    def __init__(self):
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.listener: Optional[QueueListener] = None
+        self.queue_handler = QueueHandler(self.queue)
+        self.flow_logger = logging.getLogger('flow')
+
+    def running(self) -> None:
+        """
+        代理启动后，启动后台写日志线程，使用根日志记录器的处理器输出。
+
+        :return: 无返回值。
+        """
+        self.listener = QueueListener(self.queue, *logging.getLogger().handlers, respect_handler_level=True)
+        self.listener.start()
+        self.flow_logger.addHandler(self.queue_handler)
+        self.flow_logger.propagate = False
+
+    def done(self) -> None:
+        """
+        代理关闭时，写完队列中剩余的日志，停止后台线程。
+
+        :return: 无返回值。
+        """
+        self.flow_logger.removeHandler(self.queue_handler)
+        self.flow_logger.propagate = True
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    @staticmethod
+    def wire_length(message: Union[http.Request, http.Response]) -> int:
+        """
+        获取消息体在网络上传输的字节数，不解码内容。消息体未读取（例如流式传输）时使用 Content-Length 头。
+
+        :param message: 请求或响应。
+        :return: 字节数，未知时返回 0。
+        """
+        if message.raw_content is not None:
+            return len(message.raw_content)
+        try:
+            return int(message.headers.get('content-length', 0))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def responseheaders(flow: HTTPFlow) -> None:
+        """
+        响应需要流式传输时，包装流式处理函数，统计实际转发给客户端的字节数。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        response = flow.response
+        if not response.stream:
+            return
+        inner = response.stream
+        flow.metadata['stream_bytes'] = 0
+
+        def count(data: bytes) -> Union[bytes, Iterable[bytes]]:
+            chunks = inner(data) if callable(inner) else data
+            if isinstance(chunks, bytes):
+                flow.metadata['stream_bytes'] += len(chunks)
+                return chunks
+            chunks = list(chunks)
+            flow.metadata['stream_bytes'] += sum(len(chunk) for chunk in chunks)
+            return chunks
+
+        response.stream = count
+
+    def http_connect(self, flow: HTTPFlow) -> None:
+        """
+        记录被拒绝的 CONNECT 请求。放行的隧道由其中的 HTTP 请求记录。
+
+        :param flow: 当前的 CONNECT 请求流。
+        :return: 无返回值。
+        """
+        if flow.response is not None:
+            request = flow.request
+            response = flow.response
+            self.flow_logger.warning(f"CONNECT {request.host}:{request.port} {request.http_version} << "
+                                     f"{response.status_code} {response.reason} {self.wire_length(response) / 1024:.1f}KB")
+
+    def response(self, flow: HTTPFlow) -> None:
+        """
+        记录每个 HTTP 响应的关键信息到日志。
+
+        :param flow: 当前的 HTTP 请求流，包括请求和响应的信息。
+        :return: 无返回值。
+        """
+        response = flow.response
+        # 被拦截的请求用 WARNING 级别记录，日志级别调高到 WARNING 时仍能看到
+        level = logging.WARNING if response.status_code == 403 else logging.INFO
+        if not self.flow_logger.isEnabledFor(level):
+            return
+        # 构建需要记录的信息字符串
+        request = flow.request
+        content_length_kb = flow.metadata.get('stream_bytes', self.wire_length(response)) / 1024
+        info = f"{request.method} {request.url} {request.http_version} << {response.status_code} {response.reason} {content_length_kb:.1f}KB"
+
+        self.flow_logger.log(level, info)
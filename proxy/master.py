@@ -0,0 +1,48 @@
+"""
+这个模块负责按主配置创建 mitmproxy 代理并加载所有插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from typing import Dict, Any
+
+from mitmproxy import options
+from mitmproxy.tools.dump import DumpMaster
+
+from config.settings import DEFAULT_CONFIG_MAIN, CACHE_PATH, CACHE_HOT_SIZE, FLOW_LOG_PATH, FLOW_LOG_SIZE, FLOW_LOG_BACKUPS
+from lib.disk_cache import DiskCache
+from lib.flow_log import FlowLogWriter
+from proxy.block_addon import BlockAddon
+from proxy.cache_addon import CacheAddon
+from proxy.flow_log_addon import FlowLogAddon
+from proxy.logger_addon import LoggerAddon
+from proxy.metrics_addon import MetricsAddon
+from proxy.stream_addon import StreamAddon
+
+
+def create_master(config_main: Dict[str, Any],
+                  block_addon: BlockAddon) -> DumpMaster:
+    """
+    按主配置创建 mitmproxy 代理并加载所有插件，必须在事件循环中调用。程序和基准测试等工具都通过此函数创建代理。
+
+    :param config_main: 主配置，包括监听端口、流式传输阈值和缓存大小。
+    :param block_addon: 规则拦截插件。
+    :return: 创建好的代理，尚未运行。
+    """
+    port = int(config_main.get('server_port', DEFAULT_CONFIG_MAIN['server_port']))
+    cache_size = int(config_main.get('cache_size', DEFAULT_CONFIG_MAIN['cache_size']) or 0)
+    stream_size = int(config_main.get('stream_size', DEFAULT_CONFIG_MAIN['stream_size']) or 0)
+    m = DumpMaster(options.Options(listen_port=port, http2=True, allow_hosts=BlockAddon.allow_hosts(block_addon.matcher)))
+    # 超过阈值的请求和响应边接收边转发，不在内存中缓冲完整内容。该选项由代理服务插件注册，只能在创建 DumpMaster 后设置
+    if stream_size > 0:
+        m.options.update(stream_large_bodies=f"{stream_size}k")
+    m.addons.add(block_addon)
+    if stream_size > 0:
+        m.addons.add(StreamAddon())
+    if cache_size > 0:
+        m.addons.add(CacheAddon(DiskCache(CACHE_PATH, cache_size * 1024 * 1024, CACHE_HOT_SIZE * 1024 * 1024)))
+    m.addons.add(LoggerAddon())
+    m.addons.add(FlowLogAddon(FlowLogWriter(FLOW_LOG_PATH, FLOW_LOG_SIZE * 1024 * 1024, FLOW_LOG_BACKUPS)))
+    m.addons.add(MetricsAddon())
+    return m
@@ -0,0 +1,156 @@
+"""
+这个模块提供统计代理运行指标，并以 Prometheus 文本格式输出的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import time
+from typing import Dict
+
+from mitmproxy import http
+from mitmproxy.http import HTTPFlow
+
+from config.settings import METRICS_HOST, METRICS_PATH, METRICS_BUCKETS
+from lib.metrics import Histogram, write_counter, write_histogram
+from proxy.logger_addon import LoggerAddon
+
+
+class HostMetrics:
+    """
+    单个主机的计数器和延迟直方图。
+    """
+    __slots__ = ('requests', 'blocked', 'errors', 'received', 'sent', 'ttfb', 'duration')
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.errors = 0
+        self.received = 0
+        self.sent = 0
+        self.ttfb = Histogram(METRICS_BUCKETS)
+        self.duration = Histogram(METRICS_BUCKETS)
+
+
+class MetricsAddon:
+    """
+    按主机统计请求数、拦截数、错误数、流量、首字节时间和请求总耗时，并在保留地址 `http://metrics.fgs/metrics`
+    上以 Prometheus 文本格式输出，和 mitmproxy 的 `mitm.it` 一样由代理自己应答，不连接上游。
+
+    每个请求只做一次字典查找和几次加法，文本在被访问时才生成。必须加在其他插件之后，才能看到拦截和缓存插件的处理结果。
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, HostMetrics] = {}
+        self.started = time.time()
+
+    def host(self, name: str) -> HostMetrics:
+        """
+        获取主机的统计对象，不存在时创建。
+
+        :param name: 主机名。
+        :return: 统计对象。
+        """
+        metrics = self.hosts.get(name)
+        if metrics is None:
+            metrics = self.hosts[name] = HostMetrics()
+        return metrics
+
+    def http_connect(self, flow: HTTPFlow) -> None:
+        """
+        统计被整主机规则拒绝的 CONNECT 请求，这类请求不会触发 response 钩子。
+
+        :param flow: 当前的 CONNECT 请求流。
+        :return: 无返回值。
+        """
+        if flow.response is not None:
+            metrics = self.host(flow.request.host)
+            metrics.requests += 1
+            metrics.blocked += 1
+
+    def requestheaders(self, flow: HTTPFlow) -> None:
+        """
+        应答指标地址的请求。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if flow.request.host != METRICS_HOST or flow.response is not None:
+            return
+        if flow.request.path == METRICS_PATH:
+            flow.response = http.Response.make(200, self.render().encode('utf-8'), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+        else:
+            flow.response = http.Response.make(404, b"Not found.", {"Content-Type": "text/plain"})
+
+    def responseheaders(self, flow: HTTPFlow) -> None:
+        """
+        收到上游响应头时记录首字节时间。插件直接应答的请求（拦截、缓存命中、指标页面）也会触发此钩子，需要跳过。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if 'blocked' in flow.metadata or 'cache' in flow.metadata or flow.request.host == METRICS_HOST:
+            return
+        self.host(flow.request.host).ttfb.observe(flow.response.timestamp_start - flow.request.timestamp_start)
+
+    def response(self, flow: HTTPFlow) -> None:
+        """
+        请求完成时记录请求数、拦截数、流量和总耗时。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if flow.request.host == METRICS_HOST:
+            return
+        metrics = self.host(flow.request.host)
+        metrics.requests += 1
+        metadata = flow.metadata
+        # 响应发往客户端时仍可能出错，标记已计数，避免在 error 中重复计数
+        metadata['counted'] = True
+        size = metadata.get('stream_bytes', LoggerAddon.wire_length(flow.response))
+        metrics.sent += size
+        if 'blocked' in metadata:
+            metrics.blocked += 1
+        elif 'cache' not in metadata:
+            metrics.received += size
+        metrics.duration.observe(time.time() - flow.request.timestamp_start)
+
+    def error(self, flow: HTTPFlow) -> None:
+        """
+        记录出错的请求，例如上游无法连接、连接被重置或超时。因请求体过大被拦截插件断开的请求计为拦截。
+        已在 response 中计数的请求（例如客户端在接收内容时断开）跳过；客户端在收到响应前断开的请求只计入请求数，不算上游错误。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if 'counted' in flow.metadata or flow.request.host == METRICS_HOST:
+            return
+        metrics = self.host(flow.request.host)
+        metrics.requests += 1
+        if 'blocked' in flow.metadata:
+            metrics.blocked += 1
+        elif flow.client_conn.connected:
+            metrics.errors += 1
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式的指标。
+
+        :return: 指标文本。
+        """
+        hosts = dict(sorted(self.hosts.items()))
+        lines = [
+            "# HELP fgs_uptime_seconds Seconds since the proxy started.",
+            "# TYPE fgs_uptime_seconds gauge",
+            f"fgs_uptime_seconds {time.time() - self.started:.3f}",
+        ]
+        write_counter(lines, 'fgs_requests_total', 'Finished requests, including blocked and cached ones.',
+                      {k: v.requests for k, v in hosts.items()})
+        write_counter(lines, 'fgs_blocked_total', 'Requests answered by a block rule.', {k: v.blocked for k, v in hosts.items()})
+        write_counter(lines, 'fgs_errors_total', 'Requests that failed before a response, e.g. upstream unreachable or reset.',
+                      {k: v.errors for k, v in hosts.items()})
+        write_counter(lines, 'fgs_received_bytes_total', 'Response body bytes received from upstream.', {k: v.received for k, v in hosts.items()})
+        write_counter(lines, 'fgs_sent_bytes_total', 'Response body bytes sent to clients.', {k: v.sent for k, v in hosts.items()})
+        write_histogram(lines, 'fgs_ttfb_seconds', 'Time from request start to upstream response headers.', {k: v.ttfb for k, v in hosts.items()})
+        write_histogram(lines, 'fgs_duration_seconds', 'Time from request start to the complete response.', {k: v.duration for k, v in hosts.items()})
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,104 @@
+"""
+这个模块提供把完整请求流录制到文件的 mitmproxy 插件，录制的会话可以用回放工具离线重放，比较不同规则的效果。
+
+文件使用 mitmproxy 自己的流格式，也可以用 mitmweb 等工具打开查看。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import logging
+import queue
+import threading
+from typing import Any, Dict, Optional
+
+from mitmproxy.http import HTTPFlow
+from mitmproxy.io import tnetstring
+
+from config.settings import METRICS_HOST
+
+logger = logging.getLogger(__name__)
+
+
+class RecordAddon:
+    """
+    录制请求流，包括请求、响应内容和各阶段的时间戳。事件循环中只取出流的状态，序列化和写盘在后台线程中完成。
+    必须加在其他插件之后，才能记录拦截和缓存插件的处理结果。超过流式传输阈值的响应没有保存内容，只记录大小。
+
+    :param path: 录制文件路径，已存在时被覆盖。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+
+    def running(self) -> None:
+        """
+        代理启动后，启动后台写入线程。
+
+        :return: 无返回值。
+        """
+        self.thread = threading.Thread(target=self._write_loop, name='record', daemon=True)
+        self.thread.start()
+        logger.info(f"Recording flows to {self.path}")
+
+    def done(self) -> None:
+        """
+        代理关闭时等待后台线程写完剩余的请求流。
+
+        :return: 无返回值。
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            logger.info(f"Recorded {self.count} flows to {self.path}")
+
+    def _write_loop(self) -> None:
+        """
+        后台线程：逐个写入请求流的状态，收到 None 时退出。
+
+        :return: 无返回值。
+        """
+        try:
+            with open(self.path, 'wb') as file:
+                while True:
+                    state = self.queue.get()
+                    if state is None:
+                        return
+                    tnetstring.dump(state, file)
+                    self.count += 1
+        except Exception:
+            logger.exception("Failed to record flows")
+
+    def record(self, flow: HTTPFlow) -> None:
+        """
+        提交一个请求流，不录制指标页面。
+
+        :param flow: 请求流。
+        :return: 无返回值。
+        """
+        if self.thread is None or flow.request.host == METRICS_HOST:
+            return
+        # 状态中的内容是不可变的字节串，之后修改请求流不会影响已提交的状态
+        self.queue.put(flow.get_state())
+
+    def response(self, flow: HTTPFlow) -> None:
+        """
+        录制完成的请求。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        self.record(flow)
+
+    def error(self, flow: HTTPFlow) -> None:
+        """
+        录制出错的请求。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        self.record(flow)
@@ -0,0 +1,211 @@
+"""
+这个模块提供代理运行器，在后台线程中预热并运行代理。
+
+本模块只依赖标准库，可以在程序启动时导入；mitmproxy 在后台线程中才导入。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, List, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyRunner:
+    """
+    代理运行器。代理运行在独立线程的事件循环中，线程可以在点击启动之前就开始预热：
+    导入 mitmproxy、读取 CA 证书、创建代理和插件、编译规则，然后等待启动。启动时主配置没有变化则直接开始监听，
+    规则有变化只重新编译规则。
+
+    启动参数和最新的规则保存在锁保护的状态中，代理线程开始运行前才读取，预热期间提交的规则不会丢失。
+    运行器自身作为最后一个插件加入代理，用 running 钩子记录从启动到开始监听的耗时。
+
+    :param on_stats: 接收规则命中数据的回调函数，传给规则拦截插件。
+    :param on_stopped: 代理线程退出时调用的回调函数，包括运行出错和预热失败，在代理线程中调用。
+    """
+
+    def __init__(self,
+                 on_stats: Optional[Callable[[Dict[str, List]], None]] = None,
+                 on_stopped: Optional[Callable[[], None]] = None):
+        self.on_stats = on_stats
+        self.on_stopped = on_stopped
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.master = None
+        self.block_addon = None
+        # 创建代理时使用的主配置
+        self.config_main: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._start_event = threading.Event()
+        # 以下状态由 _lock 保护：启动时的主配置、最新的规则及版本号、事件循环是否已经在运行代理
+        self._config_main: Optional[Dict[str, Any]] = None
+        self._rules: Optional[Dict[str, Dict[str, Any]]] = None
+        self._version = 0
+        self._serving = False
+        self._start_time = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        """
+        是否已经启动代理。代理退出或运行出错后恢复为 False。
+
+        :return: 已启动返回 True，否则返回 False。
+        """
+        return self._start_event.is_set()
+
+    def prewarm(self,
+                config_main: Dict[str, Any],
+                rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        启动后台线程预热代理，完成后等待启动。已经预热或启动过时不做处理。
+
+        :param config_main: 主配置。
+        :param rules: 已启用的规则字典。
+        :return: 无返回值。
+        """
+        self._ensure_thread(config_main, rules)
+
+    def start(self,
+              config_main: Dict[str, Any],
+              rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        启动代理。预热尚未开始时先开始预热，预热完成后立即开始监听。
+
+        :param config_main: 主配置。
+        :param rules: 已启用的规则字典。
+        :return: 无返回值。
+        """
+        self._start_time = time.perf_counter()
+        with self._lock:
+            self._config_main = config_main
+            self._rules = rules
+        self._ensure_thread(config_main, rules)
+        self._start_event.set()
+
+    def reload(self,
+               rules: Dict[str, Dict[str, Any]],
+               version: int) -> None:
+        """
+        在调用线程中编译规则，再提交到代理的事件循环中替换。耗时与规则数量成正比，不应在界面线程中调用。
+        代理还没有开始运行时只记录最新的规则，由代理线程在开始运行前使用。
+
+        :param rules: 已启用的规则字典。
+        :param version: 规则版本号，旧版本的规则会被丢弃。
+        :return: 无返回值。
+        """
+        from proxy.block_addon import BlockAddon
+
+        matcher = BlockAddon.compile(rules)
+        allow_hosts = BlockAddon.allow_hosts(matcher)
+        with self._lock:
+            if version <= self._version:
+                return
+            self._rules = rules
+            self._version = version
+            if self._serving:
+                self.loop.call_soon_threadsafe(self._swap, rules, matcher, version, allow_hosts)
+
+    def _swap(self, *args: Any) -> None:
+        """
+        在事件循环中替换规则。代理可能在提交后被重新创建，所以在执行时才取规则拦截插件。
+
+        :param args: 传给 BlockAddon.update_matcher 的参数。
+        :return: 无返回值。
+        """
+        self.block_addon.update_matcher(*args)
+
+    def _ensure_thread(self,
+                       config_main: Dict[str, Any],
+                       rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        代理线程还没有创建时创建并启动。
+
+        :param config_main: 主配置。
+        :param rules: 已启用的规则字典。
+        :return: 无返回值。
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(config_main, rules), daemon=True)
+                self._thread.start()
+
+    def _run(self,
+             config_main: Dict[str, Any],
+             rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        代理线程入口：预热，等待启动，再运行代理直到退出。
+
+        :param config_main: 预热使用的主配置。
+        :param rules: 预热使用的规则字典。
+        :return: 无返回值。
+        """
+        try:
+            begin = time.perf_counter()
+            from proxy.block_addon import BlockAddon
+            imported = time.perf_counter()
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._build(config_main, rules))
+            logger.info(f"Proxy pre-warmed in {time.perf_counter() - begin:.2f}s (imports {imported - begin:.2f}s)")
+
+            self._start_event.wait()
+            with self._lock:
+                config_main = self._config_main
+            if config_main != self.config_main:
+                # 预热后修改过主配置，关闭预热的代理，重新创建
+                self.loop.run_until_complete(self.master.done())
+                self.loop.run_until_complete(self._build(config_main, self.block_addon.rules))
+            # 从这里开始，新提交的规则交给事件循环替换；此前提交的规则在这里一次性应用
+            with self._lock:
+                rules, version = self._rules, self._version
+                self._serving = True
+            if rules != self.block_addon.rules:
+                matcher = BlockAddon.compile(rules)
+                self.block_addon.rules = rules
+                self.block_addon.matcher = matcher
+                self.master.options.update(allow_hosts=BlockAddon.allow_hosts(matcher))
+            self.block_addon.version = version
+            self.loop.run_until_complete(self.master.run())
+        except Exception:
+            logger.exception("An error occurred!")
+        finally:
+            # 代理退出后可以重新启动
+            with self._lock:
+                self._serving = False
+                self._thread = None
+            self._start_event.clear()
+            if self.loop is not None:
+                self.loop.close()
+            if self.on_stopped is not None:
+                self.on_stopped()
+
+    async def _build(self,
+                     config_main: Dict[str, Any],
+                     rules: Dict[str, Dict[str, Any]]) -> None:
+        """
+        创建代理和全部插件，创建时会读取 CA 证书（首次运行时生成）和缓存索引。
+
+        :param config_main: 主配置。
+        :param rules: 已启用的规则字典。
+        :return: 无返回值。
+        """
+        from proxy.block_addon import BlockAddon
+        from proxy.master import create_master
+
+        self.block_addon = BlockAddon(rules, self.on_stats)
+        self.master = create_master(config_main, self.block_addon)
+        self.master.addons.add(self)
+        self.config_main = config_main
+
+    def running(self) -> None:
+        """
+        代理开始监听后，记录从启动到开始监听的耗时。
+
+        :return: 无返回值。
+        """
+        logger.info(f"Proxy listening {(time.perf_counter() - self._start_time) * 1000:.0f}ms after Start")
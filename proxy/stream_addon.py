@@ -0,0 +1,29 @@
+"""
+这个模块提供让大小未知的响应使用流式传输的 mitmproxy 插件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+from mitmproxy.http import HTTPFlow
+
+
+class StreamAddon:
+    """
+    开启流式传输后，对大小未知的响应直接使用流式传输，不论实际大小，阈值只对带 Content-Length 的响应有效。
+
+    mitmproxy 只能凭 Content-Length 在收到响应头时决定流式传输。分块传输的响应会先缓冲，超过阈值后才转为流式，
+    这时 responseheaders 已经执行过，缓存和日志插件无法再接管转发的内容。必须加在缓存和日志插件之前。
+    """
+
+    @staticmethod
+    def responseheaders(flow: HTTPFlow) -> None:
+        """
+        响应头中没有 Content-Length 时开启流式传输。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        response = flow.response
+        if not response.stream and 'content-length' not in response.headers:
+            response.stream = True
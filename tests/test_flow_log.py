@@ -0,0 +1,105 @@
+"""
+结构化请求日志的往返测试：随机生成的记录写入后按批读回，内容不变；轮转的备份按从旧到新的顺序读取；
+末尾不完整的一批和缺少后来追加的文本列的旧文件都能正常读取。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from lib.flow_log import FlowBatch, FlowLogWriter, HEADER, TEXT_FIELDS, read_flow_log
+
+METHODS = ['GET', 'POST', 'CONNECT']
+TEXT = 'ab/?=.&中文 '
+
+
+def random_batch(rng: random.Random, count: int) -> Tuple[FlowBatch, List[Tuple]]:
+    """
+    生成一批随机记录。耗时取 1/8 的整数倍，可以用 float32 精确保存。
+
+    :param rng: 随机数生成器。
+    :param count: 记录数。
+    :return: (一批记录, 期望读回的记录元组列表) 元组。
+    """
+    batch = FlowBatch()
+    for _ in range(count):
+        path = '/' + ''.join(rng.choice(TEXT) for _ in range(rng.randint(0, 20)))
+        rule = rng.choice(['', 'http://mole.61.com/resource/', '/bg/'])
+        batch.append(rng.uniform(1.7e9, 1.8e9), rng.choice(METHODS), rng.choice(['mole.61.com', '127.0.0.1']), path,
+                     rng.choice([0, 200, 304, 403]), rng.randint(0, 2 ** 40), rng.randint(-8, 80) / 8, rng.randint(0, 800) / 8,
+                     rule, rng.choice(['http', 'https']))
+    return batch, list(batch.rows())
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_batch_round_trip(seed: int) -> None:
+    """
+    一批记录编码后再解码，每条记录都不变。
+    """
+    rng = random.Random(seed)
+    batch, expected = random_batch(rng, rng.randint(0, 200))
+    data = batch.to_bytes()
+    magic, count, length = HEADER.unpack_from(data)
+    assert count == len(expected) and length == len(data) - HEADER.size
+    assert list(FlowBatch.from_bytes(count, data[HEADER.size:]).rows()) == expected
+
+
+def test_newlines_are_removed() -> None:
+    """
+    路径和规则中的换行符被去掉，不会破坏文本列的分隔。
+    """
+    batch = FlowBatch()
+    batch.append(0.0, 'GET', 'mole.61.com', '/a\nb', 200, 1, 0.5, 1.0, 'r\nule', 'http')
+    data = batch.to_bytes()
+    decoded = FlowBatch.from_bytes(1, data[HEADER.size:])
+    assert decoded.path == ['/ab'] and decoded.rule == ['rule']
+
+
+def test_writer_rotation_and_backups(tmp_path: Path) -> None:
+    """
+    写入器超过大小上限时轮转，带备份读取时按写入顺序读回全部记录，只读当前文件时只有最后几批。
+    """
+    rng = random.Random(1)
+    path = tmp_path / 'flows.bin'
+    writer = FlowLogWriter(path, max_size=4096, backup_count=100)
+    expected = []
+    for _ in range(20):
+        batch, rows = random_batch(rng, 20)
+        writer.write(batch)
+        expected.extend(rows)
+    assert (tmp_path / 'flows.bin.2').is_file()
+    assert [row for batch in read_flow_log(path, True) for row in batch.rows()] == expected
+    current = [row for batch in read_flow_log(path) for row in batch.rows()]
+    assert 0 < len(current) < len(expected) and current == expected[-len(current):]
+
+
+def test_truncated_tail(tmp_path: Path) -> None:
+    """
+    文件末尾不完整的一批（例如正在写入）被忽略，之前的批正常读取。
+    """
+    batch, rows = random_batch(random.Random(2), 5)
+    data = batch.to_bytes()
+    path = tmp_path / 'flows.bin'
+    path.write_bytes(data + data[:len(data) // 2])
+    batches = list(read_flow_log(path))
+    assert len(batches) == 1 and list(batches[0].rows()) == rows
+
+
+def test_old_file_without_scheme(tmp_path: Path) -> None:
+    """
+    缺少协议列的旧格式批读回时协议为空字符串。
+    """
+    batch, rows = random_batch(random.Random(3), 5)
+    data = batch.to_bytes()
+    # 去掉最后一个文本列（长度前缀和内容），并改写批头中的内容字节数
+    assert TEXT_FIELDS[-1] == 'scheme'
+    scheme = '\n'.join(batch.scheme).encode('utf-8')
+    payload = data[HEADER.size:len(data) - len(scheme) - 4]
+    path = tmp_path / 'flows.bin'
+    path.write_bytes(HEADER.pack(b'FLOW', len(batch), len(payload)) + payload)
+    assert [row for batch in read_flow_log(path) for row in batch.rows()] == [row[:-1] + ('',) for row in rows]
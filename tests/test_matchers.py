@@ -0,0 +1,163 @@
+"""
+规则匹配器的随机对照测试。用固定种子生成大量模式和文本，把 Aho-Corasick 自动机、规则索引和通配符规则集合的结果，
+与逐条判断的参考实现逐一比较。字符集很小，模式之间大量重叠，容易覆盖失配链和前缀树拆分等边界情况。
+
+在项目根目录下运行：
+
+```sh
+python -m pytest tests
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import random
+import re
+from typing import List, Optional
+
+import pytest
+
+from lib.aho_corasick import AhoCorasick
+from lib.glob_set import GlobSet, glob_to_regex
+from lib.rule_index import RuleIndex, split_url
+
+SEEDS = range(20)
+ALPHABET = 'ab/.?'
+HOSTS = ['mole.61.com', 'mole.61.com.cn', 'hua.61.com', '127.0.0.1']
+SCHEMES = ['http', 'https']
+
+
+def random_text(rng: random.Random, low: int, high: int, alphabet: str = ALPHABET) -> str:
+    """
+    生成随机文本。
+
+    :param rng: 随机数生成器。
+    :param low: 最小长度。
+    :param high: 最大长度。
+    :param alphabet: 字符集。
+    :return: 随机文本。
+    """
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(low, high)))
+
+
+def random_url(rng: random.Random) -> str:
+    """
+    生成随机 URL，协议和主机偶尔使用大写。
+
+    :param rng: 随机数生成器。
+    :return: URL。
+    """
+    url = f"{rng.choice(SCHEMES)}://{rng.choice(HOSTS)}/{random_text(rng, 0, 12)}"
+    return url.upper() if rng.random() < 0.1 else url
+
+
+def reference_rule(patterns: List[str], host_patterns: List[str], url: str) -> Optional[str]:
+    """
+    按文档逐条判断 URL 命中的规则：整主机规则优先；地址规则中可以解析为 URL 的，协议和主机相同且路径是前缀才命中，
+    其余的按子串命中；多条命中时取列表中最靠前的一条。
+
+    :param patterns: 地址规则列表。
+    :param host_patterns: 整主机规则列表。
+    :param url: 请求的 URL。
+    :return: 命中的规则，没有命中返回 None。
+    """
+    parts = split_url(url)
+    for pattern in host_patterns:
+        if parts is not None and RuleIndex.normalize_host(pattern) == parts[1]:
+            return pattern
+    for pattern in patterns:
+        rule = split_url(pattern)
+        if rule is None:
+            if pattern in url:
+                return pattern
+        elif parts is not None and rule[:2] == parts[:2] and parts[2].startswith(rule[2]):
+            return pattern
+    return None
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_aho_corasick_matches_substring_scan(seed: int) -> None:
+    """
+    自动机的结果与按输入顺序逐个执行 `pattern in text` 相同。
+    """
+    rng = random.Random(seed)
+    patterns = [random_text(rng, 1, 5) for _ in range(rng.randint(1, 40))]
+    matcher = AhoCorasick(patterns)
+    for _ in range(300):
+        text = random_text(rng, 0, 30)
+        expected = next((pattern for pattern in patterns if pattern in text), None)
+        assert matcher.search(text) == expected, text
+
+
+def test_aho_corasick_empty() -> None:
+    """
+    没有模式时不命中任何文本，空模式命中所有文本。
+    """
+    assert AhoCorasick([]).search('http://mole.61.com/') is None
+    assert AhoCorasick(['', 'a']).search('a') == ''
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_rule_index_matches_reference(seed: int) -> None:
+    """
+    规则索引的结果与逐条判断的参考实现相同。
+    """
+    rng = random.Random(seed)
+    patterns = []
+    for _ in range(rng.randint(1, 60)):
+        if rng.random() < 0.7:
+            patterns.append(f"{rng.choice(SCHEMES)}://{rng.choice(HOSTS)}{random_text(rng, 0, 4)}")
+        else:
+            patterns.append(random_text(rng, 1, 4))
+    host_patterns = rng.sample(HOSTS, rng.randint(0, 1))
+    index = RuleIndex(patterns, host_patterns)
+    for _ in range(300):
+        url = random_url(rng)
+        assert index.match(url) == reference_rule(patterns, host_patterns, url), url
+
+
+def test_rule_index_host_prefix() -> None:
+    """
+    地址规则按主机分桶前缀匹配：主机必须完全相同，协议和主机不区分大小写，路径区分大小写。
+    """
+    index = RuleIndex(['http://mole.61.com', 'https://hua.61.com/resource/', '/bg/'], host_patterns=['http://ads.61.com/'])
+    assert index.match('http://mole.61.com/resource/1.swf') == 'http://mole.61.com'
+    assert index.match('HTTP://MOLE.61.COM/resource/1.swf') == 'http://mole.61.com'
+    # 子串匹配时会命中，按主机前缀匹配后不再命中
+    assert index.match('http://mole.61.com.cn/resource/1.swf') is None
+    assert index.match('https://mole.61.com/resource/1.swf') is None
+    assert index.match('https://hua.61.com/resource/1.swf') == 'https://hua.61.com/resource/'
+    assert index.match('https://hua.61.com/Resource/1.swf') is None
+    assert index.match('http://hua.61.com/resource/1.swf') is None
+    # 无法解析为 URL 的规则命中任何主机
+    assert index.match('http://mole.61.com.cn/bg/1.swf') == '/bg/'
+    assert index.match('https://ads.61.com/bg/1.swf') == 'http://ads.61.com/'
+    assert index.match_host('ADS.61.com') == 'http://ads.61.com/'
+    assert index.match_host('ads.61.com.cn') is None
+
+
+@pytest.mark.parametrize('fallback', [False, True])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_glob_set_matches_per_pattern_regexes(seed: int, fallback: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    合并后的通配符规则集合与逐条转换的正则表达式一致：没有规则命中时返回 -1，否则返回的规则命中，
+    并且在文本中的命中位置是所有规则中最靠前的。合并的表达式无法编译时，退回的分块合并方式同样满足。
+    """
+    if fallback:
+        monkeypatch.setattr(GlobSet, 'build_regex', staticmethod(lambda patterns: '('))
+    rng = random.Random(seed)
+    patterns = [random_text(rng, 1, 6, ALPHABET + '**') for _ in range(rng.randint(1, 40))]
+    glob_set = GlobSet(patterns)
+    assert (glob_set._fallback is not None) == fallback
+    regexes = [re.compile(glob_to_regex(pattern)) for pattern in patterns]
+    for _ in range(300):
+        text = random_text(rng, 0, 30)
+        starts = [match.start() for match in (regex.search(text) for regex in regexes) if match is not None]
+        found = glob_set.search_index(text)
+        if not starts:
+            assert found == -1, text
+            continue
+        assert found != -1, text
+        match = regexes[found].search(text)
+        assert match is not None and match.start() == min(starts), text
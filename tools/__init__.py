@@ -0,0 +1,3 @@
+"""
+开发辅助工具，不随程序打包。
+"""
@@ -0,0 +1,634 @@
+"""
+代理端到端基准测试。在本机启动一个模拟游戏资源的源站，再用与程序相同的方式（`proxy.master.create_master`）启动代理，
+通过代理并发请求资源，统计不同规则数量下的吞吐量、延迟分位数和代理进程内存占用。
+加上 `--block-stages` 时改为比较两种拦截方式：整主机规则在 CONNECT 阶段拒绝隧道，地址规则在解密后的请求阶段返回 403。
+
+源站、代理和压测客户端分别运行在独立进程中，互不争抢 GIL。全部流量走本机回环地址，不需要联网，内存统计读取 `/proc`，只支持 Linux。
+
+在项目根目录下运行：
+
+```sh
+python -m tools.benchmark
+python -m tools.benchmark --rules 10,1000,100000 --requests 5000 --concurrency 50
+python -m tools.benchmark --tls --json benchmark.json
+python -m tools.benchmark --block-stages
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import ssl
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import DEFAULT_CONFIG_MAIN, RESPONSE_MODE_403, RULE_KIND_URL, RULE_KIND_HOST
+
+logger = logging.getLogger(__name__)
+
+# 资源类型：扩展名、内容类型、最小和最大大小（字节）
+ASSET_KINDS = [
+    ('swf', 'application/x-shockwave-flash', 20 * 1024, 400 * 1024),
+    ('png', 'image/png', 1024, 30 * 1024),
+    ('mp3', 'audio/mpeg', 30 * 1024, 200 * 1024),
+    ('xml', 'text/xml', 512, 5 * 1024),
+]
+# 命中拦截规则的资源目录
+BLOCKED_PREFIX = '/resource/blocked/'
+# 源站所有响应共用的内容，按资源大小截取
+BODY_POOL = bytes(random.Random(0).getrandbits(8) for _ in range(max(kind[3] for kind in ASSET_KINDS)))
+
+
+def free_port() -> int:
+    """
+    向系统申请一个当前空闲的本机端口。
+
+    :return: 端口号。
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float) -> bool:
+    """
+    等待本机端口开始监听。
+
+    :param port: 端口号。
+    :param timeout: 最长等待秒数。
+    :return: 端口在超时前开始监听返回 True，否则返回 False。
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def read_rss(pid: int) -> Tuple[float, float]:
+    """
+    读取进程的当前和峰值常驻内存。
+
+    :param pid: 进程号。
+    :return: (当前 MB, 峰值 MB) 元组，读取失败时为 (0, 0)。
+    """
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM'):
+                    values[name] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get('VmRSS', 0), values.get('VmHWM', 0)
+
+
+def make_certificate(directory: str) -> Tuple[str, str]:
+    """
+    为源站生成本机自签名证书。
+
+    :param directory: 证书保存目录。
+    :return: (证书路径, 私钥路径) 元组。
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=30))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), critical=False)
+            .sign(key, hashes.SHA256()))
+    cert_path = os.path.join(directory, 'origin.pem')
+    key_path = os.path.join(directory, 'origin.key')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def asset_for(path: str) -> Tuple[str, int]:
+    """
+    根据路径确定资源的内容类型和大小，同一路径每次结果相同。
+
+    :param path: 请求路径。
+    :return: (内容类型, 大小) 元组。
+    """
+    ext = path.rsplit('.', 1)[-1]
+    for kind, content_type, low, high in ASSET_KINDS:
+        if kind == ext:
+            seed = int.from_bytes(hashlib.md5(path.encode('utf-8')).digest()[:4], 'big')
+            return content_type, low + seed % (high - low)
+    return 'application/octet-stream', 1024
+
+
+def make_corpus(count: int, seed: int) -> List[str]:
+    """
+    生成模拟游戏资源的路径列表。
+
+    :param count: 路径数量。
+    :param seed: 随机种子。
+    :return: 路径列表。
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        kind = rng.choice(ASSET_KINDS)[0]
+        corpus.append(f"/resource/{rng.choice(['map', 'npc', 'item', 'ui', 'sound'])}/{i}.{kind}")
+    return corpus
+
+
+def make_rules(count: int,
+               origin: str,
+               seed: int) -> Dict[str, Dict[str, Any]]:
+    """
+    生成指定数量的规则。一条规则拦截源站的 BLOCKED_PREFIX 目录，其余规则是分布在大量虚构主机上的前缀规则、
+    源站上不会命中的前缀规则和少量子串规则，模拟大型规则列表。
+
+    :param count: 规则数量。
+    :param origin: 源站地址，例如 `http://127.0.0.1:8080`。
+    :param seed: 随机种子。
+    :return: 规则字典。
+    """
+    rng = random.Random(seed)
+    info = {"active": True, "description": "", "kind": RULE_KIND_URL, "response": RESPONSE_MODE_403}
+    rules = {f"{origin}{BLOCKED_PREFIX}": info}
+    i = 0
+    while len(rules) < count:
+        roll = rng.random()
+        if roll < 0.9:
+            pattern = f"http://s{i % 500}.game{i % 50}.example/resource/{rng.choice(['map', 'npc', 'ad'])}{i}/"
+        elif roll < 0.95:
+            pattern = f"{origin}/resource/unused{i}/"
+        else:
+            pattern = f"/ad{i}_banner."
+        rules[pattern] = info
+        i += 1
+    return rules
+
+
+async def handle_origin(reader: asyncio.StreamReader,
+                        writer: asyncio.StreamWriter) -> None:
+    """
+    处理一个源站连接，支持 HTTP/1.1 长连接。所有资源都可缓存，内容从共用内容中截取。
+
+    :param reader: 连接读取流。
+    :param writer: 连接写入流。
+    :return: 无返回值。
+    """
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            path = lines[0].split(' ')[1]
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                if name.strip().lower() == 'content-length' and int(value):
+                    await reader.readexactly(int(value))
+            content_type, size = asset_for(path)
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {size}\r\n"
+                         f"Cache-Control: max-age=3600\r\n\r\n".encode('latin-1'))
+            writer.write(BODY_POOL[:size])
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+def run_origin(port: int,
+               cert: Optional[Tuple[str, str]]) -> None:
+    """
+    源站进程入口。
+
+    :param port: 监听端口。
+    :param cert: (证书路径, 私钥路径) 元组，为 None 时使用 HTTP。
+    :return: 无返回值。
+    """
+    context = None
+    if cert is not None:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(*cert)
+
+    async def main() -> None:
+        server = await asyncio.start_server(handle_origin, '127.0.0.1', port, ssl=context, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def run_proxy(config_main: Dict[str, Any],
+              rules: Dict[str, Dict[str, Any]],
+              workdir: str) -> None:
+    """
+    代理进程入口，使用和程序相同的代理和插件。在临时目录中运行，日志和缓存不会写入项目目录。
+
+    :param config_main: 主配置。
+    :param rules: 已启用的规则字典。
+    :param workdir: 工作目录。
+    :return: 无返回值。
+    """
+    from lib.logging_config import logging_config
+    from proxy.block_addon import BlockAddon
+    from proxy.master import create_master
+
+    os.chdir(workdir)
+    logging_config(log_file='proxy.log', log_level='INFO')
+    # 关闭 mitmproxy 在控制台逐条打印请求
+    sys.stdout = open(os.devnull, 'w')
+
+    async def main() -> None:
+        m = create_master(config_main, BlockAddon(rules))
+        # 源站使用自签名证书
+        m.options.update(ssl_insecure=True)
+        await m.run()
+
+    asyncio.run(main())
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, int]:
+    """
+    读取一个完整的 HTTP/1.1 响应，支持 Content-Length 和分块传输。
+
+    :param reader: 连接读取流。
+    :return: (状态码, 内容长度) 元组。
+    """
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    lines = head.split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        await reader.readexactly(length)
+        return status, length
+    length = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            length += size
+            if size == 0:
+                break
+    return status, length
+
+
+def open_tunnel(proxy_port: int, target: str) -> socket.socket:
+    """
+    通过代理建立 CONNECT 隧道。
+
+    :param proxy_port: 代理端口。
+    :param target: 目标地址，例如 `127.0.0.1:8443`。
+    :return: 已建立隧道的套接字。
+    """
+    sock = socket.create_connection(('127.0.0.1', proxy_port))
+    sock.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode('latin-1'))
+    head = b''
+    while not head.endswith(b'\r\n\r\n'):
+        data = sock.recv(1)
+        if not data:
+            raise ConnectionError('Proxy closed the tunnel')
+        head += data
+    if head.split(b' ')[1] != b'200':
+        raise ConnectionError(head.split(b'\r\n')[0].decode('latin-1'))
+    return sock
+
+
+class LoadClient:
+    """
+    压测客户端。多个并发连接共同完成指定数量的请求，每个连接保持长连接，出错时重新连接。
+
+    :param origin: 源站地址，例如 `http://127.0.0.1:8080`。
+    :param proxy_port: 代理端口，为 None 时直连源站。
+    :param paths: 请求路径列表，按顺序循环使用。
+    :param reconnect: 每个请求都建立新连接，建立连接的耗时计入延迟。代理拒绝 CONNECT 隧道时按拦截计数。
+    """
+
+    def __init__(self,
+                 origin: str,
+                 proxy_port: Optional[int],
+                 paths: List[str],
+                 reconnect: bool = False):
+        self.origin = origin
+        self.tls = origin.startswith('https://')
+        self.target = origin.split('://', 1)[1]
+        self.proxy_port = proxy_port
+        self.paths = paths
+        self.reconnect = reconnect
+        self.next = 0
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.bytes = 0
+        self.context = ssl.create_default_context()
+        self.context.check_hostname = False
+        self.context.verify_mode = ssl.CERT_NONE
+
+    async def connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        建立到代理或源站的连接。HTTPS 经代理时先建立 CONNECT 隧道，再在隧道中握手。
+
+        :return: (读取流, 写入流) 元组。
+        """
+        host, port = self.target.rsplit(':', 1)
+        context = self.context if self.tls else None
+        if self.proxy_port is None:
+            return await asyncio.open_connection(host, int(port), ssl=context)
+        if not self.tls:
+            return await asyncio.open_connection('127.0.0.1', self.proxy_port)
+        sock = await asyncio.to_thread(open_tunnel, self.proxy_port, self.target)
+        return await asyncio.open_connection(sock=sock, ssl=context, server_hostname=host)
+
+    def request_line(self, path: str) -> bytes:
+        """
+        生成请求头。经代理的 HTTP 请求使用完整 URL，其他情况使用路径。
+
+        :param path: 请求路径。
+        :return: 请求头字节串。
+        """
+        target = f"{self.origin}{path}" if self.proxy_port is not None and not self.tls else path
+        return f"GET {target} HTTP/1.1\r\nHost: {self.target}\r\nUser-Agent: benchmark\r\n\r\n".encode('latin-1')
+
+    async def worker(self, total: int, record: bool) -> None:
+        """
+        单个连接循环发送请求，直到全部请求发出。
+
+        :param total: 所有连接共需完成的请求数量。
+        :param record: 是否记录统计数据，预热时不记录。
+        :return: 无返回值。
+        """
+        connection = None
+        while self.next < total:
+            path = self.paths[self.next % len(self.paths)]
+            self.next += 1
+            try:
+                start = time.perf_counter()
+                if connection is None:
+                    connection = await self.connect()
+                    if not self.reconnect:
+                        start = time.perf_counter()
+                reader, writer = connection
+                writer.write(self.request_line(path))
+                status, length = await read_response(reader)
+                elapsed = time.perf_counter() - start
+                if self.reconnect:
+                    writer.close()
+                    connection = None
+            except ConnectionError as e:
+                # 整主机规则直接拒绝 CONNECT 隧道，状态行作为异常信息
+                if self.reconnect and str(e).startswith('HTTP/'):
+                    if record:
+                        self.latencies.append(time.perf_counter() - start)
+                        status = int(str(e).split(' ')[1])
+                        self.statuses[status] = self.statuses.get(status, 0) + 1
+                elif record:
+                    self.errors += 1
+                if connection is not None:
+                    connection[1].close()
+                connection = None
+                continue
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                if record:
+                    self.errors += 1
+                if connection is not None:
+                    connection[1].close()
+                connection = None
+                continue
+            if record:
+                self.latencies.append(elapsed)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                self.bytes += length
+        if connection is not None:
+            connection[1].close()
+
+    async def run(self,
+                  total: int,
+                  concurrency: int,
+                  warmup: int) -> float:
+        """
+        先预热，再用指定并发数完成指定数量的请求。
+
+        :param total: 请求数量。
+        :param concurrency: 并发连接数。
+        :param warmup: 预热请求数量。
+        :return: 正式压测耗时（秒）。
+        """
+        if warmup:
+            await asyncio.gather(*(self.worker(warmup, False) for _ in range(concurrency)))
+        self.next = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(self.worker(total, True) for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def summarize(name: str,
+              client: LoadClient,
+              elapsed: float,
+              rss: Tuple[float, float],
+              startup: float) -> Dict[str, Any]:
+    """
+    汇总一轮压测的结果。
+
+    :param name: 场景名称。
+    :param client: 完成压测的客户端。
+    :param elapsed: 压测耗时（秒）。
+    :param rss: 代理进程的 (当前 MB, 峰值 MB) 内存。
+    :param startup: 代理启动耗时（秒）。
+    :return: 结果字典，延迟单位为毫秒。
+    """
+    latencies = sorted(client.latencies)
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99 or [0] * 99
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': client.errors,
+        'blocked': client.statuses.get(403, 0),
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'mbps': client.bytes / 1024 / 1024 / elapsed if elapsed else 0,
+        'p50': cuts[49] * 1000,
+        'p95': cuts[94] * 1000,
+        'p99': cuts[98] * 1000,
+        'rss': rss[0],
+        'rss_peak': rss[1],
+        'startup': startup,
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """
+    以表格形式输出结果。
+
+    :param results: 结果字典列表。
+    :return: 无返回值。
+    """
+    print(f"{'scenario':>10} {'req/s':>9} {'MB/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'blocked':>8} {'RSS MB':>8} {'peak MB':>8} {'start s':>8}")
+    for r in results:
+        print(f"{r['scenario']:>10} {r['rps']:>9.1f} {r['mbps']:>8.1f} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f} "
+              f"{r['errors']:>7} {r['blocked']:>8} {r['rss']:>8.1f} {r['rss_peak']:>8.1f} {r['startup']:>8.2f}")
+
+
+def make_paths(args: argparse.Namespace) -> List[str]:
+    """
+    生成请求序列，其中约 blocked_ratio 比例的请求会命中拦截规则。
+
+    :param args: 命令行参数。
+    :return: 路径列表。
+    """
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.corpus, args.seed)
+    paths = []
+    for i in range(args.requests):
+        if rng.random() < args.blocked_ratio:
+            paths.append(f"{BLOCKED_PREFIX}{i}.swf")
+        else:
+            paths.append(rng.choice(corpus))
+    return paths
+
+
+def make_stage_rules(stage: str, origin: str) -> Dict[str, Dict[str, Any]]:
+    """
+    生成拦截整个源站的规则：connect 使用整主机规则，在 CONNECT 阶段拒绝隧道；其他阶段使用地址规则，解密后在请求阶段拦截。
+
+    :param stage: 拦截阶段。
+    :param origin: 源站地址。
+    :return: 规则字典。
+    """
+    if stage == 'connect':
+        return {origin.split('://', 1)[1].rsplit(':', 1)[0]: {"active": True, "description": "", "kind": RULE_KIND_HOST, "response": RESPONSE_MODE_403}}
+    return {f"{origin}/": {"active": True, "description": "", "kind": RULE_KIND_URL, "response": RESPONSE_MODE_403}}
+
+
+def run_scenario(args: argparse.Namespace,
+                 spawn: Any,
+                 origin: str,
+                 name: str,
+                 rules: Dict[str, Dict[str, Any]],
+                 paths: List[str],
+                 workdir: str,
+                 reconnect: bool = False) -> Dict[str, Any]:
+    """
+    用指定的规则启动代理，完成一轮压测后关闭代理。
+
+    :param args: 命令行参数。
+    :param spawn: multiprocessing 上下文。
+    :param origin: 源站地址。
+    :param name: 场景名称。
+    :param rules: 规则字典。
+    :param paths: 请求路径列表。
+    :param workdir: 代理工作目录。
+    :param reconnect: 每个请求都建立新连接。
+    :return: 结果字典。
+    """
+    port = free_port()
+    config_main = {**DEFAULT_CONFIG_MAIN, 'server_port': str(port), 'cache_size': '0', 'stream_size': str(args.stream_size)}
+    start = time.perf_counter()
+    proxy = spawn.Process(target=run_proxy, args=(config_main, rules, workdir), daemon=True)
+    proxy.start()
+    try:
+        if not wait_port(port, args.startup_timeout):
+            raise RuntimeError(f"Proxy for scenario {name} did not start")
+        startup = time.perf_counter() - start
+        client = LoadClient(origin, port, paths, reconnect)
+        elapsed = asyncio.run(client.run(args.requests, args.concurrency, args.warmup))
+        return summarize(name, client, elapsed, read_rss(proxy.pid), startup)
+    finally:
+        proxy.terminate()
+        proxy.join()
+
+
+def main() -> None:
+    """
+    解析命令行参数，依次运行直连和各规则数量下的压测，输出结果。
+
+    比较拦截阶段时，所有请求都命中规则：connect 和 request 每个请求都建立新连接，模拟浏览器对被拦截主机的重试；
+    request-ka 在隧道中复用长连接，是请求阶段拦截的最好情况。
+
+    :return: 无返回值。
+    """
+    parser = argparse.ArgumentParser(description='End-to-end proxy benchmark with a local origin server.')
+    parser.add_argument('--rules', default='10,1000,100000', help='comma separated rule counts (default: 10,1000,100000)')
+    parser.add_argument('--requests', type=int, default=3000, help='measured requests per scenario (default: 3000)')
+    parser.add_argument('--warmup', type=int, default=200, help='warm-up requests per scenario (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent connections (default: 32)')
+    parser.add_argument('--corpus', type=int, default=2000, help='number of distinct assets (default: 2000)')
+    parser.add_argument('--blocked-ratio', type=float, default=0.1, help='share of requests hitting a rule (default: 0.1)')
+    parser.add_argument('--stream-size', type=int, default=int(DEFAULT_CONFIG_MAIN['stream_size']), help='streaming threshold in KB, 0 to disable')
+    parser.add_argument('--tls', action='store_true', help='serve the origin over HTTPS and intercept it')
+    parser.add_argument('--no-direct', action='store_true', help='skip the direct (no proxy) baseline')
+    parser.add_argument('--block-stages', action='store_true', help='compare blocking the origin at CONNECT with blocking its URLs after interception (implies --tls)')
+    parser.add_argument('--startup-timeout', type=float, default=120, help='seconds to wait for the proxy to listen')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args()
+    args.tls = args.tls or args.block_stages
+
+    if not sys.platform.startswith('linux'):
+        parser.error('the benchmark reads memory usage from /proc and only runs on Linux')
+    spawn = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fgs-bench-') as workdir:
+        cert = make_certificate(workdir) if args.tls else None
+        origin_port = free_port()
+        origin = f"{'https' if args.tls else 'http'}://127.0.0.1:{origin_port}"
+        server = spawn.Process(target=run_origin, args=(origin_port, cert), daemon=True)
+        server.start()
+        try:
+            if not wait_port(origin_port, 10):
+                raise RuntimeError('Origin server did not start')
+            paths = make_paths(args)
+            if args.block_stages:
+                for name, stage, reconnect in (('connect', 'connect', True), ('request', 'request', True), ('request-ka', 'request', False)):
+                    results.append(run_scenario(args, spawn, origin, name, make_stage_rules(stage, origin), paths, workdir, reconnect))
+                    print(f"{name}: {results[-1]['rps']:.1f} req/s", file=sys.stderr)
+            else:
+                if not args.no_direct:
+                    client = LoadClient(origin, None, paths)
+                    elapsed = asyncio.run(client.run(args.requests, args.concurrency, args.warmup))
+                    results.append(summarize('direct', client, elapsed, (0, 0), 0))
+                for rule_count in (int(n) for n in args.rules.split(',') if n.strip()):
+                    rules = make_rules(rule_count, origin, args.seed)
+                    results.append(run_scenario(args, spawn, origin, str(rule_count), rules, paths, workdir))
+                    print(f"{rule_count} rules: {results[-1]['rps']:.1f} req/s", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.join()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
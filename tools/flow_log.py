@@ -0,0 +1,84 @@
+"""
+结构化请求日志的查看工具，输出汇总或逐条导出为 JSON Lines，供脚本进一步分析。
+
+在项目根目录下运行：
+
+```sh
+python -m tools.flow_log
+python -m tools.flow_log --backups --top 20
+python -m tools.flow_log --jsonl > flows.jsonl
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+from config.settings import FLOW_LOG_PATH
+from lib.flow_log import FIELDS, read_flow_log
+
+
+def summarize(path: str,
+              include_backups: bool,
+              top: int) -> None:
+    """
+    输出请求数、拦截数、流量和按流量排序的主机。
+
+    :param path: 日志文件路径。
+    :param include_backups: 是否包括轮转的备份文件。
+    :param top: 输出的主机数量。
+    :return: 无返回值。
+    """
+    started = time.perf_counter()
+    total = blocked = errors = size = 0
+    hosts: Dict[str, List[int]] = {}
+    for batch in read_flow_log(path, include_backups):
+        total += len(batch)
+        for host, status, length, rule in zip(batch.host, batch.status, batch.size, batch.rule):
+            entry = hosts.get(host)
+            if entry is None:
+                entry = hosts[host] = [0, 0, 0]
+            entry[0] += 1
+            entry[1] += length
+            if rule:
+                blocked += 1
+                entry[2] += 1
+            elif not status:
+                errors += 1
+            size += length
+    print(f"{total} flows, {blocked} blocked, {errors} errors, {size / 1048576:.1f} MB sent "
+          f"(read in {time.perf_counter() - started:.2f}s)")
+    print(f"{'requests':>10} {'MB':>10} {'blocked':>8}  host")
+    for host, (requests, length, host_blocked) in sorted(hosts.items(), key=lambda item: item[1][1], reverse=True)[:top]:
+        print(f"{requests:>10} {length / 1048576:>10.2f} {host_blocked:>8}  {host}")
+
+
+def main() -> None:
+    """
+    查看工具的入口函数，解析命令行参数后输出汇总或导出记录。
+
+    :return: 无返回值。
+    """
+    parser = argparse.ArgumentParser(prog='python -m tools.flow_log', description='Summarize or export the structured flow log.')
+    parser.add_argument('path', nargs='?', default=FLOW_LOG_PATH, help=f'flow log file (default: {FLOW_LOG_PATH})')
+    parser.add_argument('--backups', action='store_true', help='also read rotated backups, oldest first')
+    parser.add_argument('--jsonl', action='store_true', help='print every flow as a JSON object per line')
+    parser.add_argument('--top', type=int, default=10, help='number of hosts in the summary (default: 10)')
+    args = parser.parse_args()
+
+    if not args.jsonl:
+        summarize(args.path, args.backups, args.top)
+        return
+    write = sys.stdout.write
+    for batch in read_flow_log(args.path, args.backups):
+        for row in batch.rows():
+            write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
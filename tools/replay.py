@@ -0,0 +1,542 @@
+"""
+会话回放工具。读取 `proxy.headless --record` 录制的游戏会话，在本机启动一个按录制内容应答的源站，再分别用指定的规则文件
+启动代理，按录制时的顺序和并发重新发出全部请求，统计总加载时间、传输流量和被拦截的请求数。多个规则文件依次回放，结果并排输出，
+比较两套规则只需要一条命令。
+
+代理把所有请求转发到本机源站，主机名和路径保持录制时的原样，规则照常匹配；全部流量走本机回环地址，不需要联网。
+请求之间的依赖按录制时间推断：录制时某个请求开始前已经完成的请求，回放时也要先完成，它才会发出。被拦截的请求立即返回，
+依赖它的请求随之提前，总加载时间因此能反映规则的效果。源站默认按录制的服务器等待时间和传输时间延迟应答，`--no-delay` 时立即应答。
+
+录制时被规则拦截的请求没有真实内容，源站对它们返回 404，因此录制前最好停用全部规则。在项目根目录下运行：
+
+```sh
+python -m proxy.headless --record session.flows
+python -m tools.replay session.flows config/config_user.json config/suggested.json
+python -m tools.replay session.flows config/config_user.json --baseline --json replay.json
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import ssl
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import DEFAULT_CONFIG_MAIN
+from lib.rule_database import read_rules
+from tools.benchmark import free_port, wait_port, open_tunnel
+
+logger = logging.getLogger(__name__)
+
+# 代理在被拦截请求的响应中加上的标记头
+BLOCKED_HEADER = 'X-Replay-Blocked'
+# 不转发给客户端的响应头，内容长度由源站重新计算
+SKIPPED_HEADERS = {'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+# 源站按录制的传输时间分块发送响应内容的块大小
+CHUNK_SIZE = 64 * 1024
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class RecordedFlow:
+    """
+    录制会话中的一个请求及其响应，时间戳单位为秒。
+
+    :param flow: mitmproxy 的请求流。
+    """
+    __slots__ = ('method', 'scheme', 'host', 'port', 'path', 'content', 'start', 'end',
+                 'status', 'reason', 'headers', 'body', 'wait', 'transfer')
+
+    def __init__(self, flow: Any):
+        request = flow.request
+        response = flow.response
+        self.method = request.method
+        self.scheme = request.scheme
+        self.host = request.pretty_host.lower()
+        self.port = request.port
+        self.path = request.path
+        self.content = request.raw_content or b''
+        self.start = request.timestamp_start
+        if response is not None and response.timestamp_end:
+            end = response.timestamp_end
+        elif flow.error is not None:
+            end = flow.error.timestamp
+        else:
+            end = self.start
+        self.end = max(end, self.start)
+        # 录制时被拦截或出错的请求没有真实响应
+        self.status: Optional[int] = None
+        self.reason = ''
+        self.headers: List[Tuple[str, str]] = []
+        self.body = b''
+        self.wait = self.transfer = 0.0
+        if response is not None and 'blocked' not in flow.metadata:
+            self.status = response.status_code
+            self.reason = response.reason
+            self.headers = [(name, value) for name, value in response.headers.items(multi=True) if name.lower() not in SKIPPED_HEADERS]
+            # 流式传输的响应没有保存内容，按记录的大小填充
+            body = response.raw_content
+            self.body = body if body is not None else bytes(flow.metadata.get('stream_bytes', 0))
+            if request.timestamp_end and response.timestamp_start:
+                self.wait = max(0.0, response.timestamp_start - request.timestamp_end)
+            if response.timestamp_start and response.timestamp_end:
+                self.transfer = max(0.0, response.timestamp_end - response.timestamp_start)
+
+    @property
+    def authority(self) -> str:
+        """
+        主机和端口，默认端口时省略端口。
+
+        :return: 请求头中的主机名。
+        """
+        return self.host if DEFAULT_PORTS.get(self.scheme) == self.port else f'{self.host}:{self.port}'
+
+
+def load_session(path: str) -> List[RecordedFlow]:
+    """
+    读取录制的会话，按请求开始时间排序，忽略 CONNECT 请求和其他类型的流。
+
+    :param path: 录制文件路径。
+    :return: 请求列表。
+    """
+    from mitmproxy import io
+    from mitmproxy.http import HTTPFlow
+
+    with open(path, 'rb') as file:
+        flows = [RecordedFlow(flow) for flow in io.FlowReader(file).stream()
+                 if isinstance(flow, HTTPFlow) and flow.request.method != 'CONNECT']
+    flows.sort(key=lambda flow: flow.start)
+    return flows
+
+
+async def serve_recorded(reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter,
+                         responses: Dict[Tuple[str, str, str], List[RecordedFlow]],
+                         served: Dict[Tuple[str, str, str], int],
+                         delay: bool) -> None:
+    """
+    处理一个源站连接，支持 HTTP/1.1 长连接。按方法、主机和路径查找录制的响应，同一地址录制了多次时依次轮流应答，
+    找不到时返回 404。
+
+    :param reader: 连接读取流。
+    :param writer: 连接写入流。
+    :param responses: 按 (方法, 主机, 路径) 分组的录制请求。
+    :param served: 每个地址已应答的次数。
+    :param delay: 是否按录制的服务器等待时间和传输时间延迟应答。
+    :return: 无返回值。
+    """
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            method, path = lines[0].split(' ')[:2]
+            host = ''
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                name = name.strip().lower()
+                if name == 'content-length' and int(value):
+                    await reader.readexactly(int(value))
+                elif name == 'host':
+                    value = value.strip().lower()
+                    host = value[:value.index(']') + 1] if value.startswith('[') else value.partition(':')[0]
+            key = (method, host, path)
+            recorded = responses.get(key)
+            flow = None
+            if recorded:
+                flow = recorded[served.get(key, 0) % len(recorded)]
+                served[key] = served.get(key, 0) + 1
+            if flow is None or flow.status is None:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                continue
+            if delay and flow.wait:
+                await asyncio.sleep(flow.wait)
+            body = b'' if method == 'HEAD' else flow.body
+            headers = ''.join(f"{name}: {value}\r\n" for name, value in flow.headers)
+            writer.write(f"HTTP/1.1 {flow.status} {flow.reason or 'OK'}\r\n{headers}Content-Length: {len(flow.body)}\r\n\r\n".encode('latin-1', 'replace'))
+            if delay and flow.transfer and body:
+                # 按录制的传输时间分块发送
+                pause = flow.transfer * CHUNK_SIZE / len(body)
+                for offset in range(0, len(body), CHUNK_SIZE):
+                    writer.write(body[offset:offset + CHUNK_SIZE])
+                    await writer.drain()
+                    await asyncio.sleep(pause)
+            else:
+                writer.write(body)
+                await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+def run_origin(port: int,
+               session_path: str,
+               delay: bool) -> None:
+    """
+    源站进程入口，自行读取录制文件，避免在进程间传递响应内容。
+
+    :param port: 监听端口。
+    :param session_path: 录制文件路径。
+    :param delay: 是否按录制的时间延迟应答。
+    :return: 无返回值。
+    """
+    responses: Dict[Tuple[str, str, str], List[RecordedFlow]] = {}
+    for flow in load_session(session_path):
+        responses.setdefault((flow.method, flow.host, flow.path), []).append(flow)
+    served: Dict[Tuple[str, str, str], int] = {}
+
+    async def main() -> None:
+        server = await asyncio.start_server(lambda r, w: serve_recorded(r, w, responses, served, delay), '127.0.0.1', port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+class ReplayAddon:
+    """
+    回放代理中最后加入的插件，把放行的请求转发到本机源站，并标记被拦截的请求。
+
+    :param origin_port: 本机源站端口。
+    """
+
+    def __init__(self, origin_port: int):
+        self.origin_port = origin_port
+
+    def request(self, flow: Any) -> None:
+        """
+        把请求转发到本机源站，保留原来的主机名请求头，供源站查找录制的响应。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if flow.response is not None:
+            return
+        authority = flow.request.host_header
+        flow.request.scheme = 'http'
+        flow.request.host = '127.0.0.1'
+        flow.request.port = self.origin_port
+        flow.request.host_header = authority
+
+    def response(self, flow: Any) -> None:
+        """
+        在被拦截请求的响应中加上标记头，占位内容的状态码可能是 200，客户端无法据此区分。
+
+        :param flow: 当前的 HTTP 请求流。
+        :return: 无返回值。
+        """
+        if 'blocked' in flow.metadata:
+            flow.response.headers[BLOCKED_HEADER] = '1'
+
+
+def run_proxy(config_main: Dict[str, Any],
+              rules: Dict[str, Dict[str, Any]],
+              workdir: str,
+              origin_port: int) -> None:
+    """
+    代理进程入口，使用和程序相同的代理和插件。在临时目录中运行，日志和请求日志不会写入项目目录。
+    解密所有主机并且不预先连接目标主机，所有请求都由本机源站应答。
+
+    :param config_main: 主配置。
+    :param rules: 已启用的规则字典。
+    :param workdir: 工作目录。
+    :param origin_port: 本机源站端口。
+    :return: 无返回值。
+    """
+    from lib.logging_config import logging_config
+    from proxy.block_addon import BlockAddon
+    from proxy.master import create_master
+
+    os.chdir(workdir)
+    logging_config(log_file='proxy.log', log_level='INFO')
+    # 关闭 mitmproxy 在控制台逐条打印请求
+    sys.stdout = open(os.devnull, 'w')
+
+    async def main() -> None:
+        m = create_master(config_main, BlockAddon(rules))
+        m.options.update(allow_hosts=[], connection_strategy='lazy')
+        m.addons.add(ReplayAddon(origin_port))
+        await m.run()
+
+    asyncio.run(main())
+
+
+async def read_response(reader: asyncio.StreamReader,
+                        method: str) -> Tuple[int, Dict[str, str], int]:
+    """
+    读取一个完整的 HTTP/1.1 响应，支持 Content-Length 和分块传输。
+
+    :param reader: 连接读取流。
+    :param method: 请求方法，HEAD 请求的响应没有内容。
+    :return: (状态码, 响应头, 内容长度) 元组，响应头名称为小写。
+    """
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    lines = head.split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if method == 'HEAD' or status in (204, 304) or status < 200:
+        return status, headers, 0
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        await reader.readexactly(length)
+        return status, headers, length
+    length = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            length += size
+            if size == 0:
+                break
+    return status, headers, length
+
+
+class ReplayClient:
+    """
+    回放客户端。按录制时推断的依赖关系发出请求，同一主机的空闲连接会被复用。
+
+    :param proxy_port: 代理端口。
+    :param flows: 按开始时间排序的请求列表。
+    :param timeout: 单个请求的超时时间（秒）。
+    """
+
+    def __init__(self,
+                 proxy_port: int,
+                 flows: List[RecordedFlow],
+                 timeout: float):
+        self.proxy_port = proxy_port
+        self.flows = flows
+        self.timeout = timeout
+        self.pool: Dict[Tuple[str, str], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self.requests = 0
+        self.blocked = 0
+        self.errors = 0
+        self.bytes = 0
+        self.context = ssl.create_default_context()
+        self.context.check_hostname = False
+        self.context.verify_mode = ssl.CERT_NONE
+
+    async def connect(self, flow: RecordedFlow) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        建立到代理的连接。HTTPS 请求先建立 CONNECT 隧道，再在隧道中握手，代理的证书不做校验。
+
+        :param flow: 请求。
+        :return: (读取流, 写入流) 元组。
+        """
+        if flow.scheme != 'https':
+            return await asyncio.open_connection('127.0.0.1', self.proxy_port)
+        sock = await asyncio.to_thread(open_tunnel, self.proxy_port, f'{flow.host}:{flow.port}')
+        return await asyncio.open_connection(sock=sock, ssl=self.context, server_hostname=flow.host)
+
+    async def fetch(self, flow: RecordedFlow) -> None:
+        """
+        发出一个请求并读取响应，统计流量和拦截情况。
+
+        :param flow: 请求。
+        :return: 无返回值。
+        """
+        key = (flow.scheme, flow.authority)
+        idle = self.pool.get(key)
+        connection = idle.pop() if idle else None
+        try:
+            if connection is None:
+                connection = await self.connect(flow)
+            reader, writer = connection
+            target = flow.path if flow.scheme == 'https' else f'http://{flow.authority}{flow.path}'
+            writer.write(f"{flow.method} {target} HTTP/1.1\r\nHost: {flow.authority}\r\nUser-Agent: replay\r\n"
+                         f"Content-Length: {len(flow.content)}\r\n\r\n".encode('latin-1', 'replace') + flow.content)
+            status, headers, length = await read_response(reader, flow.method)
+        except ConnectionError as e:
+            # 整主机规则直接拒绝 CONNECT 隧道
+            if str(e).startswith('HTTP/'):
+                self.requests += 1
+                self.blocked += 1
+            else:
+                self.errors += 1
+            if connection is not None:
+                connection[1].close()
+            return
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            self.errors += 1
+            if connection is not None:
+                connection[1].close()
+            return
+        except asyncio.CancelledError:
+            if connection is not None:
+                connection[1].close()
+            raise
+        self.requests += 1
+        self.bytes += length
+        if BLOCKED_HEADER.lower() in headers:
+            self.blocked += 1
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self.pool.setdefault(key, []).append(connection)
+
+    async def run(self) -> float:
+        """
+        回放全部请求。每个请求等到录制时在它开始前已经完成的请求都完成后才发出，请求按开始时间依次发出，
+        因此只需要记录按结束时间排序后已经连续完成的请求数。
+
+        :return: 从第一个请求发出到最后一个请求完成的耗时（秒）。
+        """
+        flows = self.flows
+        ends = sorted(flow.end for flow in flows)
+        order = sorted(range(len(flows)), key=lambda i: flows[i].end)
+        rank = [0] * len(flows)
+        for position, i in enumerate(order):
+            rank[i] = position
+        finished = bytearray(len(flows))
+        completed = 0
+        progress = asyncio.Event()
+
+        async def replay_one(i: int) -> None:
+            nonlocal completed
+            try:
+                await asyncio.wait_for(self.fetch(flows[i]), self.timeout)
+            except asyncio.TimeoutError:
+                self.errors += 1
+            finished[rank[i]] = 1
+            while completed < len(flows) and finished[completed]:
+                completed += 1
+            progress.set()
+
+        start = time.perf_counter()
+        tasks = []
+        for i, flow in enumerate(flows):
+            # 录制时在该请求开始前已经结束的请求
+            needed = bisect_left(ends, flow.start)
+            while completed < needed:
+                progress.clear()
+                await progress.wait()
+            tasks.append(asyncio.create_task(replay_one(i)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        for connections in self.pool.values():
+            for _, writer in connections:
+                writer.close()
+        return elapsed
+
+
+def run_scenario(args: argparse.Namespace,
+                 spawn: Any,
+                 name: str,
+                 rules: Dict[str, Dict[str, Any]],
+                 flows: List[RecordedFlow],
+                 workdir: str) -> Dict[str, Any]:
+    """
+    启动源站和使用指定规则的代理，回放一次会话后关闭两者。每次回放都启动新的源站，重复请求的地址从头轮流应答。
+
+    :param args: 命令行参数。
+    :param spawn: multiprocessing 上下文。
+    :param name: 场景名称。
+    :param rules: 已启用的规则字典。
+    :param flows: 请求列表。
+    :param workdir: 代理工作目录。
+    :return: 结果字典。
+    """
+    origin_port = free_port()
+    server = spawn.Process(target=run_origin, args=(origin_port, args.session, not args.no_delay), daemon=True)
+    server.start()
+    port = free_port()
+    config_main = {**DEFAULT_CONFIG_MAIN, 'server_port': str(port), 'cache_size': '0'}
+    proxy = spawn.Process(target=run_proxy, args=(config_main, rules, workdir, origin_port), daemon=True)
+    proxy.start()
+    try:
+        if not wait_port(origin_port, args.startup_timeout):
+            raise RuntimeError('Origin server did not start')
+        if not wait_port(port, args.startup_timeout):
+            raise RuntimeError(f"Proxy with {name} did not start")
+        client = ReplayClient(port, flows, args.timeout)
+        elapsed = asyncio.run(client.run())
+        return {
+            'scenario': name,
+            'rules': len(rules),
+            'load_time': elapsed,
+            'requests': client.requests,
+            'blocked': client.blocked,
+            'errors': client.errors,
+            'bytes': client.bytes,
+        }
+    finally:
+        proxy.terminate()
+        server.terminate()
+        proxy.join()
+        server.join()
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """
+    以表格形式输出结果。
+
+    :param results: 结果字典列表。
+    :return: 无返回值。
+    """
+    width = max(len('scenario'), *(len(r['scenario']) for r in results))
+    print(f"{'scenario':<{width}} {'rules':>7} {'load s':>8} {'requests':>9} {'blocked':>8} {'errors':>7} {'MB':>9}")
+    for r in results:
+        print(f"{r['scenario']:<{width}} {r['rules']:>7} {r['load_time']:>8.2f} {r['requests']:>9} {r['blocked']:>8} "
+              f"{r['errors']:>7} {r['bytes'] / 1048576:>9.2f}")
+
+
+def main() -> None:
+    """
+    解析命令行参数，依次用各规则文件回放录制的会话，输出结果。
+
+    :return: 无返回值。
+    """
+    parser = argparse.ArgumentParser(prog='python -m tools.replay', description='Replay a recorded session through the proxy with different rule files.')
+    parser.add_argument('session', help='session recorded with proxy.headless --record')
+    parser.add_argument('rules', nargs='*', help='user config files (JSON or rule database) to compare, active rules only')
+    parser.add_argument('--baseline', action='store_true', help='also replay without any rules')
+    parser.add_argument('--no-delay', action='store_true', help='answer at once instead of with the recorded server timing')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds before a single request fails (default: 60)')
+    parser.add_argument('--startup-timeout', type=float, default=120, help='seconds to wait for the proxy to listen')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not os.path.isfile(args.session):
+        parser.error(f'session file not found: {args.session}')
+    scenarios = [('(no rules)', {})] if args.baseline else []
+    for path in args.rules:
+        if not os.path.isfile(path):
+            parser.error(f'rule file not found: {path}')
+        scenarios.append((path, read_rules(path, active_only=True)))
+    if not scenarios:
+        parser.error('give at least one rule file or --baseline')
+    flows = load_session(args.session)
+    if not flows:
+        parser.error(f'no HTTP flows in {args.session}')
+    missing = sum(1 for flow in flows if flow.status is None)
+    logger.info(f"Loaded {len(flows)} flows over {flows[-1].end - flows[0].start:.1f}s recorded, {missing} without a response")
+
+    spawn = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fgs-replay-') as workdir:
+        for name, rules in scenarios:
+            results.append(run_scenario(args, spawn, name, rules, flows, workdir))
+            logger.info(f"{name}: {results[-1]['load_time']:.2f}s")
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
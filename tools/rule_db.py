@@ -0,0 +1,59 @@
+"""
+规则数据库与 JSON 用户配置之间的转换工具。
+
+在项目根目录下运行：
+
+```sh
+python -m tools.rule_db import config/config_user.json config/config_user.db
+python -m tools.rule_db export config/config_user.db config/config_user.json
+```
+
+导入时已存在的规则被替换，其余规则保留；导出时覆盖目标文件。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import argparse
+import logging
+import os
+import sys
+
+from lib.rule_database import RuleDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    转换工具的入口函数，解析命令行参数后导入或导出规则。
+
+    :return: 无返回值。
+    """
+    parser = argparse.ArgumentParser(prog='python -m tools.rule_db', description='Convert rules between the JSON user config and a rule database.')
+    parser.add_argument('action', choices=['import', 'export'], help='import: JSON to database, export: database to JSON')
+    parser.add_argument('source', help='source file')
+    parser.add_argument('target', help='target file')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not os.path.isfile(args.source):
+        logger.error(f"File not found: {args.source}")
+        sys.exit(1)
+    if args.action == 'import':
+        database = RuleDatabase(args.target)
+        count = database.import_json(args.source)
+        ok = count >= 0
+    else:
+        database = RuleDatabase(args.source)
+        count = database.count()
+        ok = database.export_json(args.target)
+    database.close()
+    if not ok:
+        logger.error(f"Failed to {args.action} rules")
+        sys.exit(1)
+    logger.info(f"{args.action.capitalize()}ed {count} rules: {args.source} -> {args.target}")
+
+
+if __name__ == '__main__':
+    main()
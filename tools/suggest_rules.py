@@ -0,0 +1,113 @@
+"""
+规则建议工具。从结构化请求日志中找出加载耗时最多的资源目录，输出建议的前缀规则及估算的节省，并可以导出为用户配置格式的文件，
+在程序中通过「编辑」-「导入」一次性添加。
+
+已被拦截的请求和已被现有规则覆盖的地址不计入，已存在的规则不会重复建议。
+
+在项目根目录下运行：
+
+```sh
+python -m tools.suggest_rules
+python -m tools.suggest_rules --backups --by size --limit 50
+python -m tools.suggest_rules --depth 3 --output config/suggested.json
+```
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+from config.settings import (CONFIG_MAIN_PATH, DEFAULT_CONFIG_MAIN, FLOW_LOG_PATH, RULE_KIND_URL, RESPONSE_MODE_403, RESPONSE_MODE_SWF,
+                             RESPONSE_MODE_PNG, RESPONSE_MODE_GIF, RESPONSE_MODE_MP3)
+from lib.flow_log import read_flow_log
+from lib.read_json import read_json
+from lib.rule_database import read_rules
+from lib.traffic_trie import TrafficTrie, TrafficNode, WEIGHTS, aggregate_flows
+from lib.write_json import write_json
+from proxy.block_addon import BlockAddon
+
+logger = logging.getLogger(__name__)
+
+# 按资源扩展名选择拦截后的响应，让游戏拿到同类型的占位内容
+EXTENSION_RESPONSES = {
+    'swf': RESPONSE_MODE_SWF,
+    'png': RESPONSE_MODE_PNG,
+    'gif': RESPONSE_MODE_GIF,
+    'mp3': RESPONSE_MODE_MP3,
+}
+
+
+def choose_response(node: TrafficNode) -> str:
+    """
+    按子树中流量最多的资源扩展名选择拦截后的响应，没有对应的占位内容时返回 403。
+
+    :param node: 前缀树节点。
+    :return: 响应方式。
+    """
+    sizes = Counter()
+    for leaf in node.iter_leaves():
+        sizes[leaf.prefix.rpartition('.')[2].lower()] += leaf.size
+    extension = max(sizes, key=sizes.get, default='')
+    return EXTENSION_RESPONSES.get(extension, RESPONSE_MODE_403)
+
+
+def main() -> None:
+    """
+    规则建议工具的入口函数，解析命令行参数后输出建议的规则。
+
+    :return: 无返回值。
+    """
+    config_main = (read_json(CONFIG_MAIN_PATH) if os.path.isfile(CONFIG_MAIN_PATH) else None) or DEFAULT_CONFIG_MAIN
+    config_user_path = config_main.get('config_user_path', DEFAULT_CONFIG_MAIN['config_user_path'])
+    parser = argparse.ArgumentParser(prog='python -m tools.suggest_rules', description='Suggest prefix rules for the assets that cost the most load time.')
+    parser.add_argument('path', nargs='?', default=FLOW_LOG_PATH, help=f'flow log file (default: {FLOW_LOG_PATH})')
+    parser.add_argument('--backups', action='store_true', help='also read rotated backups, oldest first')
+    parser.add_argument('--config', default=config_user_path, help=f'user config with the existing rules (default: {config_user_path})')
+    parser.add_argument('--by', choices=WEIGHTS, default='duration', help='rank by total load time, bytes or request count (default: duration)')
+    parser.add_argument('--depth', type=int, default=2, help='minimum path segments of a suggested rule (default: 2)')
+    parser.add_argument('--share', type=float, default=0.8, help='narrow a prefix while one child keeps this share of its weight (default: 0.8)')
+    parser.add_argument('--limit', type=int, default=20, help='number of suggestions (default: 20)')
+    parser.add_argument('--output', help='write the suggestions to this file in user config format, disabled, ready to import')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not os.path.isfile(args.path):
+        logger.error(f"File not found: {args.path}")
+        sys.exit(1)
+    started = time.perf_counter()
+    rules = read_rules(args.config)
+    matcher = BlockAddon.compile({key: info for key, info in rules.items() if info.get('active', False)})
+    totals = aggregate_flows(read_flow_log(args.path, args.backups))
+    trie = TrafficTrie()
+    for (scheme, host, path), (requests, size, duration) in totals.items():
+        # 按现有规则会被拦截的地址不再计入
+        if matcher.match_host(host) is None and matcher.match(f'{scheme or "http"}://{host}{path}') is None:
+            trie.add(scheme, host, path, requests, size, duration)
+    suggestions = [node for node in trie.suggest(len(rules) + args.limit, args.by, args.depth, args.share) if node.prefix not in rules][:args.limit]
+    logger.info(f"{trie.requests} requests, {trie.size / 1048576:.1f} MB, {trie.duration:.1f}s of load time from {len(totals)} URLs "
+                f"on {len(trie.hosts)} hosts (analyzed in {time.perf_counter() - started:.2f}s)")
+
+    total = getattr(trie, args.by) or 1
+    print(f"{'share':>7} {'requests':>10} {'MB':>10} {'seconds':>10}  rule")
+    suggested = {}
+    for node in suggestions:
+        print(f"{getattr(node, args.by) / total:>7.1%} {node.requests:>10} {node.size / 1048576:>10.2f} {node.duration:>10.1f}  {node.prefix}")
+        suggested[node.prefix] = {
+            "active": False,
+            "description": f"Suggested: {node.requests} requests, {node.size / 1048576:.1f} MB, {node.duration:.0f}s",
+            "kind": RULE_KIND_URL,
+            "response": choose_response(node),
+        }
+    if args.output:
+        write_json(args.output, suggested)
+        logger.info(f"Wrote {len(suggested)} suggestions to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
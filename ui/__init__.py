@@ -7,6 +7,7 @@ from .status_bar import StatusBar
 from .tray_icon import TrayIcon
 from .lang_manager import LangManager
 from .config_manager import ConfigManager
+from .stats_manager import StatsManager
 from .main_table import MainTable
 from .global_signals import Global_Signals
 from .action_exit import ActionExit
@@ -19,4 +20,5 @@ from .action_disable import ActionDisable
 from .action_add import ActionAdd
 from .action_edit import ActionEdit
 from .action_delete import ActionDelete
+from .action_import import ActionImport
 from .action_start import ActionStart
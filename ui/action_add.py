@@ -10,7 +10,7 @@ import logging
 
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QAction, QTableWidget, QDialog
+from PyQt5.QtWidgets import QAction, QTableView, QDialog
 
 from lib.get_resource_path import get_resource_path
 from ui.config_manager import ConfigManager
@@ -33,7 +33,7 @@ class ActionAdd(QObject):
     def __init__(self,
                  lang_manager: LangManager,
                  config_manager: ConfigManager,
-                 table: QTableWidget):
+                 table: QTableView):
         super().__init__()
         self.lang_manager = lang_manager
         self.lang_manager.lang_updated.connect(self.update_lang)
@@ -69,14 +69,12 @@ class ActionAdd(QObject):
         :return: 无返回值。
         """
         try:
-            config_user = self.config_manager.get_config('user')
             dialog = DialogTable(self.lang_manager)
 
             # 打开输入弹窗输入内容，点击确定后更新配置
-            if dialog.exec_() == QDialog.Accepted:
-                config_user[dialog.url_edit.text()] = {"active": False, "description": dialog.description_edit.text()}
-
-            self.config_manager.update_config('user', config_user)
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            self.config_manager.update_rules({dialog.url_edit.text(): dialog.get_info()})
             self.status_updated.emit(self.lang['ui.action_add_3'])
             logger.info("New Item added")
         except Exception:
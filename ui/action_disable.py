@@ -10,7 +10,7 @@ import logging
 
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QAction, QTableWidget
+from PyQt5.QtWidgets import QAction, QTableView
 
 from lib.get_resource_path import get_resource_path
 from ui.config_manager import ConfigManager
@@ -32,7 +32,7 @@ class ActionDisable(QObject):
     def __init__(self,
                  lang_manager: LangManager,
                  config_manager: ConfigManager,
-                 table: QTableWidget):
+                 table: QTableView):
         super().__init__()
         self.lang_manager = lang_manager
         self.lang_manager.lang_updated.connect(self.update_lang)
@@ -68,14 +68,11 @@ class ActionDisable(QObject):
         :return: 无返回值。
         """
         try:
-            config_user = self.config_manager.get_config('user')
-            rows = len(self.table.selectionModel().selectedRows())
+            keys = self.table.selected_keys()
+            rows = len(keys)
 
-            # 更新配置中的启用状态
-            for item in self.table.selectedItems():
-                config_user[self.table.item(item.row(), 2).text()]['active'] = False
-
-            self.config_manager.update_config('user', config_user)
+            # 只更新选中规则的启用状态
+            self.config_manager.set_active(keys, False)
             self.status_updated.emit(f"{rows} {self.lang['ui.action_disable_3']}")
             logger.info(f"{rows} Items disabled.")
         except Exception:
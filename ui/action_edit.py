@@ -10,8 +10,9 @@ import logging
 
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QAction, QTableWidget, QDialog
+from PyQt5.QtWidgets import QAction, QTableView, QDialog
 
+from config.settings import RULE_KIND_URL, RESPONSE_MODE_403
 from lib.get_resource_path import get_resource_path
 from ui.config_manager import ConfigManager
 from ui.dialog_table import DialogTable
@@ -33,7 +34,7 @@ class ActionEdit(QObject):
     def __init__(self,
                  lang_manager: LangManager,
                  config_manager: ConfigManager,
-                 table: QTableWidget):
+                 table: QTableView):
         super().__init__()
         self.lang_manager = lang_manager
         self.lang_manager.lang_updated.connect(self.update_lang)
@@ -69,18 +70,20 @@ class ActionEdit(QObject):
         :return: 无返回值。
         """
         try:
-            config_user = self.config_manager.get_config('user')
-            row = self.table.currentRow()
+            key = self.table.current_key()
+            info = self.config_manager.get_rule(key) if key is not None else None
+            if info is None:
+                return
             dialog = DialogTable(self.lang_manager)
-            dialog.description_edit.setText(self.table.item(row, 1).text())
-            dialog.url_edit.setText(self.table.item(row, 2).text())
-
-            # 从配置中删除原条目再插入新条目
-            if dialog.exec_() == QDialog.Accepted:
-                config_user.pop(self.table.item(row, 2).text(), None)
-                config_user[dialog.url_edit.text()] = {"active": False, "description": dialog.description_edit.text()}
-
-            self.config_manager.update_config('user', config_user)
+            dialog.description_edit.setText(info.get('description', ''))
+            dialog.url_edit.setText(key)
+            dialog.set_kind(info.get('kind', RULE_KIND_URL))
+            dialog.set_response(info.get('response', RESPONSE_MODE_403))
+
+            # 删除原条目再插入新条目，地址没有修改时原地替换
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            self.config_manager.update_rules({dialog.url_edit.text(): dialog.get_info()}, [key])
             self.status_updated.emit(self.lang['ui.action_edit_3'])
             logger.info("Item modified.")
         except Exception:
@@ -0,0 +1,82 @@
+"""
+本模块提供从文件批量导入规则的功能，例如规则建议工具导出的建议。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+
+import logging
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QAction, QTableView, QFileDialog
+
+from lib.read_json import read_json
+from ui.config_manager import ConfigManager
+from ui.lang_manager import LangManager
+
+logger = logging.getLogger(__name__)
+
+
+class ActionImport(QObject):
+    """
+    导入规则操作的类。
+
+    :param lang_manager: 语言管理器，用于处理界面语言设置。
+    :param config_manager: 配置管理器，用于管理应用配置。
+    :param table: 主表格对象。
+    """
+    status_updated = pyqtSignal(str)
+
+    def __init__(self,
+                 lang_manager: LangManager,
+                 config_manager: ConfigManager,
+                 table: QTableView):
+        super().__init__()
+        self.lang_manager = lang_manager
+        self.lang_manager.lang_updated.connect(self.update_lang)
+        self.config_manager = config_manager
+        self.table = table
+        self.init_ui()
+
+    def init_ui(self) -> None:
+        """
+        初始化用户界面组件。
+
+        :return: 无返回值。
+        """
+        self.action_import = QAction('Import')
+        self.action_import.triggered.connect(self.import_items)
+        self.update_lang()
+
+    def update_lang(self) -> None:
+        """
+        更新界面语言设置。
+
+        :return: 无返回值。
+        """
+        self.lang = self.lang_manager.get_lang()
+        self.action_import.setText(self.lang['ui.action_import_1'])
+        self.action_import.setStatusTip(self.lang['ui.action_import_2'])
+
+    def import_items(self) -> None:
+        """
+        选择用户配置格式的 JSON 文件，把其中的新规则一次性加入配置。已存在的规则保持不变，不会被文件中的同名规则覆盖。
+
+        :return: 无返回值。
+        """
+        try:
+            file_name, _ = QFileDialog.getOpenFileName(self.table, self.lang['ui.action_import_4'], "", "Text Files (*.json);;All Files (*)")
+            if not file_name:
+                return
+            rules = read_json(file_name)
+            if not isinstance(rules, dict):
+                self.status_updated.emit(self.lang['label_status_error'])
+                return
+            rules = {key: info for key, info in rules.items() if isinstance(info, dict) and self.config_manager.get_rule(key) is None}
+            self.config_manager.update_rules(rules)
+            self.status_updated.emit(f"{len(rules)} {self.lang['ui.action_import_3']}")
+            logger.info(f"{len(rules)} Items imported from {file_name}")
+        except Exception:
+            logger.exception("Error occurred while import items")
+            self.status_updated.emit(self.lang['label_status_error'])
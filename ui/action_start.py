@@ -1,27 +1,25 @@
 """
 提供应用程序的主要功能，启动代理和处理请求。
 
+代理相关的模块都会导入 mitmproxy，本模块只导入不依赖 mitmproxy 的代理运行器，主窗口显示后再在后台预热代理。
+
 :author: assassing
 :contact: https://github.com/hxz393
 :copyright: Copyright 2024, hxz393. 保留所有权利。
 """
 
-import asyncio
 import logging
-import socket
 from threading import Thread
-from typing import List
+from typing import Dict, Any
 
 from PyQt5.QtCore import pyqtSignal, QObject
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QAction
-from mitmproxy import http
-from mitmproxy import options
-from mitmproxy.http import HTTPFlow
-from mitmproxy.tools.dump import DumpMaster
 
-from config.settings import DEFAULT_CONFIG_USER, DEFAULT_CONFIG_MAIN
+from config.settings import DEFAULT_CONFIG_MAIN
 from lib.get_resource_path import get_resource_path
+from lib.is_port_available import is_port_available
+from proxy.runner import ProxyRunner
 from ui.config_manager import ConfigManager
 from ui.lang_manager import LangManager
 from ui.message_show import message_show
@@ -29,71 +27,18 @@ from ui.message_show import message_show
 logger = logging.getLogger(__name__)
 
 
-class BlockAddon:
-    """
-    用于阻断指定 URL 请求的插件。
-
-    :param patterns: 要阻止的 URL 列表。
-    """
-
-    def __init__(self, patterns: List[str]):
-        self.patterns = patterns
-
-    async def request(self, flow: HTTPFlow) -> None:
-        """
-        检查并处理每个请求的 URL 地址，如果请求的 URL 匹配到指定的模式之一，则阻断该请求。
-
-        :param flow: 当前的 HTTP 请求流。
-        :return: 无返回值。
-        """
-        # 遍历模式列表，检查每个模式是否在 URL 中
-        for pattern in self.patterns:
-            # 匹配到一个模式后，阻断连接，返回 403 状态码，不继续检查其他模式
-            if pattern in flow.request.url:
-                flow.response = http.Response.make(
-                    403,
-                    b"This URL is blocked.",
-                    {"Content-Type": "text/plain"}
-                )
-                break
-
-
-class LoggerAddon:
-    """
-    用于记录请求到日志的插件。
-    """
-
-    def __init__(self):
-        pass
-
-    @staticmethod
-    async def response(flow: HTTPFlow) -> None:
-        """
-        记录每个 HTTP 响应的关键信息到日志。
-
-        :param flow: 当前的 HTTP 请求流，包括请求和响应的信息。
-        :return: 无返回值。
-        """
-        # 构建需要记录的信息字符串
-        url = flow.request.url
-        method = flow.request.method
-        http_version = flow.request.http_version
-        status_code = flow.response.status_code
-        reason = flow.response.reason
-        content_length_kb = len(flow.response.content) / 1024
-        info = f"{method} {url} {http_version} << {status_code} {reason} {content_length_kb:.1f}KB"
-
-        logging.warning(info) if status_code == 403 else logging.info(info)
-
-
 class ActionStart(QObject):
     """
     启动代理动作类。
 
     :param lang_manager: 语言管理器，用于设置和更新界面语言。
     :param config_manager: 配置管理器，用于读取和修改设置。
+    :ivar rule_stats_updated: 代理定期推送规则命中数据时发出的信号，从代理线程发出。
+    :ivar proxy_stopped: 代理线程退出时发出的信号，从代理线程发出。
     """
     status_updated = pyqtSignal(str)
+    rule_stats_updated = pyqtSignal(dict)
+    proxy_stopped = pyqtSignal()
 
     def __init__(self,
                  lang_manager: LangManager,
@@ -102,6 +47,13 @@ class ActionStart(QObject):
         self.lang_manager = lang_manager
         self.lang_manager.lang_updated.connect(self.update_lang)
         self.config_manager = config_manager
+        self.config_manager.config_user_updated.connect(self.reload_rules)
+        self.config_manager.config_user_changed.connect(self.reload_rules)
+        # 在后台线程中运行的代理，用于预热和热更新规则
+        self.runner = ProxyRunner(self.rule_stats_updated.emit, self.proxy_stopped.emit)
+        self.rules_version = 0
+        # 代理运行出错或退出后，恢复开始按钮
+        self.proxy_stopped.connect(self.stopped)
         self.init_ui()
 
     def init_ui(self) -> None:
@@ -125,6 +77,18 @@ class ActionStart(QObject):
         self.action_start.setText(self.lang['ui.action_start_1'])
         self.action_start.setStatusTip(self.lang['ui.action_start_2'])
 
+    def prewarm(self) -> None:
+        """
+        在后台线程中预热代理，应在主窗口显示后调用。预热完成后点击启动可以立即开始监听。
+
+        :return: 无返回值。
+        """
+        try:
+            config_main = self.config_manager.get_config('main') or DEFAULT_CONFIG_MAIN
+            self.runner.prewarm(config_main, self.get_rules())
+        except Exception:
+            logger.exception('Failed to pre-warm proxy!')
+
     def start(self) -> None:
         """
         启动服务的处理流程。
@@ -132,73 +96,76 @@ class ActionStart(QObject):
         :return: 无返回值。
         """
         try:
-            config_user = self.config_manager.get_config('user') or DEFAULT_CONFIG_USER
             config_main = self.config_manager.get_config('main') or DEFAULT_CONFIG_MAIN
             port = int(config_main.get('server_port', 12345))
-            patterns = [k for k, v in config_user.items() if v.get('active', False)]
+            rules = self.get_rules()
 
-            if not patterns:
+            if not rules:
                 message_show('Warning', self.lang['ui.action_start_3'])
                 return
-            elif not self.is_port_available(port):
+            elif not is_port_available(port):
                 message_show('Critical', self.lang['ui.action_start_5'])
                 return
             else:
                 # 开始按钮不可点击
                 self.action_start.setEnabled(False)
 
-            # 新开线程启动服务
-            thread = Thread(target=self.start_proxy, args=(port, patterns))
-            thread.daemon = True
-            thread.start()
+            # 在代理线程中启动服务
+            self.runner.start(config_main, rules)
 
             self.status_updated.emit(self.lang['ui.action_start_4'])
         except Exception:
             logger.exception('Failed to start proxy!')
             self.status_updated.emit(self.lang['label_status_error'])
 
-    @staticmethod
-    def is_port_available(port: int) -> bool:
+    def stopped(self) -> None:
         """
-        检查指定端口是否可用。
+        代理线程退出后，恢复开始按钮，可以重新启动。
 
-        :param port: 要检查的端口号。
-        :return: 端口可用返回 True，否则返回 False。
+        :return: 无返回值。
         """
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            try:
-                s.bind(("", port))
-                return True
-            except OSError:
-                return False
+        self.action_start.setEnabled(True)
 
-    def start_proxy(self,
-                    port: int,
-                    patterns: List[str]) -> None:
+    def get_rules(self) -> Dict[str, Dict[str, Any]]:
         """
-        启动代理服务器。
+        从用户配置中取出已启用的规则。
 
-        :param port: 监听端口。
-        :param patterns: 拦截地址列表。
-        :return: 无返回值。
+        :return: 已启用的规则字典。
         """
-        asyncio.run(self.run_mitmproxy(port, patterns))
+        return self.config_manager.get_active_rules()
 
-    @staticmethod
-    async def run_mitmproxy(port: int, patterns: List[str]) -> None:
+    def reload_rules(self) -> None:
         """
-        异步运行 mitmproxy 代理。
+        用户配置更新后，把新规则热加载到运行中的代理。代理未运行时不做处理。
+
+        规则在后台线程编译，完成后通过 call_soon_threadsafe 在代理的事件循环中替换，不阻塞界面和代理。
 
-        :param port: 监听端口。
-        :param patterns: 拦截地址列表。
         :return: 无返回值。
         """
-        m = DumpMaster(options.Options(listen_port=port, http2=True))
-        m.addons.add(BlockAddon(patterns))
-        m.addons.add(LoggerAddon())
+        if not self.runner.is_running:
+            return
+        try:
+            self.rules_version += 1
+            thread = Thread(target=self._compile_and_swap, args=(self.get_rules(), self.rules_version))
+            thread.daemon = True
+            thread.start()
+        except Exception:
+            logger.exception('Failed to reload rules!')
+            self.status_updated.emit(self.lang['label_status_error'])
 
+    def _compile_and_swap(self,
+                          rules: Dict[str, Dict[str, Any]],
+                          version: int) -> None:
+        """
+        编译规则，并提交到代理的事件循环中替换。
+
+        :param rules: 已启用的规则字典。
+        :param version: 规则版本号。
+        :return: 无返回值。
+        """
         try:
-            await m.run()
+            self.runner.reload(rules, version)
+            self.status_updated.emit(f"{self.lang['ui.action_start_6']}{len(rules)}")
         except Exception:
-            print('错误〉！©')
-            logger.exception("An error occurred!")
+            logger.exception('Failed to reload rules!')
+            self.status_updated.emit(self.lang['label_status_error'])
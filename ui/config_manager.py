@@ -8,13 +8,15 @@
 
 import copy
 import logging
-from typing import Dict, Optional, Any
+import os
+from typing import Dict, Optional, Any, Iterable, Iterator, Tuple
 
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from config.settings import CONFIG_MAIN_PATH, DEFAULT_CONFIG_MAIN, DEFAULT_CONFIG_USER
+from config.settings import CONFIG_MAIN_PATH, DEFAULT_CONFIG_MAIN, DEFAULT_CONFIG_USER, JSON_WRITE_DELAY, JSON_COMPACT_SIZE
+from lib.deferred_json_writer import DeferredJsonWriter
 from lib.read_json import read_json
-from lib.write_json import write_json
+from lib.rule_database import RuleDatabase, is_rule_database
 
 logger = logging.getLogger(__name__)
 
@@ -23,24 +25,72 @@ class ConfigManager(QObject):
     """
     配置管理器类，负责管理和更新应用程序的配置信息。
 
+    用户配置可以整体更新，也可以只增删改其中几条规则。增量更新直接修改内存中的配置，不重新读取，
+    并通过 config_user_changed 信号只告知变化的规则。整体更新和增量更新都只修改内存中的配置，
+    配置文件在短暂等待后由后台线程写入，连续的多次修改只写一次，
+    规则超过 JSON_COMPACT_SIZE 条时使用紧凑格式。规则信息字典在更新时整体替换，不在原地修改，
+    因此取出的规则信息可以在其他线程中只读使用。
+
+    用户配置文件的扩展名为 .db 时使用规则数据库保存规则，内存中不保存规则字典，各方法直接查询数据库，增量更新在一个事务中完成。
+    数据库文件不存在时自动创建，并从同名的 JSON 配置文件导入规则。
+
     :ivar config_main_updated: 当主配置更新时发出的信号。
-    :ivar config_user_updated: 当用户配置更新时发出的信号。
+    :ivar config_user_updated: 当用户配置整体更新时发出的信号。
+    :ivar config_user_changed: 当用户配置增量更新时发出的信号，参数为新增或修改的规则字典，以及删除的规则列表。
     """
     config_main_updated = pyqtSignal()
     config_user_updated = pyqtSignal()
+    config_user_changed = pyqtSignal(dict, list)
 
     def __init__(self):
         super().__init__()
+        self._database: Optional[RuleDatabase] = None
+        self._writer = DeferredJsonWriter(JSON_WRITE_DELAY)
         self.load_config()
 
     def load_config(self) -> None:
         """
-        载入配置。
+        载入配置。先写入尚未写入的修改，避免读到旧的配置。
 
         :return: 无返回值。
         """
-        self._config_main = read_json(CONFIG_MAIN_PATH) or DEFAULT_CONFIG_MAIN
-        self._config_user = read_json(self._config_main.get('config_user_path', '')) or DEFAULT_CONFIG_USER
+        self._writer.flush()
+        self._config_main = read_json(CONFIG_MAIN_PATH) or copy.deepcopy(DEFAULT_CONFIG_MAIN)
+        config_user_path = self._config_user_path()
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+        if is_rule_database(config_user_path):
+            self._database = self._open_database(config_user_path)
+            self._config_user = {}
+        else:
+            # 增量更新会直接修改用户配置，不能引用默认配置本身
+            self._config_user = read_json(config_user_path) or copy.deepcopy(DEFAULT_CONFIG_USER)
+
+    def _config_user_path(self) -> str:
+        """
+        获取用户配置文件路径。
+
+        :return: 用户配置文件路径。
+        """
+        return self._config_main.get('config_user_path', DEFAULT_CONFIG_MAIN['config_user_path'])
+
+    @staticmethod
+    def _open_database(path: str) -> RuleDatabase:
+        """
+        打开规则数据库。数据库不存在时新建，并从同名的 JSON 配置文件导入规则，没有同名文件时写入默认规则。
+
+        :param path: 数据库文件路径。
+        :return: 规则数据库。
+        """
+        exists = os.path.isfile(path)
+        database = RuleDatabase(path)
+        if not exists:
+            json_path = os.path.splitext(path)[0] + '.json'
+            if not os.path.isfile(json_path) or database.import_json(json_path) < 0:
+                database.update_rules(DEFAULT_CONFIG_USER)
+            logger.info(f"Rule database created: {path}, {database.count()} rules")
+        return database
 
     def get_config(self, config_type: str) -> Optional[Dict[str, Any]]:
         """
@@ -52,12 +102,122 @@ class ConfigManager(QObject):
         try:
             if config_type == 'main':
                 return copy.deepcopy(self._config_main)
+            elif self._database is not None:
+                return self._database.get_rules()
             else:
                 return copy.deepcopy(self._config_user)
         except Exception:
             logger.exception(f"Failed to get config: {config_type}")
             return None
 
+    def get_rules(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取全部规则。只复制外层字典，规则信息字典只读，不要修改。
+
+        :return: 规则字典。
+        """
+        if self._database is not None:
+            return self._database.get_rules()
+        return dict(self._config_user)
+
+    def get_active_rules(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取已启用的规则。规则信息字典只读，不要修改。
+
+        :return: 已启用的规则字典。
+        """
+        if self._database is not None:
+            return self._database.get_active_rules()
+        return {k: v for k, v in self._config_user.items() if v.get('active', False)}
+
+    def iter_rules(self) -> Iterator[Tuple[str, str, bool]]:
+        """
+        按顺序逐条获取规则的地址、描述和启用状态，供规则表格载入。使用规则数据库时分页读取。
+
+        :return: (规则, 描述, 启用状态) 元组的迭代器。
+        """
+        if self._database is not None:
+            return self._database.iter_rows()
+        return ((k, v.get('description', ''), v.get('active', False)) for k, v in self._config_user.items())
+
+    def get_rule(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        获取一条规则信息的副本。
+
+        :param key: 规则。
+        :return: 规则信息字典，规则不存在时返回 None。
+        """
+        if self._database is not None:
+            return self._database.get_rule(key)
+        info = self._config_user.get(key)
+        return None if info is None else dict(info)
+
+    def update_rules(self,
+                     rules: Dict[str, Dict[str, Any]],
+                     removed: Iterable[str] = ()) -> None:
+        """
+        增量更新用户配置：先删除指定规则，再新增或替换规则，新增的规则排在最后。
+
+        :param rules: 新增或替换的规则字典。
+        :param removed: 要删除的规则列表，不存在的规则会被忽略。
+        :return: 无返回值。
+        """
+        try:
+            rules = {key: dict(info) for key, info in rules.items()}
+            if self._database is not None:
+                removed = self._database.update_rules(rules, removed)
+                if not rules and not removed:
+                    return
+            else:
+                # 同时出现在两个参数中的规则按替换处理，保留原来的位置
+                removed = [key for key in removed if key not in rules and key in self._config_user]
+                for key in removed:
+                    del self._config_user[key]
+                self._config_user.update(rules)
+                if not rules and not removed:
+                    return
+                # 规则信息字典只会被整体替换，复制外层字典后即可在后台线程中序列化
+                self._writer.schedule(self._config_user_path(), dict(self._config_user), len(self._config_user) > JSON_COMPACT_SIZE)
+            self.config_user_changed.emit(rules, removed)
+            logger.info(f"Config user changed: {len(rules)} updated, {len(removed)} removed")
+        except Exception:
+            logger.exception("Failed to change user config")
+
+    def remove_rules(self, keys: Iterable[str]) -> None:
+        """
+        删除多条规则。
+
+        :param keys: 要删除的规则列表。
+        :return: 无返回值。
+        """
+        self.update_rules({}, keys)
+
+    def set_active(self,
+                   keys: Iterable[str],
+                   active: bool) -> None:
+        """
+        设置多条规则的启用状态，状态没有变化的规则不会写入和通知。
+
+        :param keys: 规则列表。
+        :param active: 是否启用。
+        :return: 无返回值。
+        """
+        if self._database is not None:
+            try:
+                rules = self._database.set_active(keys, active)
+                if rules:
+                    self.config_user_changed.emit(rules, [])
+                    logger.info(f"Config user changed: {len(rules)} updated, 0 removed")
+            except Exception:
+                logger.exception("Failed to change user config")
+            return
+        rules = {}
+        for key in keys:
+            info = self._config_user.get(key)
+            if info is not None and info.get('active', False) != active:
+                rules[key] = {**info, 'active': active}
+        self.update_rules(rules)
+
     def update_config(self,
                       config_type: str,
                       new_config: Dict[str, Any]) -> None:
@@ -70,14 +230,30 @@ class ConfigManager(QObject):
         """
         try:
             if config_type == 'main':
-                write_json(CONFIG_MAIN_PATH, new_config)
+                config_user_path = self._config_user_path()
+                self._config_main = copy.deepcopy(new_config)
+                self._writer.schedule(CONFIG_MAIN_PATH, copy.deepcopy(new_config))
+                # 用户配置文件换了，写入待写的修改后重新载入
+                if self._config_user_path() != config_user_path:
+                    self.load_config()
+            elif self._database is not None:
+                self._database.replace_all(new_config)
             else:
-                write_json(self._config_main.get('config_user_path', DEFAULT_CONFIG_MAIN['config_user_path']), new_config)
+                self._config_user = copy.deepcopy(new_config)
+                self._writer.schedule(self._config_user_path(), dict(self._config_user), len(self._config_user) > JSON_COMPACT_SIZE)
 
-            # 重载配置，发送更新信号
-            self.load_config()
+            # 发送更新信号
             self.config_main_updated.emit()
             self.config_user_updated.emit()
             logger.info(f"Config updated: {config_type}")
         except Exception:
             logger.exception(f"Failed to update config: {config_type}")
+
+    def flush(self) -> None:
+        """
+        立即写入尚未写入的配置修改，程序退出前调用。
+
+        :return: 无返回值。
+        """
+        if not self._writer.flush():
+            logger.error("Failed to save config")
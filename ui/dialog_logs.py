@@ -1,24 +1,25 @@
 """
 本模块提供了用于日志查看和管理的功能，包括日志显示、过滤、清空等。
 
+日志以虚拟化列表显示，数据模型通过内存映射和行索引按需读取可见的行，可以流畅浏览完整的日志文件。
+
 :author: assassing
 :contact: https://github.com/hxz393
 :copyright: Copyright 2024, hxz393. 保留所有权利。
 """
 
 import logging
-import re
 import webbrowser
-from typing import Optional
 
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor, QIcon
-from PyQt5.QtWidgets import QDialog, QTextEdit, QVBoxLayout, QPushButton, QHBoxLayout, QComboBox, QLabel
+from PyQt5.QtGui import QIcon, QKeySequence, QCloseEvent
+from PyQt5.QtWidgets import QDialog, QTableView, QHeaderView, QVBoxLayout, QPushButton, QHBoxLayout, QComboBox, QLabel, QShortcut, QApplication, QAbstractItemView, QLineEdit
 
-from config.settings import GITHUB_URL, LOG_PATH, LOG_COLORS, LOG_LEVELS, LOG_DEFAULT_LEVEL, LOG_LINES, LOG_UPDATE_RATE
+from config.settings import GITHUB_URL, LOG_PATH, LOG_LEVELS, LOG_DEFAULT_LEVEL, LOG_UPDATE_RATE, LOG_FILTER_DELAY
 from lib.get_resource_path import get_resource_path
 from lib.write_list_to_file import write_list_to_file
 from ui.lang_manager import LangManager
+from ui.log_list_model import LogListModel
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +31,6 @@ class DialogLogs(QDialog):
     :param lang_manager: 语言管理器，用于界面语言的国际化。
     """
     status_updated = pyqtSignal(str)
-    log_pattern = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
 
     def __init__(self, lang_manager: LangManager):
         super().__init__(flags=Qt.Dialog | Qt.WindowCloseButtonHint)
@@ -47,10 +47,24 @@ class DialogLogs(QDialog):
         self.setWindowIcon(QIcon(get_resource_path('media/icons8-log-26.png')))
         self.resize(600, 470)
 
-        # 创建日志文本编辑器，设置为只读，不换行
-        self.text_edit = QTextEdit(self)
-        self.text_edit.setReadOnly(True)
-        self.text_edit.setLineWrapMode(QTextEdit.NoWrap)
+        # 创建日志列表。使用单列表格并固定行高，视图按行号直接计算位置，不像列表视图那样在插入行时重新排列所有行
+        self.log_model = LogListModel(LOG_PATH)
+        self.log_model.rowsAboutToBeInserted.connect(self._check_follow)
+        self.log_model.rows_loaded.connect(self._follow_end)
+        self.log_model.rows_prepended.connect(self._keep_position)
+        self.log_view = QTableView(self)
+        self.log_view.horizontalHeader().hide()
+        self.log_view.horizontalHeader().setStretchLastSection(True)
+        self.log_view.verticalHeader().hide()
+        self.log_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.log_view.verticalHeader().setDefaultSectionSize(self.log_view.fontMetrics().height() + 2)
+        self.log_view.setShowGrid(False)
+        self.log_view.setWordWrap(False)
+        self.log_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.log_view.setModel(self.log_model)
+        # 滚动条在最底部时，新加载的行自动滚动到可见
+        self._following = True
+        QShortcut(QKeySequence.Copy, self.log_view, self.copy_selected)
 
         # 创建标签和下拉框
         self.label = QLabel(self)
@@ -58,6 +72,14 @@ class DialogLogs(QDialog):
         self.combo_box.addItem(LOG_DEFAULT_LEVEL, None)
         self.combo_box.addItems(LOG_LEVELS)
         self.combo_box.currentIndexChanged.connect(self.filter_logs)
+        # 创建过滤框，停止输入片刻后再查找，避免每输入一个字符都查找整个文件
+        self.filter_edit = QLineEdit(self)
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(LOG_FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.filter_logs)
+        self.filter_edit.textChanged.connect(self.filter_timer.start)
 
         # 创建按钮
         self.feedback_button = QPushButton(self)
@@ -77,6 +99,7 @@ class DialogLogs(QDialog):
         top_layout.addWidget(self.label)
         top_layout.addWidget(self.combo_box)
         top_layout.addStretch()
+        top_layout.addWidget(self.filter_edit)
 
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.feedback_button)
@@ -87,17 +110,14 @@ class DialogLogs(QDialog):
 
         layout = QVBoxLayout(self)
         layout.addLayout(top_layout)
-        layout.addWidget(self.text_edit)
+        layout.addWidget(self.log_view)
         layout.addLayout(button_layout)
 
         # 初始化定时器，但不立即启动
         self.update_timer = QTimer(self)
         self.update_timer.timeout.connect(self.update_logs)
-        # 添加一个标记来追踪实时更新状态
-        self.log_file_position = 0
 
         self.update_lang()
-        self.load_logs()
 
     def update_lang(self) -> None:
         """
@@ -112,54 +132,31 @@ class DialogLogs(QDialog):
         self.clear_button.setText(self.lang['ui.dialog_logs_5'])
         self.close_button.setText(self.lang['ui.dialog_logs_6'])
         self.refresh_button.setText(self.lang['ui.dialog_logs_7'])
-
-    def load_logs(self) -> None:
-        """
-        读取日志文件的内容，并根据当前的筛选级别显示日志信息。
-
-        :return: 无返回值。
-        """
-        try:
-            self.text_edit.clear()
-            logs_content = self._read_logs_file()
-            self._process_logs(logs_content)
-            self.text_edit.moveCursor(QTextCursor.End)
-        except Exception:
-            logger.exception("Error opening log file")
-            self.status_updated.emit(self.lang['label_status_error'])
+        self.filter_edit.setPlaceholderText(self.lang['ui.dialog_logs_8'])
 
     def clear_logs(self) -> None:
         """
-        清空文本编辑器中的日志，并清空日志文件。
+        清空日志列表，并清空日志文件。清空前先释放日志文件的映射，否则 Windows 上无法截断文件。
 
         :return: 无返回值。
         """
         try:
-            self.text_edit.clear()
+            self.log_model.close()
             write_list_to_file(LOG_PATH, [])
             logger.info("All logs cleared")
+            self.log_model.refresh()
         except Exception:
             logger.exception("Error clearing logs")
             self.status_updated.emit(self.lang['label_status_error'])
 
     def update_logs(self) -> None:
         """
-        读取新的日志内容并追加到文本编辑器。
+        加载日志文件中新增的内容，日志被轮转时接着加载新文件，被清空时从头加载。
 
         :return: 无返回值。
         """
         try:
-            with open(LOG_PATH, 'r', encoding='utf8') as file:
-                # 移动到上次读取的位置
-                file.seek(self.log_file_position)
-                # 读取新内容
-                new_content = file.read()
-                # 更新读取位置
-                self.log_file_position = file.tell()
-            # 如果有新内容
-            if new_content:
-                self._process_logs(new_content)
-                self.text_edit.moveCursor(QTextCursor.End)
+            self.log_model.refresh()
         except Exception:
             logger.exception("Error updating logs")
             self.status_updated.emit(self.lang['label_status_error'])
@@ -177,115 +174,74 @@ class DialogLogs(QDialog):
             self.update_timer.stop()
             logger.info("break tail")
 
-    @staticmethod
-    def _read_logs_file() -> str:
+    def filter_logs(self) -> None:
         """
-        此方法从日志文件中读取所有日志内容并返回。
+        根据用户在下拉框中选择的日志级别和过滤框中的文字筛选日志。
 
-        :return: 日志文件的内容。
+        :return: 无返回值。
         """
         try:
-            with open(LOG_PATH, 'r', encoding='utf8') as file:
-                lines = file.readlines()
-                # 获取最后的LOG_LINES行
-                return ''.join(lines[-int(LOG_LINES):])
+            self.filter_timer.stop()
+            selected_level = self.combo_box.currentText()
+            text = self.filter_edit.text()
+            self.log_model.set_filter(selected_level, text)
+            self.log_view.scrollToBottom()
+            logger.info(f"Filtered logs: level {selected_level}, text '{text.strip()}'")
         except Exception:
-            logger.exception("Error reading log file")
-            return ""
+            logger.exception("Error filtering logs")
+            self.status_updated.emit(self.lang['label_status_error'])
 
-    def _process_logs(self,
-                      logs_content: str,
-                      filter_level: Optional[str] = None) -> None:
+    def copy_selected(self) -> None:
         """
-        将日志内容按照指定的过滤级别进行处理，并显示在文本编辑器中。
+        把选中的日志行复制到剪贴板。
 
-        :param logs_content: 完整的日志内容。
-        :param filter_level: 要筛选的日志级别，可选。
+        :return: 无返回值。
         """
-        start_positions = [match.start() for match in DialogLogs.log_pattern.finditer(logs_content)]
+        rows = sorted(index.row() for index in self.log_view.selectionModel().selectedRows())
+        QApplication.clipboard().setText('\n'.join(self.log_model.index(row).data() for row in rows))
 
-        for i in range(len(start_positions)):
-            start = start_positions[i]
-            end = start_positions[i + 1] if i + 1 < len(start_positions) else None
-            log_entry = logs_content[start:end]
-            if filter_level is None or self._is_log_entry_of_level(log_entry, filter_level):
-                self._parse_and_display_log(log_entry)
-
-    def _parse_and_display_log(self, log_entry: str) -> None:
+    def _check_follow(self) -> None:
         """
-        解析单条日志信息，并以适当的颜色显示在文本编辑器中。
+        插入新行前记录滚动条是否在最底部。
 
-        :param log_entry: 单条日志的内容。
+        :return: 无返回值。
         """
-        match = DialogLogs.log_pattern.search(log_entry)
-        if match:
-            log_level = match.group(1)
-            color = LOG_COLORS.get(log_level, "black")
-        else:
-            color = "black"
-        self._append_log(log_entry, color)
+        scroll_bar = self.log_view.verticalScrollBar()
+        self._following = scroll_bar.value() >= scroll_bar.maximum()
 
-    def filter_logs(self) -> None:
+    def _follow_end(self) -> None:
         """
-        根据用户在下拉框中选择的日志级别筛选日志。
+        插入新行后，如果之前在最底部，滚动到最后一行。
 
         :return: 无返回值。
         """
-        try:
-            selected_level = self.combo_box.currentText()
-
-            # 保存当前光标位置
-            current_cursor = self.text_edit.textCursor()
-            current_position = current_cursor.position()
-
-            # 清除并重新加载日志
-            self.text_edit.clear()
-            logs_content = self._read_logs_file()
-            self._process_logs(logs_content, selected_level)
+        if self._following:
+            self.log_view.scrollToBottom()
 
-            # 尝试恢复光标到之前的位置
-            new_cursor = self.text_edit.textCursor()
-            new_cursor.setPosition(min(current_position, len(self.text_edit.toPlainText())))
-            self.text_edit.setTextCursor(new_cursor)
-            logger.info(f"Filtered level of logs: {selected_level}")
-        except Exception:
-            logger.exception("Error filtering logs")
-            self.status_updated.emit(self.lang['label_status_error'])
-
-    def _append_log(self,
-                    log: str,
-                    color: str) -> None:
+    def _keep_position(self, count: int) -> None:
         """
-        使用指定的颜色将单条日志文本添加到文本编辑器中。
+        在最前面插入更早的行后，按插入的行数下移滚动条，可见的行保持不变。
 
-        :param log: 要添加的日志文本。
-        :param color: 日志文本的颜色。
+        :param count: 插入的行数。
         :return: 无返回值。
         """
-        color_format = QTextCharFormat()
-        color_format.setForeground(QColor(color))
-
-        cursor = self.text_edit.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertText(log, color_format)
-
-    @staticmethod
-    def _is_log_entry_of_level(log_entry: str,
-                               selected_level: str) -> bool:
+        # 视图默认延迟更新滚动范围，先更新再移动，否则会被限制在插入前的范围内
+        self.log_view.updateGeometries()
+        if self.log_view.verticalScrollMode() == QAbstractItemView.ScrollPerPixel:
+            count *= self.log_view.verticalHeader().defaultSectionSize()
+        scroll_bar = self.log_view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + count)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
         """
-        检查日志条目是否为或高于用户选定的日志级别。
+        关闭对话框时停止实时更新，释放日志文件。
 
-        :param log_entry: 单条日志的内容。
-        :param selected_level: 选定的日志级别。
-        :return: 日志条目是否为选定级别。
+        :param event: 关闭事件对象。
+        :return: 无返回值。
         """
-        if selected_level == LOG_DEFAULT_LEVEL:
-            return True
-        selected_index = LOG_LEVELS.index(selected_level)
-        for level in LOG_LEVELS[selected_index:]:
-            if f' - {level} - ' in log_entry:
-                return True
-        return False
+        self.update_timer.stop()
+        self.log_model.close()
+        super().closeEvent(event)
 
     def open_github(self) -> None:
         """
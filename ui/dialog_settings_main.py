@@ -54,7 +54,7 @@ class DialogSettingsMain(QDialog):
         self.setWindowTitle(self.lang['ui.dialog_settings_main_1'])
         self.setWindowIcon(QIcon(get_resource_path('media/icons8-setting-26')))
         self.setStyleSheet("font-size: 14px;")
-        self.setMinimumSize(370, 230)
+        self.setMinimumSize(370, 340)
 
         # 主布局
         layout = QVBoxLayout()
@@ -87,6 +87,16 @@ class DialogSettingsMain(QDialog):
         self.port_line_edit.textChanged.connect(self._check_port_change)
         main_layout.addWidget(QLabel(self.lang['ui.dialog_settings_main_3']))
         main_layout.addWidget(self.port_line_edit)
+        # 输入框：流式传输阈值，超过该大小的响应边下载边转发，0 为关闭。大于 0 时大小未知的响应也全部流式传输
+        self.stream_line_edit = QLineEdit(self.config_main.get('stream_size', DEFAULT_CONFIG_MAIN['stream_size']))
+        self.stream_line_edit.setValidator(QIntValidator(0, 1048576, self))
+        main_layout.addWidget(QLabel(self.lang['ui.dialog_settings_main_8']))
+        main_layout.addWidget(self.stream_line_edit)
+        # 输入框：缓存大小，0 为关闭缓存
+        self.cache_line_edit = QLineEdit(self.config_main.get('cache_size', DEFAULT_CONFIG_MAIN['cache_size']))
+        self.cache_line_edit.setValidator(QIntValidator(0, 1048576, self))
+        main_layout.addWidget(QLabel(self.lang['ui.dialog_settings_main_7']))
+        main_layout.addWidget(self.cache_line_edit)
         # 输入框：用户配置文件路径
         input_layout = QHBoxLayout()
         self.config_line_edit = QLineEdit(self.config_main.get('config_user_path', ''))
@@ -153,7 +163,7 @@ class DialogSettingsMain(QDialog):
         :return: 无返回值。
         """
         options = QFileDialog.Options()
-        fileName, _ = QFileDialog.getOpenFileName(self, self.lang['ui.dialog_settings_main_6'], "", "All Files (*);;Text Files (*.json)", options=options)
+        fileName, _ = QFileDialog.getOpenFileName(self, self.lang['ui.dialog_settings_main_6'], "", "All Files (*);;Text Files (*.json);;Rule Database (*.db *.sqlite *.sqlite3)", options=options)
         if fileName:
             self.config_line_edit.setText(fileName)
 
@@ -165,6 +175,8 @@ class DialogSettingsMain(QDialog):
         """
         self.config_main['lang'] = self.language_combo_box.currentText()
         self.config_main['server_port'] = self.port_line_edit.text()
+        self.config_main['stream_size'] = self.stream_line_edit.text() or '0'
+        self.config_main['cache_size'] = self.cache_line_edit.text() or '0'
         self.config_main['config_user_path'] = self.config_line_edit.text()
 
         # 更新 ConfigManager 类实例中的配置
@@ -7,16 +7,38 @@
 """
 
 import logging
+import re
+from typing import Dict, Union
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox
 
+from config.settings import (RULE_KINDS, RULE_KIND_URL, RULE_KIND_HOST, RULE_KIND_GLOB, RULE_KIND_REGEX, RESPONSE_MODES, RESPONSE_MODE_403, RESPONSE_MODE_EMPTY,
+                             RESPONSE_MODE_SWF, RESPONSE_MODE_PNG, RESPONSE_MODE_GIF, RESPONSE_MODE_MP3)
 from lib.get_resource_path import get_resource_path
 from ui.lang_manager import LangManager
+from ui.message_show import message_show
 
 logger = logging.getLogger(__name__)
 
+# 规则类型对应的显示文字
+KIND_LANG_KEYS = {
+    RULE_KIND_URL: 'ui.dialog_table_3',
+    RULE_KIND_HOST: 'ui.dialog_table_4',
+    RULE_KIND_GLOB: 'ui.dialog_table_12',
+    RULE_KIND_REGEX: 'ui.dialog_table_13',
+}
+# 拦截响应对应的显示文字
+RESPONSE_LANG_KEYS = {
+    RESPONSE_MODE_403: 'ui.dialog_table_6',
+    RESPONSE_MODE_EMPTY: 'ui.dialog_table_7',
+    RESPONSE_MODE_SWF: 'ui.dialog_table_8',
+    RESPONSE_MODE_PNG: 'ui.dialog_table_9',
+    RESPONSE_MODE_GIF: 'ui.dialog_table_10',
+    RESPONSE_MODE_MP3: 'ui.dialog_table_11',
+}
+
 
 class DialogTable(QDialog):
     """
@@ -45,13 +67,88 @@ class DialogTable(QDialog):
         self.description_edit = QLineEdit(self)
         layout.addWidget(QLabel(f"{self.lang['ui.table_main_2']}:"))
         layout.addWidget(self.description_edit)
+        # 规则类型
+        self.kind_combo = QComboBox(self)
+        for kind in RULE_KINDS:
+            self.kind_combo.addItem(self.lang[KIND_LANG_KEYS[kind]], kind)
+        layout.addWidget(QLabel(f"{self.lang['ui.dialog_table_2']}:"))
+        layout.addWidget(self.kind_combo)
         # 地址信息
         self.url_edit = QLineEdit(self)
         layout.addWidget(QLabel(f"{self.lang['ui.table_main_3']}:"))
         layout.addWidget(self.url_edit)
+        # 拦截后返回的内容
+        self.response_combo = QComboBox(self)
+        for mode in RESPONSE_MODES:
+            self.response_combo.addItem(self.lang[RESPONSE_LANG_KEYS[mode]], mode)
+        layout.addWidget(QLabel(f"{self.lang['ui.dialog_table_5']}:"))
+        layout.addWidget(self.response_combo)
         # 在两个组件之间添加弹性空间
         layout.addStretch()
         # 确认按钮
         self.ok_button = QPushButton(self.lang['ui.dialog_settings_main_11'], self)
         self.ok_button.clicked.connect(self.accept)
         layout.addWidget(self.ok_button)
+
+    def accept(self) -> None:
+        """
+        点击确认时校验规则，正则表达式无法编译时提示错误并保留对话框。
+
+        :return: 无返回值。
+        """
+        if self.get_kind() == RULE_KIND_REGEX:
+            try:
+                re.compile(self.url_edit.text())
+            except re.error as e:
+                message_show('Warning', f"{self.lang['ui.dialog_table_14']}{e}")
+                return
+        super().accept()
+
+    def get_info(self) -> Dict[str, Union[str, bool]]:
+        """
+        获取对话框中填写的规则信息，新增或修改的规则默认不启用。
+
+        :return: 规则信息字典。例如：{"active": false, "description": "xxx", "kind": "url", "response": "403"}
+        """
+        return {
+            "active": False,
+            "description": self.description_edit.text(),
+            "kind": self.get_kind(),
+            "response": self.get_response(),
+        }
+
+    def set_kind(self, kind: str) -> None:
+        """
+        选中指定的规则类型。
+
+        :param kind: 规则类型。
+        :return: 无返回值。
+        """
+        index = self.kind_combo.findData(kind)
+        self.kind_combo.setCurrentIndex(max(index, 0))
+
+    def get_kind(self) -> str:
+        """
+        获取选中的规则类型。
+
+        :return: 规则类型。
+        """
+        return self.kind_combo.currentData()
+
+    def set_response(self, mode: str) -> None:
+        """
+        选中指定的拦截响应。
+
+        :param mode: 响应模式。
+        :return: 无返回值。
+        """
+        index = self.response_combo.findData(mode)
+        self.response_combo.setCurrentIndex(max(index, 0))
+
+    def get_response(self) -> str:
+        """
+        获取选中的拦截响应。
+
+        :return: 响应模式。
+        """
+        return self.response_combo.currentData()
@@ -0,0 +1,206 @@
+"""
+这个模块提供日志列表的数据模型，视图只会请求可见行的数据，日志再多也只解码和着色屏幕上的几十行。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+
+import logging
+from array import array
+from itertools import repeat
+from operator import add
+from typing import Any, Optional
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QVariant, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from config.settings import LOG_COLORS, LOG_DEFAULT_LEVEL
+from lib.log_index import LogIndex, LEVELS
+
+logger = logging.getLogger(__name__)
+
+# 行所属日志级别的数据角色
+LEVEL_ROLE = Qt.UserRole + 1
+
+
+class LogListModel(QAbstractListModel):
+    """
+    日志列表数据模型。打开后从文件末尾开始，在空闲时分批建立行索引，每批完成后追加行，大文件也能立即显示最新的日志。
+    追上文件末尾后，再逐批补上更早的行，插入到最前面。
+
+    可以按级别和文字筛选。只按级别筛选时直接显示行索引中该级别的行号数组，切换级别不需要读取文件；
+    有筛选文字时在文件中查找一次，之后只在新增的行中查找。
+
+    日志文件只在读取时映射，每批索引、每次筛选和每次绘制之后释放，不妨碍日志轮转。
+
+    :param path: 日志文件路径。
+    :ivar rows_loaded: 追加新行后发出的信号。
+    :ivar rows_prepended: 在最前面插入更早的行后发出的信号，参数为插入的行数。
+    """
+    rows_loaded = pyqtSignal()
+    rows_prepended = pyqtSignal(int)
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.log_index = LogIndex(path)
+        self.colors = {level: QColor(color) for level, color in LOG_COLORS.items()}
+        # 筛选的最低级别代码和文字
+        self.min_level = 0
+        self.text = ''
+        # 显示的行号，为 None 时显示全部行。只按级别筛选时与行索引共用数组，数组会先于视图变长
+        self.rows: Optional[array] = None
+        # 已通知视图的行数，索引先建立再通知视图插入
+        self._count = 0
+        self._index_timer = QTimer(self)
+        self._index_timer.timeout.connect(self._index_chunk)
+        self._index_timer.start(0)
+        # 视图读取数据后，回到事件循环时释放映射
+        self._release_timer = QTimer(self)
+        self._release_timer.setSingleShot(True)
+        self._release_timer.timeout.connect(self.log_index.release)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        row = index.row() if self.rows is None else self.rows[index.row()]
+        if not self._release_timer.isActive():
+            self._release_timer.start(0)
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            return self.log_index.line(row)
+        elif role == LEVEL_ROLE:
+            return self.log_index.level(row)
+        elif role == Qt.ForegroundRole:
+            return self.colors.get(self.log_index.level(row))
+        return QVariant()
+
+    def close(self) -> None:
+        """
+        停止建立索引，清空行索引并释放日志文件。
+
+        :return: 无返回值。
+        """
+        self._index_timer.stop()
+        self.beginResetModel()
+        self.log_index.reset()
+        self._apply_filter()
+        self.endResetModel()
+
+    def refresh(self) -> None:
+        """
+        检查日志文件的变化，为新增的内容建立索引。文件被轮转时保留原文件的行，接着加载新文件；
+        再次轮转移除了更早的行，或者文件被清空时，重新显示。
+
+        :return: 无返回值。
+        """
+        first = len(self.log_index)
+        if self.log_index.refresh():
+            self.beginResetModel()
+            self._apply_filter()
+            self.endResetModel()
+        elif len(self.log_index) > first:
+            # 轮转时从原文件读完的行，和新建立索引的行一样追加和筛选
+            self._append_rows(first)
+            self.log_index.release()
+        if not self._index_timer.isActive():
+            self._index_timer.start(0)
+
+    def set_filter(self,
+                   level: str,
+                   text: str = '') -> None:
+        """
+        只显示指定级别及以上、并且包含指定文字的日志行。
+
+        :param level: 日志级别，为 LOG_DEFAULT_LEVEL 时不按级别筛选。
+        :param text: 筛选文字，区分大小写，为空时不按文字筛选。
+        :return: 无返回值。
+        """
+        self.beginResetModel()
+        self.min_level = 0 if level == LOG_DEFAULT_LEVEL else LEVELS.index(level)
+        self.text = text.strip()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _apply_filter(self) -> None:
+        """
+        按当前的筛选条件重新确定显示的行，调用方负责通知视图重置。
+
+        :return: 无返回值。
+        """
+        if self.text:
+            self.rows = self.log_index.search(self.text, min_level=self.min_level)
+        else:
+            self.rows = self.log_index.level_rows[self.min_level]
+        self._count = len(self.log_index) if self.rows is None else len(self.rows)
+        self.log_index.release()
+
+    def _index_chunk(self) -> None:
+        """
+        建立一批行索引并追加新行。没有新内容时补上一批更早的行，也没有更早的行时停止定时器。
+
+        :return: 无返回值。
+        """
+        try:
+            first = len(self.log_index)
+            if not self.log_index.index_more():
+                if not self._index_older():
+                    self._index_timer.stop()
+                return
+            self._append_rows(first)
+        except Exception:
+            self._index_timer.stop()
+            logger.exception("Error indexing log file")
+        finally:
+            self.log_index.release()
+
+    def _append_rows(self, first: int) -> None:
+        """
+        追加从指定行号开始新编入索引的行，有筛选文字时只追加其中命中的行。
+
+        :param first: 第一个新行的行号。
+        :return: 无返回值。
+        """
+        if self.text:
+            new_rows = self.log_index.search(self.text, first, min_level=self.min_level)
+            total = len(self.rows) + len(new_rows)
+        else:
+            new_rows = None
+            total = len(self.log_index) if self.rows is None else len(self.rows)
+        if total > self._count:
+            self.beginInsertRows(QModelIndex(), self._count, total - 1)
+            if new_rows is not None:
+                self.rows.extend(new_rows)
+            self._count = total
+            self.endInsertRows()
+        self.rows_loaded.emit()
+
+    def _index_older(self) -> bool:
+        """
+        为更早的一批行建立索引，并把其中需要显示的行插入到最前面。
+
+        :return: 补上了更早的行时返回 True，已经到达文件开头时返回 False。
+        """
+        # 原来开头的续行补上之前的行后可能改变级别，有筛选文字时连同它们一起重新查找
+        head = self.log_index.head_continuations
+        count = self.log_index.index_older()
+        if not count:
+            return False
+        if self.text:
+            new_rows = self.log_index.search(self.text, 0, count + head, min_level=self.min_level)
+            old_rows = array('i', map(add, (row for row in self.rows if row >= head), repeat(count)))
+            total = len(new_rows) + len(old_rows)
+        else:
+            new_rows = old_rows = None
+            total = len(self.log_index) if self.rows is None else len(self.rows)
+        inserted = total - self._count
+        if inserted > 0:
+            self.beginInsertRows(QModelIndex(), 0, inserted - 1)
+            if new_rows is not None:
+                self.rows = new_rows + old_rows
+            self._count = total
+            self.endInsertRows()
+            self.rows_prepended.emit(inserted)
+        elif new_rows is not None:
+            self.rows = new_rows + old_rows
+        return True
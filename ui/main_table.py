@@ -1,5 +1,5 @@
 """
-此文件定义了 MainTable 类，一个基于 PyQt5 的 QTableWidget 的高级实现。
+此文件定义了 MainTable 类，一个基于 PyQt5 的 QTableView 的规则表格。
 
 :author: assassing
 :contact: https://github.com/hxz393
@@ -7,13 +7,11 @@
 """
 
 import logging
-from typing import Dict, Union
+from typing import Dict, Any, List, Optional
 
 from PyQt5.QtCore import Qt, pyqtSignal, QPoint
-from PyQt5.QtWidgets import QHeaderView, QMenu, QAction, QWidget, QHBoxLayout, QCheckBox, QTableWidgetItem
-from PyQt5.QtWidgets import QTableWidget
+from PyQt5.QtWidgets import QHeaderView, QMenu, QAction, QTableView, QAbstractItemView
 
-from config.settings import DEFAULT_CONFIG_USER
 from ui.action_add import ActionAdd
 from ui.action_delete import ActionDelete
 from ui.action_disable import ActionDisable
@@ -21,28 +19,41 @@ from ui.action_edit import ActionEdit
 from ui.action_enable import ActionEnable
 from ui.config_manager import ConfigManager
 from ui.lang_manager import LangManager
+from ui.rule_table_model import RuleTableModel, RuleFilterModel, COLUMN_ACTIVE, COLUMN_DESCRIPTION, COLUMN_HITS, COLUMN_LAST_HIT, COLUMN_BYTES
+from ui.stats_manager import StatsManager
 
 logger = logging.getLogger(__name__)
 
 
-class MainTable(QTableWidget):
+class MainTable(QTableView):
     """
-    主表格类，用于展示和管理数据行。
+    主表格类，用于展示和管理规则。
+
+    规则保存在数据模型中，经过滤模型显示，视图只绘制可见的行。配置增量更新时只修改、追加或删除变化的行。
 
     :param lang_manager: 用于管理界面语言的 LangManager 实例。
     :param config_manager: 用于管理配置的 ConfigManager 实例。
+    :param stats_manager: 用于读取规则命中统计的 StatsManager 实例。
     """
     status_updated = pyqtSignal(str)
 
     def __init__(self,
                  lang_manager: LangManager,
-                 config_manager: ConfigManager):
+                 config_manager: ConfigManager,
+                 stats_manager: StatsManager):
         super().__init__()
         # 接受更新信号，更新语言和数据
         self.lang_manager = lang_manager
         self.lang_manager.lang_updated.connect(self.update_lang)
         self.config_manager = config_manager
         self.config_manager.config_user_updated.connect(self.insert_data)
+        self.config_manager.config_user_changed.connect(self.apply_changes)
+        self.stats_manager = stats_manager
+        self.stats_manager.stats_updated.connect(self.update_stats)
+        # 数据模型和过滤模型
+        self.rule_model = RuleTableModel(self.lang_manager)
+        self.filter_model = RuleFilterModel()
+        self.filter_model.setSourceModel(self.rule_model)
         # 实例化用到的编辑动作
         self.actionEnable = ActionEnable(self.lang_manager, self.config_manager, self)
         self.actionEnable.status_updated.connect(self.forward_status)
@@ -54,25 +65,17 @@ class MainTable(QTableWidget):
         self.actionEdit.status_updated.connect(self.forward_status)
         self.actionDelete = ActionDelete(self.lang_manager, self.config_manager, self)
         self.actionDelete.status_updated.connect(self.forward_status)
-        # 先运行语言更新，里面有表头定义
         self.update_lang()
         self.init_ui()
         self.insert_data()
 
     def update_lang(self) -> None:
         """
-        更新界面语言设置。
+        更新界面语言设置。表头文字由数据模型更新。
 
         :return: 无返回值。
         """
         self.lang = self.lang_manager.get_lang()
-        self.column_headers = [
-            self.lang['ui.table_main_1'],
-            self.lang['ui.table_main_2'],
-            self.lang['ui.table_main_3'],
-        ]
-        # 重新应用到表头
-        self.setHorizontalHeaderLabels(self.column_headers)
 
     def init_ui(self) -> None:
         """
@@ -81,59 +84,86 @@ class MainTable(QTableWidget):
         :return: 无返回值。
         """
         # 配置表格基本属性
-        self.setColumnCount(len(self.column_headers))
-        self.setHorizontalHeaderLabels(self.column_headers)
-        self.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.setStyleSheet("QTableWidget {border: 0;}")
-        self.setSelectionBehavior(QTableWidget.SelectRows)
+        self.setModel(self.filter_model)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setStyleSheet("QTableView {border: 0;}")
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setWordWrap(False)
+        # 所有行等高，视图不需要逐行计算行高
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 8)
         # 设置表头
         self.verticalHeader().setVisible(False)
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.horizontalHeader().setMinimumSectionSize(50)
-        self.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        for column in (COLUMN_ACTIVE, COLUMN_DESCRIPTION, COLUMN_HITS, COLUMN_LAST_HIT, COLUMN_BYTES):
+            self.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        # 列宽只按可见行计算，默认会取前 1000 行，每次排序和刷新统计都要读取这些行的数据
+        self.horizontalHeader().setResizeContentsPrecision(0)
+        # 点击表头排序，默认不排序，保持配置文件中的顺序
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setSortingEnabled(True)
         # 为表单设置右键菜单
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self._cell_context_menu)
 
     def insert_data(self) -> None:
         """
-        向表格中插入全量数据。
+        向表格中载入全量数据。
 
         :return: 无返回值。
         """
-        # 获取用户配置
-        config_user = self.config_manager.get_config('user') or DEFAULT_CONFIG_USER
-        # 设置行数，插入数据
-        self.setRowCount(len(config_user))
-        for row, (url, info) in enumerate(config_user.items()):
-            self.insert_row(row, url, info)
+        self.rule_model.load(self.config_manager.iter_rules(), self.stats_manager.get_stats())
+
+    def apply_changes(self,
+                      rules: Dict[str, Dict[str, Any]],
+                      removed: List[str]) -> None:
+        """
+        按配置的增量更新修改表格。
+
+        :param rules: 新增或修改的规则字典。
+        :param removed: 删除的规则列表。
+        :return: 无返回值。
+        """
+        try:
+            self.rule_model.apply_changes(rules, removed, self.stats_manager.get_stats() if rules else {})
+        except Exception:
+            logger.exception("Error occurred while applying changes to the table.")
+            self.status_updated.emit(self.lang['label_status_error'])
 
-    def insert_row(self,
-                   row: int,
-                   url: str,
-                   info: Dict[str, Union[str, bool]]) -> None:
+    def update_stats(self) -> None:
         """
-        向表格中插入一行数据。
+        按最新的命中统计刷新统计列。
 
-        :param row: 要插入的行索引。
-        :param url: 用于处理的 URL 地址。
-        :param info: 包括描述和启用状态的映射字典。例如：{"active": true, "description": "xxx"}
         :return: 无返回值。
         """
-        # 创建一个 QWidget 及其布局来存放启用状态复选框
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setAlignment(Qt.AlignCenter)
-        layout.setContentsMargins(0, 0, 0, 0)
-        check_box = QCheckBox()
-        check_box.setCheckState(Qt.Checked if info["active"] else Qt.Unchecked)
-        check_box.setEnabled(False)
-        layout.addWidget(check_box)
-        # 向单元格插入一行内容
-        self.setCellWidget(row, 0, widget)
-        self.setItem(row, 1, QTableWidgetItem(info["description"]))
-        self.setItem(row, 2, QTableWidgetItem(url))
+        self.rule_model.set_stats(self.stats_manager.get_stats())
+
+    def set_filter(self, text: str) -> None:
+        """
+        只显示规则或描述中包含指定文字的行。
+
+        :param text: 过滤文字，为空时显示全部规则。
+        :return: 无返回值。
+        """
+        self.filter_model.set_filter(text)
+
+    def selected_keys(self) -> List[str]:
+        """
+        获取选中行的规则。
+
+        :return: 规则列表。
+        """
+        return [self.filter_model.key(index.row()) for index in self.selectionModel().selectedRows()]
+
+    def current_key(self) -> Optional[str]:
+        """
+        获取当前行的规则。
+
+        :return: 规则，没有当前行时返回 None。
+        """
+        index = self.currentIndex()
+        return self.filter_model.key(index.row()) if index.isValid() else None
 
     def _cell_context_menu(self, pos: QPoint) -> None:
         """
@@ -161,31 +191,3 @@ class MainTable(QTableWidget):
         :return: 无返回值。
         """
         self.status_updated.emit(message)
-
-    def get_data(self) -> Dict[str, Dict[str, any]]:
-        """
-        获取表格中的数据，未用到。
-
-        :return: 返回数据字典，其中每个元素都是一个字典，包含了单元格的选中状态、描述和链接。
-        """
-        return {self.item(row, 2).text(): {"active": self.cellWidget(row, 0).layout().itemAt(0).widget().isChecked(), "description": self.item(row, 1).text()} for row in range(self.rowCount())}
-
-    def clear(self) -> None:
-        """
-        清空表格中的所有行，未用到。
-
-        :return: 无返回值。
-        """
-        try:
-            # 禁用更新以提高性能
-            self.setUpdatesEnabled(False)
-            # 首先清除所有单元格的内容
-            self.clearContents()
-            # 将行数设置为0，从而删除所有行
-            self.setRowCount(0)
-        except Exception:
-            logger.exception("Error occurred while clearing the table.")
-            self.status_updated.emit(self.lang['label_status_error'])
-        finally:
-            # 确保即使发生错误也要重新启用更新
-            self.setUpdatesEnabled(True)
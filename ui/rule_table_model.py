@@ -0,0 +1,259 @@
+"""
+这个模块提供规则表格的数据模型和过滤模型。
+
+数据模型直接读取按列保存的规则存储，视图只会请求可见行的数据，规则再多也不会为每行创建控件。
+启用状态通过复选框角色显示，统计列按数值排序。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QVariant
+
+from lib.format_size import format_size
+from lib.rule_store import RuleStore
+from ui.lang_manager import LangManager
+
+logger = logging.getLogger(__name__)
+
+# 列号
+COLUMN_ACTIVE = 0
+COLUMN_DESCRIPTION = 1
+COLUMN_URL = 2
+COLUMN_HITS = 3
+COLUMN_LAST_HIT = 4
+COLUMN_BYTES = 5
+# 列号对应的规则存储字段，不排序时按加入顺序排列
+SORT_FIELDS = ['active', 'descriptions', 'keys', 'hits', 'last_hits', 'sizes']
+# 删除的连续行段超过此数量时重置模型，不再逐段通知视图
+RESET_RUNS = 50
+
+
+class RuleTableModel(QAbstractTableModel):
+    """
+    规则表格数据模型。排序直接对规则存储中的一列调用一次 sorted 再重排各列，不由过滤模型逐对读取单元格比较，
+    后者对十万条规则需要数百万次 Python 调用。
+
+    :param lang_manager: 语言管理器，用于表头文字。
+    """
+
+    def __init__(self, lang_manager: LangManager):
+        super().__init__()
+        self.lang_manager = lang_manager
+        self.lang_manager.lang_updated.connect(self.update_lang)
+        self.store = RuleStore()
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        # 上次排序后数据是否有变化，点击表头时 Qt 会连续请求两次相同的排序
+        self._dirty = False
+        self.update_lang()
+
+    def update_lang(self) -> None:
+        """
+        更新表头文字。
+
+        :return: 无返回值。
+        """
+        lang = self.lang_manager.get_lang()
+        self.column_headers = [lang[f'ui.table_main_{i}'] for i in range(1, 7)]
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(self.column_headers) - 1)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(SORT_FIELDS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.column_headers[section]
+        return QVariant()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        row = index.row()
+        column = index.column()
+        store = self.store
+        if role == Qt.DisplayRole:
+            if column == COLUMN_DESCRIPTION:
+                return store.descriptions[row]
+            elif column == COLUMN_URL:
+                return store.keys[row]
+            elif column == COLUMN_HITS:
+                return str(store.hits[row])
+            elif column == COLUMN_LAST_HIT:
+                last_hit = store.last_hits[row]
+                return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_hit)) if last_hit else ''
+            elif column == COLUMN_BYTES:
+                size = store.sizes[row]
+                return format_size(size) if size else ''
+        elif role == Qt.CheckStateRole and column == COLUMN_ACTIVE:
+            return Qt.Checked if store.active[row] else Qt.Unchecked
+        elif role == Qt.TextAlignmentRole and column >= COLUMN_HITS:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return QVariant()
+
+    def key(self, row: int) -> str:
+        """
+        获取一行的规则。
+
+        :param row: 行号。
+        :return: 规则。
+        """
+        return self.store.keys[row]
+
+    def load(self,
+             rows: Iterable[Tuple[str, str, bool]],
+             stats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        载入全部规则和统计数据，保持当前的排序方式。
+
+        :param rows: (规则, 描述, 启用状态) 元组的可迭代对象。
+        :param stats: 统计字典。
+        :return: 无返回值。
+        """
+        self.beginResetModel()
+        self.store.load(rows, stats)
+        if self.sort_column != -1:
+            self.store.sort(SORT_FIELDS[self.sort_column], self.sort_order == Qt.DescendingOrder)
+        self.endResetModel()
+
+    def apply_changes(self,
+                      rules: Dict[str, Dict[str, Any]],
+                      removed: List[str],
+                      stats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        按配置的增量更新修改模型：删除被删除的规则，更新已有规则，新规则追加到末尾后按当前方式重新排序。
+
+        :param rules: 新增或修改的规则字典。
+        :param removed: 删除的规则列表。
+        :param stats: 统计字典，用于新规则。
+        :return: 无返回值。
+        """
+        rows = sorted((row for row in map(self.store.row, removed) if row != -1), reverse=True)
+        if rows:
+            self._remove_rows(rows)
+
+        new_rules = {}
+        for key, info in rules.items():
+            row = self.store.row(key)
+            if row == -1:
+                new_rules[key] = info
+                continue
+            self.store.update(row, info)
+            self._dirty = True
+            self.dataChanged.emit(self.index(row, COLUMN_ACTIVE), self.index(row, COLUMN_DESCRIPTION))
+
+        if new_rules:
+            first = len(self.store)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rules) - 1)
+            for key, info in new_rules.items():
+                self.store.append(key, info, stats.get(key))
+            self.endInsertRows()
+            self._dirty = True
+            if self.sort_column != -1:
+                self.sort(self.sort_column, self.sort_order)
+
+    def _remove_rows(self, rows: List[int]) -> None:
+        """
+        删除多行。连续的行一次通知视图，行段过多时直接重置模型。
+
+        :param rows: 从大到小排列的行号。
+        :return: 无返回值。
+        """
+        runs = []
+        end = 0
+        for index, row in enumerate(rows):
+            if index + 1 == len(rows) or rows[index + 1] != row - 1:
+                runs.append((row, rows[end]))
+                end = index + 1
+        if len(runs) > RESET_RUNS:
+            self.beginResetModel()
+            self.store.remove_rows(rows)
+            self.endResetModel()
+            return
+        # 从后往前删除，前面的行号不变
+        for first, last in runs:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.store.remove_rows(range(first, last + 1))
+            self.endRemoveRows()
+
+    def set_stats(self, stats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        刷新统计列，按统计列排序时重新排序。
+
+        :param stats: 统计字典。
+        :return: 无返回值。
+        """
+        if not len(self.store):
+            return
+        self.store.set_stats(stats)
+        self._dirty = True
+        self.dataChanged.emit(self.index(0, COLUMN_HITS), self.index(len(self.store) - 1, COLUMN_BYTES))
+        if self.sort_column >= COLUMN_HITS:
+            self.sort(self.sort_column, self.sort_order)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        """
+        按列排序，列号为 -1 时恢复配置文件中的顺序。选中的行在排序后仍然选中。
+
+        :param column: 列号。
+        :param order: 排序方向。
+        :return: 无返回值。
+        """
+        if column == self.sort_column and order == self.sort_order and not self._dirty:
+            return
+        self._dirty = False
+        self.sort_column = column
+        self.sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        field = SORT_FIELDS[column] if 0 <= column < len(SORT_FIELDS) else 'sequence'
+        old_rows = self.store.sort(field, column != -1 and order == Qt.DescendingOrder)
+        # 更新视图保存的选中行和当前行
+        new_rows = {old: new for new, old in enumerate(old_rows)}
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(old_indexes, [self.createIndex(new_rows[index.row()], index.column()) for index in old_indexes])
+        self.layoutChanged.emit()
+
+
+class RuleFilterModel(QSortFilterProxyModel):
+    """
+    规则表格过滤模型，按规则或描述中包含的文字过滤，不区分大小写。排序交给数据模型完成，本模型不再排序。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._text = ''
+
+    def set_filter(self, text: str) -> None:
+        """
+        设置过滤文字，为空时显示全部规则。
+
+        :param text: 过滤文字。
+        :return: 无返回值。
+        """
+        self._text = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not self._text:
+            return True
+        store = self.sourceModel().store
+        return self._text in store.keys[source_row].lower() or self._text in store.descriptions[source_row].lower()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        self.sourceModel().sort(column, order)
+
+    def key(self, row: int) -> Optional[str]:
+        """
+        获取视图中一行对应的规则。
+
+        :param row: 视图中的行号。
+        :return: 规则，行号无效时返回 None。
+        """
+        source = self.mapToSource(self.index(row, 0))
+        return self.sourceModel().key(source.row()) if source.isValid() else None
@@ -0,0 +1,75 @@
+"""
+这个模块提供了规则命中统计的管理功能，汇总代理定期发来的命中数据，并保存到统计文件中。
+
+:author: assassing
+:contact: https://github.com/hxz393
+:copyright: Copyright 2024, hxz393. 保留所有权利。
+"""
+
+import copy
+import logging
+import os
+from typing import Dict, Any, List
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from config.settings import RULE_STATS_PATH, JSON_WRITE_DELAY, JSON_COMPACT_SIZE
+from lib.deferred_json_writer import DeferredJsonWriter
+from lib.merge_rule_stats import merge_rule_stats
+from lib.read_json import read_json
+
+logger = logging.getLogger(__name__)
+
+
+class StatsManager(QObject):
+    """
+    规则统计管理器类，保存每条规则的累计命中次数、最后命中时间和估算节省的流量。统计文件由后台线程写入。
+
+    :ivar stats_updated: 统计数据更新时发出的信号。
+    """
+    stats_updated = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._writer = DeferredJsonWriter(JSON_WRITE_DELAY)
+        self.load_stats()
+
+    def load_stats(self) -> None:
+        """
+        载入统计文件，文件不存在时从空统计开始。
+
+        :return: 无返回值。
+        """
+        self._stats: Dict[str, Dict[str, Any]] = (read_json(RULE_STATS_PATH) if os.path.isfile(RULE_STATS_PATH) else None) or {}
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取统计数据的副本。
+
+        :return: 统计字典，键为规则，值为 {"hits": 次数, "last_hit": 时间戳, "bytes": 字节数}。
+        """
+        return copy.deepcopy(self._stats)
+
+    def merge(self, batch: Dict[str, List]) -> None:
+        """
+        合并代理发来的一批命中数据，保存到统计文件并发出更新信号。
+
+        :param batch: 命中数据，键为规则，值为 [次数, 最后命中时间戳, 字节数]。
+        :return: 无返回值。
+        """
+        try:
+            merge_rule_stats(self._stats, batch)
+            # 统计条目会在原地累加，交给后台线程的是副本
+            self._writer.schedule(RULE_STATS_PATH, {key: dict(entry) for key, entry in self._stats.items()}, len(self._stats) > JSON_COMPACT_SIZE)
+            self.stats_updated.emit()
+        except Exception:
+            logger.exception("Failed to merge rule stats")
+
+    def flush(self) -> None:
+        """
+        立即写入尚未写入的统计数据，程序退出前调用。
+
+        :return: 无返回值。
+        """
+        if not self._writer.flush():
+            logger.error("Failed to save rule stats")